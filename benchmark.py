@@ -0,0 +1,529 @@
+"""
+Benchmark du pipeline - Fantasy Rugby "La Grande Melee"
+Genere des pools de joueurs synthetiques realistes et mesure chaque etape chaude :
+
+- Scoring : score_predictif.calculer_scores
+- Matching des noms : scrape_compos.enrichir_avec_compos (feuilles de match synthetiques,
+  noms abreges ou mal orthographies comme sur AllRugby)
+- Optimisation : chaque solveur de optimiseur_compo.SOLVEURS, qualite mesuree
+  par rapport a l'optimum exact (solveur 'exact'), puis recuit contre amelioration
+  a temps egal (budget BUDGET_MEME_TEMPS, ou l'amelioration complete l'equipe)
+- Demarrage d'un processus de travail : pool serialise (pickle) contre pool en
+  memoire partagee (memoire_partagee.py)
+
+Les pools respectent COMPOSITION_REQUISE (repartition des postes), des prix de 5 a 30M
+au demi-million, des moyennes correlees au prix et des chaines de forme "T,R,N,...".
+Les resultats sont sauvegardes en JSON (output/benchmarks/) avec le commit git,
+pour comparer deux versions du code.
+
+Usage:
+    python benchmark.py                                  # Tailles 700, 5k, 50k, 500k
+    python benchmark.py --tailles 700 5000 --repetitions 3
+    python benchmark.py --comparer avant.json apres.json
+"""
+
+import argparse
+import io
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import memoire_partagee
+import optimiseur_compo
+import score_predictif
+import schema_joueurs
+import scrape_compos
+
+# --- CONFIGURATION ---
+DOSSIER_BENCHMARKS = os.path.join(os.path.dirname(__file__), "output", "benchmarks")
+TAILLES_DEFAUT = [700, 5000, 50000, 500000]
+BUDGET = 300
+ITERATIONS = 500
+GRAINE = 0
+BUDGET_MEME_TEMPS = 350  # Budget de la comparaison a temps egal (l'amelioration y complete l'equipe)
+ITERATIONS_RECUIT_MAX = 100000  # A temps egal, le recuit est borne par le temps de l'amelioration
+
+CLUBS = [
+    "Stade Toulousain", "UBB", "Stade Rochelais", "RC Toulon", "Racing 92", "ASM",
+    "Castres", "Section Paloise", "Aviron Bayonnais", "Stade Francais", "LOU",
+    "MHR", "USAP", "USM",
+]
+PRENOMS = [
+    "Antoine", "Romain", "Gregory", "Thomas", "Julien", "Damian", "Matthieu", "Louis",
+    "Cyril", "Gael", "Charles", "Uini", "Francois", "Anthony", "Baptiste", "Paul",
+    "Yoram", "Emilien", "Jonathan", "Maxime", "Gabin", "Peato", "Reda", "Thibaud",
+]
+SYLLABES = [
+    "ba", "bo", "da", "de", "du", "fa", "ga", "gi", "ka", "la", "le", "li", "lo", "ma",
+    "me", "mo", "na", "ne", "no", "pa", "pe", "ra", "re", "ri", "ro", "sa", "se", "ta",
+    "te", "to", "va", "vi", "za", "mon", "ron", "lac", "ber", "tan", "gal", "vel",
+]
+FORME_EQUIPE = ['G', 'N', 'P']
+
+
+def _noms_famille(rng, n):
+    """Noms de famille synthetiques (2 a 4 syllabes)."""
+    nb_syllabes = rng.integers(2, 5, size=n)
+    tirages = rng.integers(0, len(SYLLABES), size=(n, 4))
+    return [''.join(SYLLABES[s] for s in ligne[:k]).capitalize() for ligne, k in zip(tirages, nb_syllabes)]
+
+
+def generer_pool(n, graine=GRAINE):
+    """
+    Pool synthetique de n joueurs au format de joueurs_lagrandemelee_complet.csv.
+    - Postes tires selon COMPOSITION_REQUISE
+    - Prix de 5 a 30M (pas de 0.5), concentres autour de 10-15M
+    - stat_moy correlee au prix, 10% de joueurs sans match (stat_moy = 0)
+    - Forme sur 5 matchs, adversaire et lieu du prochain match
+    """
+    rng = np.random.default_rng(graine)
+    postes = list(optimiseur_compo.COMPOSITION_REQUISE)
+    poids = np.array(list(optimiseur_compo.COMPOSITION_REQUISE.values()), dtype=float)
+
+    valeur = np.clip(np.round((5 + rng.gamma(2.2, 3.5, size=n)) * 2) / 2, 5, 30)
+    stat_moy = np.clip(0.9 * valeur + 8 + rng.normal(0, 6, size=n), 1, None).round(2)
+    stat_nb = rng.integers(0, 15, size=n)
+    stat_moy[(rng.random(n) < 0.1) | (stat_nb == 0)] = 0.0
+
+    # Les joueurs cotes sont plus souvent titulaires
+    p_titulaire = np.clip((valeur - 5) / 25, 0.1, 0.9)
+    tirages = rng.random((n, 5))
+    forme = np.where(tirages < p_titulaire[:, None], 'T', np.where(tirages < 0.9, 'R', 'N'))
+
+    club = rng.integers(0, len(CLUBS), size=n)
+    adversaire = (club + rng.integers(1, len(CLUBS), size=n)) % len(CLUBS)
+    noms = _noms_famille(rng, n)
+    prenoms = rng.choice(PRENOMS, size=n)
+
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'nom': noms,
+        'nomcomplet': [f"{p} {nom}" for p, nom in zip(prenoms, noms)],
+        'club': np.array(CLUBS)[club],
+        'position': rng.choice(postes, size=n, p=poids / poids.sum()),
+        'valeur': valeur,
+        'stat_moy': stat_moy,
+        'stat_nb': stat_nb,
+        'pourcentage_selection': rng.random(n).round(3),
+        'forme_recent': [','.join(f) for f in forme],
+        'adversaire': np.array(CLUBS)[adversaire],
+        'domicile': np.where(rng.random(n) < 0.5, 'domicile', 'exterieur'),
+        'date_match': '2026-10-24',
+    })
+
+
+def generer_classement(graine=GRAINE):
+    """Classement synthetique au format de charger_classement : {club: {rang, forme, force}}."""
+    rng = np.random.default_rng(graine)
+    classement = {}
+    for rang, i in enumerate(rng.permutation(len(CLUBS)), start=1):
+        classement[CLUBS[i]] = {
+            'rang': rang,
+            'forme': ','.join(rng.choice(FORME_EQUIPE, size=5)),
+            'force': 'fort' if rang <= 4 else ('moyen' if rang <= 10 else 'faible'),
+        }
+    return classement
+
+
+def _deformer(nom, prenom, rng):
+    """Nom tel qu'il peut apparaitre sur une feuille de match (complet, abrege, faute de frappe)."""
+    tirage = rng.random()
+    if tirage < 0.5:
+        return f"{prenom} {nom}"
+    if tirage < 0.7:
+        return f"{prenom[0]}. {nom}"
+    if tirage < 0.85:
+        return nom.upper()
+    # Deux lettres inversees
+    i = int(rng.integers(1, len(nom) - 1))
+    return f"{prenom} {nom[:i]}{nom[i + 1]}{nom[i]}{nom[i + 2:]}"
+
+
+def generer_compos(df, graine=GRAINE):
+    """
+    Feuilles de match synthetiques (23 joueurs par club) au format {(club, nom_normalise): info}.
+    Retourne (compos, clubs_avec_compos, {id: statut attendu}).
+    """
+    rng = np.random.default_rng(graine)
+    compos = {}
+    attendus = {}
+    for club, joueurs in df.groupby('club'):
+        feuille = joueurs.sample(n=min(scrape_compos.NB_JOUEURS_FEUILLE, len(joueurs)), random_state=rng)
+        club_norm = scrape_compos.normaliser_club(club)
+        for numero, (_, joueur) in enumerate(feuille.iterrows(), start=1):
+            prenom = joueur['nomcomplet'].split()[0]
+            nom = _deformer(joueur['nom'], prenom, rng)
+            statut = 'titulaire' if numero <= scrape_compos.NB_TITULAIRES else 'remplacant'
+            cle = (club_norm, scrape_compos.normaliser_nom(nom))
+            if cle in compos:
+                continue
+            compos[cle] = {'nom': nom, 'statut': statut, 'numero': numero, 'club': club_norm}
+            attendus[joueur['id']] = statut
+    clubs = {scrape_compos.normaliser_club(c) for c in df['club'].unique()}
+    return compos, clubs, attendus
+
+
+def _solveurs_mesures():
+    """Solveurs a mesurer, l'exact en premier (reference de qualite)."""
+    return ['exact'] + [s for s in optimiseur_compo.SOLVEURS if s != 'exact']
+
+
+def _chronometrer(fonction, repetitions):
+    """Execute fonction() `repetitions` fois (sortie console masquee). Retourne (meilleur temps, resultat)."""
+    meilleur = None
+    resultat = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            resultat = fonction()
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur, resultat
+
+
+def _pic_memoire(fonction):
+    """Pic de memoire allouee (octets, au-dela de l'existant) pendant fonction()."""
+    tracemalloc.start()
+    try:
+        avant = tracemalloc.get_traced_memory()[0]
+        with redirect_stdout(io.StringIO()):
+            fonction()
+        return tracemalloc.get_traced_memory()[1] - avant
+    finally:
+        tracemalloc.stop()
+
+
+def _chemin_optimisation(df, budget):
+    """Filtre -> titulaires -> remplacants, comme optimiseur_compo.main."""
+    df = optimiseur_compo.filtrer_joueurs_disponibles(df)
+    df_titulaires, budget_restant = optimiseur_compo.optimiser_titulaires(df, budget, solveur='glouton',
+                                                                          verbose=False)
+    optimiseur_compo.selectionner_remplacants_fantasy(df, df_titulaires, budget_restant)
+
+
+def mesurer_memoire(df_score, budget=BUDGET):
+    """
+    Memoire par joueur du pool score, schema brut (chaines, float64) contre schema compact :
+    taille du DataFrame et pic alloue sur le chemin filtre -> optimisation.
+    """
+    n = len(df_score)
+    df_compact = schema_joueurs.compacter_joueurs(df_score.copy())
+    return {
+        'octets_par_joueur_brut': round(schema_joueurs.octets_par_joueur(df_score), 1),
+        'octets_par_joueur_compact': round(schema_joueurs.octets_par_joueur(df_compact), 1),
+        'pic_optimisation_par_joueur_brut': round(_pic_memoire(lambda: _chemin_optimisation(df_score, budget)) / n, 1),
+        'pic_optimisation_par_joueur_compact': round(_pic_memoire(lambda: _chemin_optimisation(df_compact, budget)) / n, 1),
+    }
+
+
+def mesurer_partage(df_score, repetitions=1):
+    """
+    Cout de demarrage d'un processus de travail (temps et memoire privee allouee) :
+    pool serialise puis deserialise dans le processus, contre attachement au pool
+    exporte une fois en memoire partagee. Ce cout est paye par chaque processus.
+    """
+    pool = optimiseur_compo.filtrer_joueurs_disponibles(df_score, inclure_remplacants=True)
+    pool = pool.reset_index(drop=True)
+    n = len(pool)
+    serialise = pickle.dumps(pool)
+    duree_copie, _ = _chronometrer(lambda: pickle.loads(serialise), repetitions)
+
+    debut = time.perf_counter()
+    bloc, descripteur = memoire_partagee.exporter_pool(pool)
+    duree_export = time.perf_counter() - debut
+    try:
+        def attacher():
+            bloc_lu, _ = memoire_partagee.attacher_pool(pickle.loads(pickle.dumps(descripteur)))
+            return bloc_lu
+        duree_partage, bloc_lu = _chronometrer(attacher, repetitions)
+        del bloc_lu
+        pic_partage = _pic_memoire(attacher)
+    finally:
+        memoire_partagee.liberer(bloc)
+    return {
+        'joueurs_pool': n,
+        'export_s': round(duree_export, 4),
+        'copie_ms_par_processus': round(duree_copie * 1000, 3),
+        'copie_octets_par_processus': _pic_memoire(lambda: pickle.loads(serialise)),
+        'partage_ms_par_processus': round(duree_partage * 1000, 3),
+        'partage_octets_par_processus': pic_partage,
+    }
+
+
+def mesurer_meme_temps(df_score, budget, iterations, graine, repetitions=1):
+    """
+    Recuit contre amelioration iterative a temps egal : le recuit dispose de la duree
+    mesuree de l'amelioration. Qualite par rapport a l'optimum exact a ce budget.
+    """
+    df_exact, _ = optimiseur_compo.optimiser_exact(df_score, budget, verbose=False)
+    optimum = round(float(df_exact['score_predictif'].sum()), 2) if len(df_exact) else None
+    mesures = {'budget': budget, 'optimum': optimum}
+    options = {'amelioration': {'iterations': iterations}}
+    for solveur in ('amelioration', 'recuit'):
+        if solveur == 'recuit':
+            options['recuit'] = {'iterations': ITERATIONS_RECUIT_MAX, 'graine': graine,
+                                 'temps_max': mesures['amelioration']['duree_s']}
+        duree, (df_compo, _) = _chronometrer(
+            lambda: optimiseur_compo.optimiser_titulaires(
+                df_score, budget, solveur=solveur, verbose=False, **options[solveur]
+            ),
+            repetitions
+        )
+        complete = len(df_compo) == optimiseur_compo.TOTAL_TITULAIRES
+        score = round(float(df_compo['score_predictif'].sum()), 2) if complete else None
+        mesures[solveur] = {
+            'duree_s': round(duree, 4),
+            'complete': complete,
+            'score': score,
+            'qualite': round((score or 0.0) / optimum, 4) if optimum else None,
+        }
+    return mesures
+
+
+def mesurer_taille(n, repetitions=1, graine=GRAINE, budget=BUDGET, iterations=ITERATIONS,
+                   budget_meme_temps=BUDGET_MEME_TEMPS):
+    """Benchmark complet pour un pool de n joueurs."""
+    resultats = {'joueurs': n}
+
+    debut = time.perf_counter()
+    df = generer_pool(n, graine)
+    classement = generer_classement(graine)
+    resultats['generation_s'] = round(time.perf_counter() - debut, 4)
+
+    # Scoring
+    duree, df_score = _chronometrer(lambda: score_predictif.calculer_scores(df.copy(), classement), repetitions)
+    resultats['scoring_s'] = round(duree, 4)
+    resultats['scoring_us_par_joueur'] = round(duree / n * 1e6, 2)
+
+    # Memoire par joueur, puis pool compact comme celui charge par optimiseur_compo
+    resultats['memoire'] = mesurer_memoire(df_score, budget)
+    schema_joueurs.compacter_joueurs(df_score)
+    resultats['partage'] = mesurer_partage(df_score, repetitions)
+
+    # Matching des noms (table de resolution vide, non persistee)
+    compos, clubs, attendus = generer_compos(df, graine)
+    df_match = df.assign(nom_normalise=df['nom'].map(scrape_compos.normaliser_nom))
+    duree, df_enrichi = _chronometrer(
+        lambda: scrape_compos.enrichir_avec_compos(df_match.copy(), compos, clubs, resolutions={}, verbose=False),
+        repetitions
+    )
+    trouves = df_enrichi['statut_compo'].isin(['titulaire', 'remplacant'])
+    corrects = sum(1 for i, s in zip(df_enrichi['id'][trouves], df_enrichi['statut_compo'][trouves])
+                   if attendus.get(i) == s)
+    resultats['matching_s'] = round(duree, 4)
+    resultats['matching_noms'] = len(compos)
+    resultats['matching_rappel'] = round(corrects / len(compos), 4) if compos else None
+    resultats['matching_erreurs'] = int(trouves.sum() - corrects)
+
+    # Optimisation : chaque solveur, qualite par rapport a l'optimum exact.
+    # Le recuit a son propre budget fixe (iterations x MOUVEMENTS_PAR_ITERATION mouvements,
+    # sans limite de temps) : la qualite mesure le solveur, pas le temps laisse par un autre
+    solveurs = {}
+    for solveur in _solveurs_mesures():
+        stats = {}
+        options = {'iterations': iterations}
+        if solveur == 'recuit':
+            options['graine'] = graine
+        duree, (df_compo, _) = _chronometrer(
+            lambda: optimiseur_compo.optimiser_titulaires(
+                df_score, budget, solveur=solveur, verbose=False, stats=stats, **options
+            ),
+            repetitions
+        )
+        complete = len(df_compo) == optimiseur_compo.TOTAL_TITULAIRES
+        solveurs[solveur] = {
+            'duree_s': round(duree, 4),
+            'complete': complete,
+            'score': round(float(df_compo['score_predictif'].sum()), 2) if complete else None,
+            'budget_utilise': round(float(df_compo['valeur'].sum()), 1) if complete else None,
+            'mouvements_evalues': stats.get('mouvements_evalues'),
+        }
+    optimum = solveurs.get('exact', {}).get('score')
+    for mesures in solveurs.values():
+        # Composition incomplete : inutilisable en jeu, qualite nulle
+        mesures['qualite'] = round((mesures['score'] or 0.0) / optimum, 4) if optimum else None
+    resultats['solveurs'] = solveurs
+
+    # Meme question a temps egal ("battre l'amelioration dans le meme temps"), a un budget
+    # ou l'amelioration complete l'equipe
+    resultats['meme_temps'] = mesurer_meme_temps(df_score, budget_meme_temps, iterations, graine, repetitions)
+    return resultats
+
+
+def commit_git():
+    """Commit courant (et '+modifs' si l'arbre de travail n'est pas propre), None hors depot git."""
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=dossier,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        modifs = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=dossier,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+modifs' if modifs else '')
+
+
+def afficher_resultats(resultats):
+    """Tableau recapitulatif d'un benchmark."""
+    print("\n" + "=" * 78)
+    print(f"BENCHMARK - {resultats['date']} (commit {resultats['commit'] or '?'})")
+    print("=" * 78)
+    print(f"   {'Joueurs':>8} | {'Scoring (s)':>11} | {'us/joueur':>9} | {'Matching (s)':>12} | {'Rappel':>6} | {'Erreurs':>7}")
+    print("   " + "-" * 72)
+    for r in resultats['tailles']:
+        rappel = '-' if r['matching_rappel'] is None else f"{r['matching_rappel']:.1%}"
+        print(f"   {r['joueurs']:8d} | {r['scoring_s']:11.3f} | {r['scoring_us_par_joueur']:9.1f} | "
+              f"{r['matching_s']:12.3f} | {rappel:>6} | {r['matching_erreurs']:7d}")
+
+    print(f"\n   {'Joueurs':>8} | {'Octets/joueur':>22} | {'Pic optimisation/joueur':>23}")
+    print(f"   {'':>8} | {'brut':>10} {'compact':>11} | {'brut':>10} {'compact':>12}")
+    print("   " + "-" * 60)
+    for r in resultats['tailles']:
+        m = r.get('memoire')
+        if m:
+            print(f"   {r['joueurs']:8d} | {m['octets_par_joueur_brut']:10.0f} {m['octets_par_joueur_compact']:11.0f} | "
+                  f"{m['pic_optimisation_par_joueur_brut']:10.0f} {m['pic_optimisation_par_joueur_compact']:12.0f}")
+
+    print(f"\n   {'Joueurs':>8} | {'Demarrage processus : copie':>27} | {'memoire partagee':>22}")
+    print("   " + "-" * 64)
+    for r in resultats['tailles']:
+        p = r.get('partage')
+        if p:
+            print(f"   {r['joueurs']:8d} | {p['copie_ms_par_processus']:11.2f} ms {p['copie_octets_par_processus'] / 1024:9.0f} Ko | "
+                  f"{p['partage_ms_par_processus']:6.2f} ms {p['partage_octets_par_processus'] / 1024:9.0f} Ko")
+
+    print(f"\n   {'Joueurs':>8} | {'Solveur':14} | {'Duree (s)':>9} | {'Score':>8} | {'Qualite':>8}")
+    print("   " + "-" * 60)
+    for r in resultats['tailles']:
+        for solveur, m in r['solveurs'].items():
+            score = 'incomplet' if m['score'] is None else f"{m['score']:.1f}"
+            qualite = '-' if m['qualite'] is None else f"{m['qualite']:.2%}"
+            print(f"   {r['joueurs']:8d} | {solveur:14} | {m['duree_s']:9.3f} | {score:>8} | {qualite:>8}")
+
+    print("\n   A temps egal (recuit borne par la duree de l'amelioration) :")
+    print(f"   {'Joueurs':>8} | {'Budget':>6} | {'Solveur':14} | {'Duree (s)':>9} | {'Score':>8} | {'Qualite':>8}")
+    print("   " + "-" * 69)
+    for r in resultats['tailles']:
+        t = r.get('meme_temps')
+        if not t:
+            continue
+        for solveur in ('amelioration', 'recuit'):
+            m = t[solveur]
+            score = 'incomplet' if m['score'] is None else f"{m['score']:.1f}"
+            qualite = '-' if m['qualite'] is None else f"{m['qualite']:.2%}"
+            print(f"   {r['joueurs']:8d} | {t['budget']:6.0f} | {solveur:14} | {m['duree_s']:9.3f} | "
+                  f"{score:>8} | {qualite:>8}")
+
+
+def comparer(avant, apres):
+    """Compare deux benchmarks taille par taille (temps et qualite)."""
+    print("\n" + "=" * 78)
+    print(f"COMPARAISON {avant['commit'] or '?'} -> {apres['commit'] or '?'}")
+    print("=" * 78)
+
+    def ecart(a, b):
+        return f"{(b - a) / a * 100:+5.0f}%" if a else "   - "
+
+    tailles_avant = {r['joueurs']: r for r in avant['tailles']}
+    for r in apres['tailles']:
+        a = tailles_avant.get(r['joueurs'])
+        if a is None:
+            print(f"   {r['joueurs']:8d} joueurs | absent du benchmark de reference")
+            continue
+        print(f"\n   {r['joueurs']} joueurs")
+        for mesure in ('scoring_s', 'matching_s'):
+            print(f"      {mesure:24} {a[mesure]:9.3f}s -> {r[mesure]:9.3f}s ({ecart(a[mesure], r[mesure])})")
+        if a.get('memoire') and r.get('memoire'):
+            for mesure in ('octets_par_joueur_compact', 'pic_optimisation_par_joueur_compact'):
+                va, vb = a['memoire'][mesure], r['memoire'][mesure]
+                print(f"      {mesure:24.24} {va:9.0f}o -> {vb:9.0f}o ({ecart(va, vb)})")
+        for solveur, m in r['solveurs'].items():
+            ma = a['solveurs'].get(solveur)
+            if ma is None:
+                print(f"      {solveur:24} nouveau solveur ({m['duree_s']:.3f}s, qualite {m['qualite']})")
+                continue
+            print(f"      {solveur:24} {ma['duree_s']:9.3f}s -> {m['duree_s']:9.3f}s ({ecart(ma['duree_s'], m['duree_s'])})"
+                  f" | qualite {ma['qualite']} -> {m['qualite']}")
+        if a.get('meme_temps') and r.get('meme_temps'):
+            for solveur in ('amelioration', 'recuit'):
+                print(f"      {solveur + ' temps egal':24} qualite {a['meme_temps'][solveur]['qualite']} "
+                      f"-> {r['meme_temps'][solveur]['qualite']}")
+
+
+def sauvegarder_resultats(resultats, fichier=None):
+    """Sauvegarde le benchmark en JSON (defaut: output/benchmarks/benchmark_<date>_<commit>.json)."""
+    if fichier is None:
+        commit = (resultats['commit'] or 'inconnu').replace('+', '_')
+        fichier = os.path.join(DOSSIER_BENCHMARKS, f"benchmark_{datetime.now():%Y%m%d_%H%M%S}_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    tmp = fichier + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, fichier)
+    print(f"\n[OK] Benchmark sauvegarde: {fichier}")
+    return fichier
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline sur des pools synthetiques")
+    parser.add_argument('--tailles', type=int, nargs='+', default=TAILLES_DEFAUT,
+                        help=f"Tailles de pool (defaut: {' '.join(map(str, TAILLES_DEFAUT))})")
+    parser.add_argument('--repetitions', type=int, default=1, help='Repetitions par mesure, meilleur temps garde (defaut: 1)')
+    parser.add_argument('--budget', type=float, default=BUDGET, help=f'Budget en millions (defaut: {BUDGET})')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS, help=f'Iterations des solveurs amelioration et recuit (defaut: {ITERATIONS})')
+    parser.add_argument('--budget-meme-temps', type=float, default=BUDGET_MEME_TEMPS,
+                        help=f'Budget de la comparaison recuit / amelioration a temps egal (defaut: {BUDGET_MEME_TEMPS})')
+    parser.add_argument('--graine', type=int, default=GRAINE, help=f'Graine des pools synthetiques (defaut: {GRAINE})')
+    parser.add_argument('--output', type=str, default=None, help='Fichier JSON de sortie')
+    parser.add_argument('--comparer', type=str, nargs=2, metavar=('AVANT', 'APRES'),
+                        help='Comparer deux benchmarks sauvegardes')
+    args = parser.parse_args()
+
+    if args.comparer:
+        traces = []
+        for chemin in args.comparer:
+            with open(chemin, 'r', encoding='utf-8') as f:
+                traces.append(json.load(f))
+        comparer(*traces)
+        return
+
+    print("=" * 60)
+    print("BENCHMARK - LA GRANDE MELEE")
+    print("=" * 60)
+
+    resultats = {
+        'date': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit_git(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'budget': args.budget,
+        'budget_meme_temps': args.budget_meme_temps,
+        'iterations': args.iterations,
+        'graine': args.graine,
+        'repetitions': args.repetitions,
+        'tailles': [],
+    }
+    for n in args.tailles:
+        print(f"\n[INFO] Pool de {n} joueurs...")
+        debut = time.perf_counter()
+        resultats['tailles'].append(mesurer_taille(n, args.repetitions, args.graine, args.budget, args.iterations,
+                                                   args.budget_meme_temps))
+        print(f"   [OK] {time.perf_counter() - debut:.1f}s")
+        sys.stdout.flush()
+
+    afficher_resultats(resultats)
+    sauvegarder_resultats(resultats, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Cache HTTP sur disque - Fantasy Rugby "La Grande Melee"
+Stocke les reponses brutes (compressees gzip) indexees par methode, URL et payload.
+
+- Respecte une duree de validite (TTL) par requete
+- Revalide les entrees expirees avec des requetes conditionnelles (ETag / Last-Modified)
+- Mode hors-ligne : rejoue uniquement les reponses en cache, sans acces reseau
+
+Variables d'environnement (heritees par les sous-scripts lances depuis main.py):
+    LGM_OFFLINE=1        Active le mode hors-ligne
+    LGM_CACHE_DIR=...    Dossier du cache (defaut: output/cache_http)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import profilage
+
+# --- CONFIGURATION ---
+DOSSIER_CACHE = os.environ.get('LGM_CACHE_DIR') or os.path.join(os.path.dirname(__file__), "output", "cache_http")
+TTL_DEFAUT = 3600           # 1h avant revalidation
+TIMEOUT_DEFAUT = 15
+VAR_OFFLINE = "LGM_OFFLINE"
+
+
+class ErreurHorsLigne(requests.exceptions.ConnectionError):
+    """Levee en mode hors-ligne quand la reponse demandee n'est pas en cache."""
+
+
+def mode_offline():
+    """Indique si le mode hors-ligne est actif."""
+    return os.environ.get(VAR_OFFLINE, "") not in ("", "0")
+
+
+def activer_mode_offline(actif=True):
+    """Active/desactive le mode hors-ligne (propage aux sous-processus)."""
+    if actif:
+        os.environ[VAR_OFFLINE] = "1"
+    else:
+        os.environ.pop(VAR_OFFLINE, None)
+
+
+def cle_cache(methode, url, payload=None):
+    """Cle stable d'une requete : methode + URL + payload JSON canonique."""
+    corps = json.dumps(payload, sort_keys=True, separators=(',', ':')) if payload is not None else ""
+    brut = f"{methode.upper()}\n{url}\n{corps}"
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
+def _chemin_entree(cle):
+    return os.path.join(DOSSIER_CACHE, cle[:2], f"{cle}.gz")
+
+
+def _lire_entree(cle):
+    """Lit une entree du cache. Retourne (meta, contenu) ou (None, None)."""
+    chemin = _chemin_entree(cle)
+    if not os.path.exists(chemin):
+        return None, None
+
+    try:
+        with gzip.open(chemin, 'rb') as f:
+            ligne_meta = f.readline()
+            contenu = f.read()
+        return json.loads(ligne_meta), contenu
+    except (OSError, ValueError):
+        # Entree corrompue (ecriture interrompue...) : on l'ignore
+        return None, None
+
+
+def _ecrire_entree(cle, meta, contenu):
+    """Ecrit une entree de maniere atomique (fichier temporaire + rename)."""
+    chemin = _chemin_entree(cle)
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(chemin), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as brut, gzip.GzipFile(fileobj=brut, mode='wb', mtime=0) as f:
+            f.write(json.dumps(meta).encode('utf-8') + b"\n")
+            f.write(contenu)
+        os.replace(tmp, chemin)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _construire_reponse(meta, contenu):
+    """Reconstruit un objet requests.Response depuis une entree du cache."""
+    reponse = requests.Response()
+    reponse.status_code = meta.get('status', 200)
+    reponse._content = contenu
+    reponse.headers = CaseInsensitiveDict(meta.get('headers', {}))
+    reponse.url = meta.get('url', '')
+    reponse.encoding = meta.get('encoding')
+    reponse.reason = "OK (cache)"
+    reponse.depuis_cache = True
+    return reponse
+
+
+def _meta_depuis_reponse(reponse, methode):
+    headers = {k.lower(): v for k, v in reponse.headers.items()
+               if k.lower() in ('content-type', 'etag', 'last-modified', 'date')}
+    return {
+        'methode': methode.upper(),
+        'url': reponse.url,
+        'status': reponse.status_code,
+        'encoding': reponse.encoding,
+        'headers': headers,
+        'stocke_le': time.time(),
+    }
+
+
+@profilage.profiler
+def requete(methode, url, headers=None, json_payload=None, ttl=TTL_DEFAUT, timeout=TIMEOUT_DEFAUT):
+    """
+    Execute une requete HTTP en passant par le cache disque.
+    - Entree fraiche (age < ttl) : retournee sans acces reseau
+    - Entree expiree : revalidee (If-None-Match / If-Modified-Since), 304 = reutilisee
+    - Mode hors-ligne : entree retournee quel que soit son age, ErreurHorsLigne sinon
+    La reponse retournee porte l'attribut `depuis_cache` (True/False).
+    """
+    cle = cle_cache(methode, url, json_payload)
+    meta, contenu = _lire_entree(cle)
+
+    if mode_offline():
+        if meta is None:
+            raise ErreurHorsLigne(f"Mode hors-ligne: pas de reponse en cache pour {methode.upper()} {url}")
+        profilage.compteur('http_depuis_cache')
+        return _construire_reponse(meta, contenu)
+
+    if meta is not None and time.time() - meta.get('stocke_le', 0) < ttl:
+        profilage.compteur('http_depuis_cache')
+        return _construire_reponse(meta, contenu)
+
+    headers = dict(headers or {})
+    if meta is not None:
+        etag = meta['headers'].get('etag')
+        last_modified = meta['headers'].get('last-modified')
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    try:
+        reponse = requests.request(methode, url, headers=headers, json=json_payload, timeout=timeout)
+        profilage.compteur('http_requetes')
+        profilage.compteur('http_octets', len(reponse.content))
+    except requests.exceptions.RequestException as e:
+        if meta is None:
+            raise
+        print(f"   [WARN] Reseau indisponible ({e.__class__.__name__}), reponse en cache utilisee: {url}")
+        return _construire_reponse(meta, contenu)
+
+    if reponse.status_code == 304 and meta is not None:
+        # Donnees inchangees : on rafraichit seulement la date de stockage
+        profilage.compteur('http_304')
+        meta['stocke_le'] = time.time()
+        _ecrire_entree(cle, meta, contenu)
+        return _construire_reponse(meta, contenu)
+
+    if reponse.ok:
+        _ecrire_entree(cle, _meta_depuis_reponse(reponse, methode), reponse.content)
+
+    reponse.depuis_cache = False
+    return reponse
+
+
+def get(url, headers=None, ttl=TTL_DEFAUT, timeout=TIMEOUT_DEFAUT):
+    """GET via le cache disque."""
+    return requete('GET', url, headers=headers, ttl=ttl, timeout=timeout)
+
+
+def post(url, headers=None, json=None, ttl=TTL_DEFAUT, timeout=TIMEOUT_DEFAUT):
+    """POST (payload JSON) via le cache disque."""
+    return requete('POST', url, headers=headers, json_payload=json, ttl=ttl, timeout=timeout)
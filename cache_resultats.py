@@ -0,0 +1,131 @@
+"""
+Cache des resultats de l'optimiseur - Fantasy Rugby "La Grande Melee"
+Memorise les compositions calculees pour que les relances a l'identique
+(--skip-scrape, relecture des resultats) soient instantanees.
+
+- Cle : empreinte du pool score (id, poste, prix, scores, statut_compo)
+  + parametres de la requete (budget, solveur, verrous, exclus, graine...)
+  + coefficients du score predictif + code des solveurs
+- Une entree JSON par resultat (ids des titulaires et remplacants)
+- Eviction LRU (date de dernier acces) au-dela de TAILLE_MAX_MO
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import score_predictif
+
+# --- CONFIGURATION ---
+DOSSIER_CACHE = os.path.join(os.path.dirname(__file__), "output", "cache_resultats")
+TAILLE_MAX_MO = 20
+COLONNES_POOL = ['id', 'position', 'valeur', 'score_predictif', 'rapport_qp', 'stat_moy', 'statut_compo']
+# Modifier un solveur (ou ce qui prepare ses entrees) invalide ses resultats en cache
+FICHIERS_CODE = ['optimiseur_compo.py', 'index_joueurs.py', 'schema_joueurs.py']
+
+
+def empreinte_pool(df):
+    """Empreinte des colonnes du pool qui determinent le resultat de l'optimisation."""
+    colonnes = [c for c in COLONNES_POOL if c in df.columns]
+    h = hashlib.sha256(','.join(colonnes).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df[colonnes], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _empreinte_code():
+    h = hashlib.sha256()
+    for nom in FICHIERS_CODE:
+        chemin = os.path.join(os.path.dirname(os.path.abspath(__file__)), nom)
+        if os.path.exists(chemin):
+            with open(chemin, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def cle_resultat(df, parametres, empreinte=None):
+    """
+    Cle d'un resultat : pool + parametres (dict JSON) + coefficients du scoring + code des solveurs.
+    empreinte: empreinte_pool(df) deja calculee (optimisation par lot).
+    """
+    brut = json.dumps({
+        'pool': empreinte or empreinte_pool(df),
+        'parametres': parametres,
+        'coefficients': score_predictif.coefficients_scoring(),
+        'code': _empreinte_code(),
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
+def _chemin_entree(cle):
+    return os.path.join(DOSSIER_CACHE, f"{cle}.json")
+
+
+def lire(cle):
+    """Retourne l'entree en cache ({'titulaires': [ids], 'remplacants': [ids], ...}) ou None."""
+    chemin = _chemin_entree(cle)
+    try:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            entree = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Date d'acces pour l'eviction LRU
+    os.utime(chemin)
+    return entree
+
+
+def ecrire(cle, parametres, ids_titulaires, ids_remplacants, taille_max_mo=TAILLE_MAX_MO):
+    """Enregistre un resultat (ecriture atomique), puis evince les entrees les moins recentes."""
+    os.makedirs(DOSSIER_CACHE, exist_ok=True)
+    entree = {
+        'parametres': parametres,
+        'titulaires': [int(i) for i in ids_titulaires],
+        'remplacants': [int(i) for i in ids_remplacants],
+        'stocke_le': time.time(),
+    }
+    fd, tmp = tempfile.mkstemp(dir=DOSSIER_CACHE, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entree, f, default=str)
+        os.replace(tmp, _chemin_entree(cle))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    evincer(taille_max_mo)
+
+
+def evincer(taille_max_mo=TAILLE_MAX_MO):
+    """Supprime les entrees les moins recemment utilisees tant que le cache depasse la taille max."""
+    if not os.path.isdir(DOSSIER_CACHE):
+        return 0
+    entrees = []
+    for nom in os.listdir(DOSSIER_CACHE):
+        if nom.endswith('.json'):
+            st = os.stat(os.path.join(DOSSIER_CACHE, nom))
+            entrees.append((st.st_mtime, st.st_size, nom))
+    total = sum(taille for _, taille, _ in entrees)
+    limite = taille_max_mo * 1024 * 1024
+    supprimees = 0
+    for _, taille, nom in sorted(entrees):
+        if total <= limite:
+            break
+        try:
+            os.remove(os.path.join(DOSSIER_CACHE, nom))
+        except OSError:
+            continue
+        total -= taille
+        supprimees += 1
+    return supprimees
+
+
+def vider():
+    """Supprime toutes les entrees du cache."""
+    if not os.path.isdir(DOSSIER_CACHE):
+        return
+    for nom in os.listdir(DOSSIER_CACHE):
+        if nom.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(DOSSIER_CACHE, nom))
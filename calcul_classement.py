@@ -0,0 +1,267 @@
+"""
+Calcul du classement Top 14 a partir des resultats des matchs
+Remplace le classement manuel fige (creer_classement_manuel) par un classement
+calcule depuis output/calendrier_saison.csv.
+
+- Points terrain : victoire 4, nul 2, defaite 0
+- Bonus offensif : +1 au vainqueur s'il marque au moins 3 essais de plus que l'adversaire
+- Bonus defensif : +1 au perdant s'il s'incline de 5 points ou moins
+- Departage : points particuliers, goal-average particulier, goal-average general,
+  difference d'essais, points marques, essais marques
+
+Le calcul est incremental : un etat cumule est conserve par journee dans
+output/historique_classement.json. L'ajout d'une journee n'applique que ses matchs,
+et le classement a n'importe quelle journee passee est une simple lecture d'etat.
+"""
+
+import copy
+import csv
+import hashlib
+import json
+import os
+
+import profilage
+
+# --- CONFIGURATION ---
+FICHIER_HISTORIQUE = os.path.join(os.path.dirname(__file__), "output", "historique_classement.json")
+
+POINTS_VICTOIRE = 4
+POINTS_NUL = 2
+POINTS_DEFAITE = 0
+ECART_ESSAIS_BONUS_OFFENSIF = 3
+ECART_POINTS_BONUS_DEFENSIF = 5
+TAILLE_FORME = 5
+
+
+def stats_vides():
+    """Statistiques cumulees d'un club en debut de saison."""
+    return {
+        'joues': 0, 'gagnes': 0, 'nuls': 0, 'perdus': 0,
+        'points_pour': 0, 'points_contre': 0,
+        'essais_pour': 0, 'essais_contre': 0,
+        'bonus_offensifs': 0, 'bonus_defensifs': 0,
+        'points': 0, 'forme': '',
+    }
+
+
+def historique_vide():
+    """Historique sans aucune journee appliquee."""
+    return {'journees': [], 'etats': {}, 'empreintes': {}}
+
+
+def points_match(score_a, score_b, essais_a=None, essais_b=None):
+    """
+    Points de classement obtenus par l'equipe A.
+    Retourne (points, resultat 'G'/'N'/'P', bonus_offensif, bonus_defensif).
+    Sans nombre d'essais, le bonus offensif n'est pas attribue.
+    """
+    if score_a > score_b:
+        bonus_off = int(essais_a is not None and essais_b is not None
+                        and essais_a - essais_b >= ECART_ESSAIS_BONUS_OFFENSIF)
+        return POINTS_VICTOIRE + bonus_off, 'G', bonus_off, 0
+    if score_a == score_b:
+        return POINTS_NUL, 'N', 0, 0
+    bonus_def = int(score_b - score_a <= ECART_POINTS_BONUS_DEFENSIF)
+    return POINTS_DEFAITE + bonus_def, 'P', 0, bonus_def
+
+
+def _cle_confrontation(club_a, club_b):
+    return f"{club_a}|{club_b}"
+
+
+def appliquer_match(etat, match):
+    """Applique le resultat d'un match joue a un etat cumule (modifie en place)."""
+    clubs = etat['clubs']
+    confrontations = etat['confrontations']
+
+    dom, ext = match['club_dom'], match['club_ext']
+    s_dom, s_ext = match['score_dom'], match['score_ext']
+    e_dom, e_ext = match.get('essais_dom'), match.get('essais_ext')
+
+    for club, pour, contre, e_pour, e_contre, adversaire in (
+        (dom, s_dom, s_ext, e_dom, e_ext, ext),
+        (ext, s_ext, s_dom, e_ext, e_dom, dom),
+    ):
+        stats = clubs.setdefault(club, stats_vides())
+        points, resultat, bonus_off, bonus_def = points_match(pour, contre, e_pour, e_contre)
+
+        stats['joues'] += 1
+        stats['gagnes'] += resultat == 'G'
+        stats['nuls'] += resultat == 'N'
+        stats['perdus'] += resultat == 'P'
+        stats['points_pour'] += pour
+        stats['points_contre'] += contre
+        stats['essais_pour'] += e_pour or 0
+        stats['essais_contre'] += e_contre or 0
+        stats['bonus_offensifs'] += bonus_off
+        stats['bonus_defensifs'] += bonus_def
+        stats['points'] += points
+        formes = [f for f in stats['forme'].split(',') if f] + [resultat]
+        stats['forme'] = ','.join(formes[-TAILLE_FORME:])
+
+        # Cumul des confrontations directes (pour le departage)
+        duel = confrontations.setdefault(_cle_confrontation(club, adversaire), [0, 0])
+        duel[0] += points
+        duel[1] += pour - contre
+
+
+def empreinte_journee(matchs_journee):
+    """Empreinte des resultats d'une journee (detecte les scores corriges / matchs reportes)."""
+    lignes = sorted(
+        f"{m['club_dom']}|{m['club_ext']}|{m['score_dom']}|{m['score_ext']}|{m.get('essais_dom')}|{m.get('essais_ext')}"
+        for m in matchs_journee
+    )
+    return hashlib.sha1('\n'.join(lignes).encode('utf-8')).hexdigest()
+
+
+@profilage.profiler
+def mettre_a_jour_historique(historique, matchs):
+    """
+    Met a jour l'historique avec les matchs joues (format calendrier_saison).
+    Seules les journees nouvelles ou modifiees (et les suivantes) sont recalculees ;
+    les etats des journees precedentes sont reutilises tels quels.
+    Retourne la liste des journees recalculees.
+    """
+    par_journee = {}
+    for match in matchs:
+        if match.get('joue'):
+            par_journee.setdefault(int(match['journee']), []).append(match)
+
+    empreintes = {j: empreinte_journee(ms) for j, ms in par_journee.items()}
+    journees = sorted(par_journee)
+
+    # Premiere journee dont les resultats ont change depuis le dernier calcul
+    premiere_modifiee = None
+    for j in sorted(set(journees) | set(historique['journees'])):
+        if historique['empreintes'].get(str(j)) != empreintes.get(j):
+            premiere_modifiee = j
+            break
+
+    if premiere_modifiee is None:
+        return []
+
+    # On conserve les etats anterieurs, on rejoue a partir de la journee modifiee
+    conservees = [j for j in historique['journees'] if j < premiere_modifiee]
+    historique['journees'] = conservees
+    historique['etats'] = {str(j): historique['etats'][str(j)] for j in conservees}
+    historique['empreintes'] = {str(j): historique['empreintes'][str(j)] for j in conservees}
+
+    if conservees:
+        etat = copy.deepcopy(historique['etats'][str(conservees[-1])])
+    else:
+        etat = {'clubs': {}, 'confrontations': {}}
+
+    recalculees = []
+    for j in journees:
+        if j < premiere_modifiee:
+            continue
+        for match in par_journee[j]:
+            appliquer_match(etat, match)
+        historique['journees'].append(j)
+        historique['etats'][str(j)] = copy.deepcopy(etat)
+        historique['empreintes'][str(j)] = empreintes[j]
+        recalculees.append(j)
+
+    return recalculees
+
+
+def _departager(groupe, etat):
+    """Ordonne un groupe de clubs a egalite de points."""
+    clubs = etat['clubs']
+    confrontations = etat['confrontations']
+
+    def cle(club):
+        pts_part = diff_part = 0
+        for adversaire in groupe:
+            if adversaire != club:
+                duel = confrontations.get(_cle_confrontation(club, adversaire), [0, 0])
+                pts_part += duel[0]
+                diff_part += duel[1]
+        s = clubs[club]
+        return (
+            -pts_part,
+            -diff_part,
+            -(s['points_pour'] - s['points_contre']),
+            -(s['essais_pour'] - s['essais_contre']),
+            -s['points_pour'],
+            -s['essais_pour'],
+            club,
+        )
+
+    return sorted(groupe, key=cle)
+
+
+def classer(etat):
+    """Calcule le classement d'un etat cumule : {club: {rang, points, ...}}."""
+    clubs = etat['clubs']
+    par_points = {}
+    for club, stats in clubs.items():
+        par_points.setdefault(stats['points'], []).append(club)
+
+    ordre = []
+    for points in sorted(par_points, reverse=True):
+        groupe = par_points[points]
+        ordre.extend(_departager(groupe, etat) if len(groupe) > 1 else groupe)
+
+    classement = {}
+    for rang, club in enumerate(ordre, start=1):
+        stats = clubs[club]
+        classement[club] = {
+            'rang': rang,
+            'points': stats['points'],
+            'joues': stats['joues'],
+            'gagnes': stats['gagnes'],
+            'nuls': stats['nuls'],
+            'perdus': stats['perdus'],
+            'diff': stats['points_pour'] - stats['points_contre'],
+            'bonus': stats['bonus_offensifs'] + stats['bonus_defensifs'],
+            'forme': stats['forme'],
+        }
+    return classement
+
+
+def classement_a_la_journee(historique, journee=None):
+    """
+    Classement tel qu'il etait a l'issue d'une journee (defaut : derniere journee calculee).
+    Utilise l'etat de la derniere journee calculee <= journee. {} si aucun match.
+    """
+    disponibles = [j for j in historique['journees'] if journee is None or j <= journee]
+    if not disponibles:
+        return {}
+    return classer(historique['etats'][str(disponibles[-1])])
+
+
+def charger_historique(fichier=FICHIER_HISTORIQUE):
+    """Charge l'historique des etats cumules (vide si absent ou illisible)."""
+    if not os.path.exists(fichier):
+        return historique_vide()
+
+    try:
+        with open(fichier, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"[WARN] Historique de classement illisible, recalcul complet: {fichier}")
+        return historique_vide()
+
+
+def sauvegarder_historique(historique, fichier=FICHIER_HISTORIQUE):
+    """Sauvegarde l'historique des etats cumules."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(historique, f, ensure_ascii=False)
+    os.replace(tmp, fichier)
+
+
+def charger_matchs_calendrier(fichier):
+    """Relit output/calendrier_saison.csv au format des matchs normalises."""
+    matchs = []
+    with open(fichier, 'r', encoding='utf-8-sig', newline='') as f:
+        for ligne in csv.DictReader(f, delimiter=';'):
+            match = dict(ligne)
+            match['journee'] = int(match['journee'])
+            for cle in ('score_dom', 'score_ext', 'essais_dom', 'essais_ext'):
+                match[cle] = int(match[cle]) if match.get(cle) not in (None, '') else None
+            match['joue'] = match.get('joue') == 'True'
+            matchs.append(match)
+    return matchs
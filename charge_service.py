@@ -0,0 +1,91 @@
+"""
+Generateur de charge pour le service d'optimisation
+Envoie des requetes variees (budget, verrous, exclus, objectif, top-K) en parallele
+et mesure la latence de bout en bout (p50, p90, p99, max) et le debit.
+
+Usage:
+    python service_optimisation.py &            # Lancer le service
+    python charge_service.py                    # 200 requetes, 8 clients simultanes
+    python charge_service.py --requetes 500 --concurrence 16 --port 9000
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from service_optimisation import HOTE, PORT_DEFAUT
+from optimiseur_compo import OBJECTIFS
+
+# --- CONFIGURATION ---
+BUDGET_MIN = 250
+BUDGET_MAX = 320
+MAX_VERROUS = 2
+MAX_EXCLUS = 5
+TIMEOUT = 60
+
+
+def generer_requete(joueurs, rng):
+    """Requete aleatoire realiste a partir du pool expose par le service."""
+    ids = [j['id'] for j in joueurs]
+    return {
+        'budget': rng.randint(BUDGET_MIN, BUDGET_MAX),
+        'verrous': rng.sample(ids, rng.randint(0, min(MAX_VERROUS, len(ids)))),
+        'exclus': rng.sample(ids, rng.randint(0, min(MAX_EXCLUS, len(ids)))),
+        'objectif': rng.choice(OBJECTIFS),
+        'top_k': rng.randint(1, 3),
+    }
+
+
+def envoyer(url, requete):
+    """Envoie une requete. Retourne (latence en ms, code HTTP)."""
+    debut = time.perf_counter()
+    try:
+        reponse = requests.post(url, json=requete, timeout=TIMEOUT)
+        code = reponse.status_code
+    except requests.exceptions.RequestException:
+        code = 0
+    return (time.perf_counter() - debut) * 1000, code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generateur de charge du service d'optimisation")
+    parser.add_argument('--port', type=int, default=PORT_DEFAUT, help=f'Port du service (defaut: {PORT_DEFAUT})')
+    parser.add_argument('--requetes', type=int, default=200, help='Nombre total de requetes (defaut: 200)')
+    parser.add_argument('--concurrence', type=int, default=8, help='Clients simultanes (defaut: 8)')
+    parser.add_argument('--graine', type=int, default=0, help='Graine aleatoire (defaut: 0)')
+    args = parser.parse_args()
+
+    base = f"http://{HOTE}:{args.port}"
+    try:
+        joueurs = requests.get(f"{base}/joueurs", timeout=TIMEOUT).json()
+    except requests.exceptions.RequestException as e:
+        print(f"[ERREUR] Service injoignable sur {base}: {e}")
+        return
+
+    rng = random.Random(args.graine)
+    requetes = [generer_requete(joueurs, rng) for _ in range(args.requetes)]
+
+    print(f"Charge: {args.requetes} requetes, {args.concurrence} clients, pool de {len(joueurs)} joueurs")
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrence) as executor:
+        resultats = list(executor.map(lambda r: envoyer(f"{base}/optimiser", r), requetes))
+    duree = time.perf_counter() - debut
+
+    latences = np.array([l for l, code in resultats if code == 200])
+    refusees = sum(1 for _, code in resultats if code == 400)
+    erreurs = sum(1 for _, code in resultats if code not in (200, 400))
+
+    print("\nRESULTATS:")
+    print(f"   Reussies: {len(latences)} | Refusees (400): {refusees} | Erreurs: {erreurs}")
+    print(f"   Debit: {len(resultats) / duree:.1f} req/s ({duree:.1f}s)")
+    if len(latences):
+        p50, p90, p99 = np.percentile(latences, [50, 90, 99])
+        print(f"   Latence (ms): p50={p50:.0f} | p90={p90:.0f} | p99={p99:.0f} | max={latences.max():.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Flux des changements entre deux scrapes - Fantasy Rugby "La Grande Melee"
+Chaque scrape reecrit les CSV du precedent : ce module compare le nouveau pool a la
+version precedente (par id) et journalise ce qui a bouge dans output/flux_changements.csv :
+
+- valeur : changement de prix (ecart = variation en M)
+- stat_moy : changement de moyenne (ecart = variation)
+- forme_recent : nouveaux matchs dans la forme (ecart = nombre de nouvelles entrees)
+- statut_compo : transition de statut, ex: inconnu -> titulaire
+- pool : joueur ajoute au pool ou retire
+
+La comparaison est vectorisee (alignement par id, une comparaison de colonnes par champ) :
+elle coute peu meme sur un gros pool. Les etapes suivantes peuvent ne traiter que les ids
+modifies (ids_modifies).
+
+Usage:
+    python flux_changements.py                      # Changements du dernier scrape
+    python flux_changements.py --depuis 2025-11-20  # Tous les changements depuis une date
+    python flux_changements.py --champ valeur       # Seulement les changements de prix
+"""
+
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+FICHIER_FLUX = os.path.join(os.path.dirname(__file__), "output", "flux_changements.csv")
+COLONNES_FLUX = ['lot', 'source', 'id', 'nom', 'club', 'champ', 'avant', 'apres', 'ecart']
+# Champs suivis par source : scrape des joueurs (API Fantasy) et des compositions (AllRugby)
+CHAMPS_JOUEURS = ['valeur', 'stat_moy', 'forme_recent', 'pool']
+CHAMPS_COMPOS = ['statut_compo']
+CHAMPS_NUMERIQUES = ['valeur', 'stat_moy']
+STATUT_INCONNU = 'inconnu'
+
+
+def lire_precedent(fichier, champs):
+    """Version precedente d'un CSV du pipeline (colonnes utiles seulement), None si absente."""
+    if not os.path.exists(fichier):
+        return None
+    try:
+        return pd.read_csv(fichier, sep=";", encoding="utf-8-sig",
+                           usecols=lambda c: c in ['id', 'nom', 'club'] + list(champs))
+    except (OSError, ValueError):
+        return None
+
+
+def _texte(serie, defaut):
+    return serie.astype(object).where(serie.notna(), defaut).astype(str).to_numpy()
+
+
+def nouvelles_entrees(avant, apres):
+    """
+    Nombre de nouveaux matchs entre deux formes "T,T,N,T,R" (fenetre glissante, le plus
+    recent en dernier) : longueur de apres moins le plus long recouvrement suffixe de
+    avant / prefixe de apres.
+    """
+    anciens = [x for x in avant.split(',') if x] if avant else []
+    nouveaux = [x for x in apres.split(',') if x] if apres else []
+    for decalage in range(len(anciens) + 1):
+        reste = anciens[decalage:]
+        if nouveaux[:len(reste)] == reste:
+            return len(nouveaux) - len(reste)
+    return len(nouveaux)
+
+
+def detecter_changements(ancien, nouveau, champs):
+    """
+    Compare deux versions du pool par id. Retourne le journal des changements
+    (colonnes id, nom, club, champ, avant, apres, ecart), une ligne par joueur et champ modifie.
+    """
+    colonnes_infos = [c for c in ('nom', 'club') if c in nouveau.columns]
+    n = nouveau.drop_duplicates('id', keep='last').set_index('id')
+    if ancien is None:
+        a = pd.DataFrame(index=pd.Index([], name='id'))
+    else:
+        a = ancien.drop_duplicates('id', keep='last').set_index('id')
+
+    communs = n.index.intersection(a.index)
+    morceaux = []
+    for champ in champs:
+        if champ == 'pool' or champ not in n.columns:
+            continue
+        apres = n[champ].reindex(communs)
+        avant = a[champ].reindex(communs) if champ in a.columns else pd.Series(np.nan, index=communs)
+        if champ in CHAMPS_NUMERIQUES:
+            v_avant = avant.to_numpy(dtype=float)
+            v_apres = apres.to_numpy(dtype=float)
+            modifie = ~np.isclose(v_avant, v_apres, rtol=0, atol=1e-9, equal_nan=True)
+            ecart = np.round(v_apres[modifie] - v_avant[modifie], 4)
+            t_avant, t_apres = avant.to_numpy()[modifie], apres.to_numpy()[modifie]
+        else:
+            defaut = STATUT_INCONNU if champ == 'statut_compo' else ''
+            t_avant, t_apres = _texte(avant, defaut), _texte(apres, defaut)
+            modifie = t_avant != t_apres
+            t_avant, t_apres = t_avant[modifie], t_apres[modifie]
+            if champ == 'forme_recent':
+                # Seules les lignes modifiees passent par le decoupage des chaines
+                ecart = np.array([nouvelles_entrees(x, y) for x, y in zip(t_avant, t_apres)], dtype=float)
+            else:
+                ecart = np.full(int(modifie.sum()), np.nan)
+        ids = communs[modifie]
+        morceaux.append(pd.DataFrame({'id': ids, 'champ': champ, 'avant': t_avant,
+                                      'apres': t_apres, 'ecart': ecart}))
+
+    if 'pool' in champs:
+        morceaux.append(pd.DataFrame({'id': n.index.difference(a.index), 'champ': 'pool',
+                                      'avant': 'absent', 'apres': 'present', 'ecart': np.nan}))
+        morceaux.append(pd.DataFrame({'id': a.index.difference(n.index), 'champ': 'pool',
+                                      'avant': 'present', 'apres': 'absent', 'ecart': np.nan}))
+
+    morceaux = [m for m in morceaux if len(m) > 0]
+    if not morceaux:
+        return pd.DataFrame(columns=['id'] + colonnes_infos + ['champ', 'avant', 'apres', 'ecart'])
+    changements = pd.concat(morceaux, ignore_index=True)
+    infos = pd.concat([n[colonnes_infos], a[[c for c in colonnes_infos if c in a.columns]]])
+    infos = infos[~infos.index.duplicated(keep='first')]
+    for c in colonnes_infos:
+        changements.insert(changements.columns.get_loc('champ'), c,
+                           infos[c].reindex(changements['id']).to_numpy())
+    return changements
+
+
+def journaliser(changements, source, lot=None, fichier=FICHIER_FLUX):
+    """Ajoute les changements d'un scrape au flux (un meme lot pour toutes les lignes)."""
+    if len(changements) == 0:
+        return
+    if lot is None:
+        lot = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    nouveau_fichier = not os.path.exists(fichier)
+    lignes = changements.reindex(columns=COLONNES_FLUX)
+    lignes['lot'], lignes['source'] = lot, source
+    lignes.to_csv(fichier, mode='a', header=nouveau_fichier, index=False, sep=";",
+                  encoding='utf-8-sig' if nouveau_fichier else 'utf-8')
+
+
+def enregistrer(ancien, nouveau, source, champs, fichier=FICHIER_FLUX):
+    """
+    Compare le nouveau pool a l'ancien, journalise les changements et les retourne.
+    Sans version precedente (premier scrape), rien n'est journalise.
+    """
+    if ancien is None:
+        print(f"[INFO] Flux {source}: pas de version precedente, rien a comparer")
+        return pd.DataFrame(columns=COLONNES_FLUX[2:])
+    changements = detecter_changements(ancien, nouveau, champs)
+    journaliser(changements, source, fichier=fichier)
+    if len(changements) == 0:
+        print(f"[OK] Flux {source}: aucun changement")
+    else:
+        resume = ", ".join(f"{nb} {champ}" for champ, nb in changements['champ'].value_counts().items())
+        print(f"[OK] Flux {source}: {changements['id'].nunique()} joueurs modifies ({resume})")
+    return changements
+
+
+def charger_flux(fichier=FICHIER_FLUX, depuis=None, source=None, champs=None):
+    """Journal des changements, filtre par date de lot (>= depuis), source et champs."""
+    if not os.path.exists(fichier):
+        return pd.DataFrame(columns=COLONNES_FLUX)
+    flux = pd.read_csv(fichier, sep=";", encoding="utf-8-sig", dtype={'avant': str, 'apres': str})
+    if depuis is not None:
+        flux = flux[flux['lot'] >= depuis]
+    if source is not None:
+        flux = flux[flux['source'] == source]
+    if champs is not None:
+        flux = flux[flux['champ'].isin(champs)]
+    return flux.reset_index(drop=True)
+
+
+def dernier_lot(flux, source=None):
+    """Changements du dernier scrape journalise (d'une source donnee si precisee)."""
+    if source is not None:
+        flux = flux[flux['source'] == source]
+    if len(flux) == 0:
+        return flux
+    # Journal en ajout seul : la derniere ligne appartient au dernier scrape
+    dernier = flux.iloc[-1]
+    return flux[(flux['lot'] == dernier['lot']) & (flux['source'] == dernier['source'])].reset_index(drop=True)
+
+
+def ids_modifies(flux, champs=None):
+    """Ids distincts touches par les changements (tous champs, ou seulement champs)."""
+    if champs is not None:
+        flux = flux[flux['champ'].isin(champs)]
+    return flux['id'].unique()
+
+
+def afficher(flux, nb=10):
+    """Resume des changements par champ, puis les plus fortes variations de prix."""
+    if len(flux) == 0:
+        print("[INFO] Aucun changement")
+        return
+    print(f"{flux['id'].nunique()} joueurs modifies, {len(flux)} changements")
+    for champ, nb_champ in flux['champ'].value_counts().items():
+        print(f"   {champ:14} {nb_champ}")
+
+    prix = flux[flux['champ'] == 'valeur']
+    if len(prix) > 0:
+        print("\nVariations de prix:")
+        for _, c in prix.reindex(prix['ecart'].abs().sort_values(ascending=False).index).head(nb).iterrows():
+            print(f"   {c['nom']:20} | {c['club']:20} | {c['avant']} -> {c['apres']}M ({c['ecart']:+.1f})")
+
+    statuts = flux[flux['champ'] == 'statut_compo']
+    if len(statuts) > 0:
+        print("\nTransitions de statut:")
+        transitions = (statuts['avant'] + " -> " + statuts['apres']).value_counts()
+        for transition, nb_transition in transitions.items():
+            print(f"   {transition:30} {nb_transition}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flux des changements entre deux scrapes')
+    parser.add_argument('--depuis', type=str, default=None,
+                        help='Changements depuis une date (AAAA-MM-JJ ou AAAA-MM-JJTHH:MM:SS), defaut: dernier scrape')
+    parser.add_argument('--source', choices=['joueurs', 'compos'], default=None,
+                        help='Limiter a une source')
+    parser.add_argument('--champ', action='append', default=None,
+                        help='Limiter a un champ (valeur, stat_moy, forme_recent, statut_compo, pool)')
+    args = parser.parse_args()
+
+    flux = charger_flux(depuis=args.depuis, source=args.source, champs=args.champ)
+    if args.depuis is None:
+        flux = dernier_lot(flux)
+        if len(flux) > 0:
+            print(f"Dernier scrape: {flux['lot'].iloc[0]} ({flux['source'].iloc[0]})")
+    afficher(flux)
+
+
+if __name__ == "__main__":
+    main()
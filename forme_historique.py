@@ -0,0 +1,231 @@
+"""
+Forme des joueurs depuis l'historique par journee - Fantasy Rugby "La Grande Melee"
+La chaine forme_recent ("T,R,N,T,T") ne dit ni combien de points le joueur a marques,
+ni au-dela de 5 matchs. Ce module suit, journee apres journee, a partir des snapshots
+de historique_joueurs.py :
+
+- points par match : variation du total de la saison (stat_moy x stat_nb) entre deux
+  snapshots, divisee par le nombre de matchs joues entre les deux
+- titularisation : derniere entree de forme_recent quand un match a ete joue
+  (les minutes jouees ne sont pas fournies par l'API)
+
+Caracteristiques en moyenne exponentielle (poids (1 - ALPHA_FORME) par journee ecoulee) :
+forme_points, variance_points, taux_titularisation et matchs_effectifs.
+
+L'etat (sommes ponderees par joueur) est calcule en une passe groupee sur l'historique,
+puis mis a jour de maniere incrementale a l'arrivee d'une journee : les sommes sont
+amorties d'un facteur, puis la nouvelle observation y est ajoutee. L'etat persiste
+(output/forme_historique.csv) couvre les journees terminees ; la journee en cours,
+encore susceptible d'etre re-scrapee, est appliquee en memoire a chaque lecture.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import historique_joueurs
+
+# --- CONFIGURATION ---
+FICHIER_ETAT = os.path.join(os.path.dirname(__file__), "output", "forme_historique.csv")
+ALPHA_FORME = 0.3   # Poids de la journee la plus recente (1 - ALPHA_FORME par journee plus ancienne)
+SOMMES = ['w_points', 's_points', 's2_points', 'w2_points', 'w_titu', 's_titu']
+COLONNES_ETAT = ['id', 'journee', 'total_points', 'nb_matchs'] + SOMMES
+
+
+def _observations(total, nb, total_precedent, nb_precedent, forme):
+    """
+    Observations d'une journee (tableaux alignes) : points par match joue (NaN sinon)
+    et titularisation (1/0, NaN sans snapshot precedent).
+    """
+    delta_nb = nb - nb_precedent
+    joue = delta_nb > 0
+    points = np.where(joue, (total - total_precedent) / np.where(joue, delta_nb, 1), np.nan)
+    derniere = pd.Series(forme, dtype=object).fillna('').str.rsplit(',', n=1).str[-1].str.strip().to_numpy()
+    titu = np.where(np.isnan(delta_nb), np.nan, (joue & (derniere == 'T')).astype(float))
+    return points, titu
+
+
+def _totaux(df):
+    nb = df['stat_nb'].to_numpy(dtype=float, na_value=np.nan)
+    nb = np.nan_to_num(nb, nan=0.0)
+    moyenne = np.nan_to_num(df['stat_moy'].to_numpy(dtype=float, na_value=np.nan), nan=0.0)
+    return moyenne * nb, nb
+
+
+def _ajouter(sommes, poids, points, titu):
+    """Ajoute des observations ponderees aux sommes (dict de tableaux, modifies en place)."""
+    a_points = ~np.isnan(points)
+    a_titu = ~np.isnan(titu)
+    sommes['w_points'] += np.where(a_points, poids, 0.0)
+    sommes['s_points'] += np.where(a_points, poids * np.nan_to_num(points), 0.0)
+    sommes['s2_points'] += np.where(a_points, poids * np.nan_to_num(points) ** 2, 0.0)
+    sommes['w2_points'] += np.where(a_points, poids ** 2, 0.0)
+    sommes['w_titu'] += np.where(a_titu, poids, 0.0)
+    sommes['s_titu'] += np.where(a_titu, poids * np.nan_to_num(titu), 0.0)
+
+
+def _passe_groupee(historique):
+    """
+    Historique trie par id puis journee, avec totaux et observations de chaque snapshot
+    par rapport au snapshot precedent du meme joueur (une passe vectorisee).
+    """
+    h = historique.sort_values(['id', 'journee'], kind='stable').reset_index(drop=True)
+    total, nb = _totaux(h)
+    # Snapshot precedent du meme joueur (NaN pour son premier snapshot)
+    premier = ~h['id'].duplicated().to_numpy()
+    total_precedent = np.where(premier, np.nan, np.roll(total, 1))
+    nb_precedent = np.where(premier, np.nan, np.roll(nb, 1))
+    points, titu = _observations(total, nb, total_precedent, nb_precedent, h['forme_recent'])
+    return h, total, nb, points, titu
+
+
+def observations_historique(historique):
+    """
+    Observations de chaque snapshot (historique_joueurs.historique_par_journee) :
+    DataFrame id, journee, club, position, points (par match joue depuis le snapshot
+    precedent, NaN sinon), titu (1/0, NaN pour le premier snapshot du joueur).
+    """
+    colonnes = ['id', 'journee', 'club', 'position']
+    if len(historique) == 0:
+        return pd.DataFrame(columns=colonnes + ['points', 'titu'])
+    h, _, _, points, titu = _passe_groupee(historique)
+    observations = h[[c for c in colonnes if c in h.columns]].copy()
+    observations['points'] = points
+    observations['titu'] = titu
+    return observations
+
+
+def calculer_etat(historique, alpha=ALPHA_FORME):
+    """
+    Etat complet en une passe groupee sur l'historique (une ligne par joueur et journee,
+    voir historique_joueurs.historique_par_journee). Poids d'une observation :
+    (1 - alpha) ** (derniere journee - sa journee).
+    """
+    if len(historique) == 0:
+        return pd.DataFrame(columns=COLONNES_ETAT)
+    h, total, nb, points, titu = _passe_groupee(historique)
+
+    journee = int(h['journee'].max())
+    poids = (1 - alpha) ** (journee - h['journee'].to_numpy(dtype=float))
+    sommes = {nom: np.zeros(len(h)) for nom in SOMMES}
+    _ajouter(sommes, poids, points, titu)
+
+    lignes = pd.DataFrame(sommes)
+    lignes['id'] = h['id'].to_numpy()
+    etat = lignes.groupby('id', sort=True).sum()
+    derniers = pd.Series(np.arange(len(h))).groupby(h['id'].to_numpy()).last()
+    etat['total_points'] = total[derniers.to_numpy()]
+    etat['nb_matchs'] = nb[derniers.to_numpy()]
+    etat['journee'] = journee
+    return etat.reset_index()[COLONNES_ETAT]
+
+
+def integrer_journee(etat, snapshot, journee, alpha=ALPHA_FORME):
+    """
+    Mise a jour incrementale : amortit les sommes de l'etat jusqu'a la journee donnee
+    et y ajoute les observations du snapshot (une ligne par joueur). Retourne un nouvel etat.
+    """
+    journee_etat = int(etat['journee'].iloc[0]) if len(etat) > 0 else journee
+    snapshot = snapshot.drop_duplicates('id', keep='last')
+    ids = np.union1d(etat['id'].to_numpy(dtype=np.int64), snapshot['id'].to_numpy(dtype=np.int64))
+    nouveau = etat.set_index('id').reindex(ids)
+    presents = snapshot.set_index('id').reindex(ids)
+
+    facteur = (1 - alpha) ** (journee - journee_etat)
+    sommes = {nom: np.nan_to_num(nouveau[nom].to_numpy(dtype=float)) * facteur for nom in SOMMES}
+    sommes['w2_points'] *= facteur  # Somme des carres des poids : amortie au carre
+    total, nb = _totaux(presents)
+    dans_snapshot = np.isin(ids, snapshot['id'].to_numpy())
+    total_precedent = nouveau['total_points'].to_numpy(dtype=float)
+    nb_precedent = nouveau['nb_matchs'].to_numpy(dtype=float)
+    points, titu = _observations(total, nb, total_precedent, nb_precedent, presents['forme_recent'])
+    points[~dans_snapshot] = np.nan
+    titu[~dans_snapshot] = np.nan
+    _ajouter(sommes, 1.0, points, titu)
+
+    resultat = pd.DataFrame(sommes, index=ids)
+    resultat['total_points'] = np.where(dans_snapshot, total, total_precedent)
+    resultat['nb_matchs'] = np.where(dans_snapshot, nb, nb_precedent)
+    resultat['journee'] = journee
+    return resultat.rename_axis('id').reset_index()[COLONNES_ETAT]
+
+
+def caracteristiques(etat):
+    """
+    Caracteristiques de forme par joueur (DataFrame indexe par id) :
+    forme_points (moyenne exponentielle des points par match), variance_points (sans biais),
+    taux_titularisation, matchs_effectifs (taille d'echantillon effective).
+    NaN quand aucune observation n'est disponible.
+    """
+    e = etat.set_index('id')
+    w, w2 = e['w_points'].to_numpy(dtype=float), e['w2_points'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moyenne = np.where(w > 0, e['s_points'] / w, np.nan)
+        brute = e['s2_points'] / w - moyenne ** 2
+        correction = w ** 2 / (w ** 2 - w2)
+        variance = np.where(w ** 2 > w2 * (1 + 1e-9), np.maximum(brute, 0) * correction, np.nan)
+        matchs = np.where(w2 > 0, w ** 2 / w2, 0.0)
+        taux = np.where(e['w_titu'] > 0, e['s_titu'] / e['w_titu'], np.nan)
+    return pd.DataFrame({
+        'forme_points': moyenne,
+        'variance_points': variance,
+        'taux_titularisation': taux,
+        'matchs_effectifs': matchs,
+    }, index=e.index)
+
+
+def charger_etat(fichier=FICHIER_ETAT):
+    """Etat persiste (None si absent ou illisible)."""
+    if not os.path.exists(fichier):
+        return None
+    try:
+        return pd.read_csv(fichier, sep=";", encoding="utf-8-sig")
+    except (OSError, ValueError):
+        print(f"[WARN] Etat de forme illisible, recalcul complet: {fichier}")
+        return None
+
+
+def sauvegarder_etat(etat, fichier=FICHIER_ETAT):
+    """Sauvegarde l'etat (ecriture atomique)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    etat.to_csv(tmp, index=False, sep=";", encoding="utf-8-sig")
+    os.replace(tmp, fichier)
+
+
+def caracteristiques_a_jour(journee=None, dossier=historique_joueurs.DOSSIER_HISTORIQUE, fichier=FICHIER_ETAT):
+    """
+    Caracteristiques de forme a partir de l'historique.
+    journee=None : etat persiste mis a jour avec les journees terminees manquantes
+    (incremental), puis la derniere journee appliquee en memoire.
+    journee=J (backtest) : passe complete sur les snapshots des journees <= J, sans persistance.
+    """
+    journees = historique_joueurs.journees_disponibles(dossier)
+    if journee is not None:
+        historique = historique_joueurs.historique_par_journee(dossier)
+        return caracteristiques(calculer_etat(historique[historique['journee'] <= journee]))
+    if not journees:
+        return caracteristiques(pd.DataFrame(columns=COLONNES_ETAT))
+
+    derniere = journees[-1]
+    terminees = [j for j in journees if j < derniere]
+    etat = charger_etat(fichier)
+    journee_etat = int(etat['journee'].iloc[0]) if etat is not None and len(etat) > 0 else None
+
+    if terminees and (journee_etat is None or journee_etat not in terminees):
+        historique = historique_joueurs.historique_par_journee(dossier)
+        etat = calculer_etat(historique[historique['journee'] < derniere])
+        sauvegarder_etat(etat, fichier)
+        print(f"[OK] Forme historique calculee sur {len(terminees)} journees")
+    elif terminees and journee_etat < terminees[-1]:
+        for j in terminees:
+            if j > journee_etat:
+                etat = integrer_journee(etat, historique_joueurs.charger_journee(j, dossier), j)
+        sauvegarder_etat(etat, fichier)
+        print(f"[OK] Forme historique mise a jour jusqu'a la journee {terminees[-1]}")
+    elif not terminees:
+        etat = pd.DataFrame(columns=COLONNES_ETAT)
+
+    etat = integrer_journee(etat, historique_joueurs.charger_journee(derniere, dossier), derniere)
+    return caracteristiques(etat)
@@ -0,0 +1,163 @@
+"""
+Historique des joueurs Fantasy - snapshots par journee
+Stocke chaque scrape de joueurs dans un historique en ajout seul, partitionne par journee :
+    output/historique_joueurs/journee_13.csv
+
+- Une ligne n'est ajoutee que si elle differe de la derniere version connue du joueur
+  dans la journee (les re-scrapes sans changement ne coutent rien)
+- Lecture d'une journee : derniere version de chaque joueur dans la partition
+- Lecture de l'historique d'un joueur : index par id sur l'ensemble des partitions
+  (garde en memoire tant que les fichiers ne changent pas)
+"""
+
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import profilage
+
+# --- CONFIGURATION ---
+DOSSIER_HISTORIQUE = os.path.join(os.path.dirname(__file__), "output", "historique_joueurs")
+
+# Colonnes suivies (toutes sauf l'id entrent dans l'empreinte de deduplication)
+COLONNES_SNAPSHOT = [
+    'id', 'nom', 'nomcomplet', 'club', 'position',
+    'valeur', 'stat_moy', 'stat_nb', 'pourcentage_selection',
+    'forme_recent', 'adversaire', 'domicile', 'date_match'
+]
+COLONNES_META = ['journee', 'date_scrape', 'empreinte']
+
+# Cache de l'historique complet : {'signature': ..., 'df': ...}
+_cache_historique = {}
+
+
+def chemin_partition(journee, dossier=DOSSIER_HISTORIQUE):
+    return os.path.join(dossier, f"journee_{int(journee):02d}.csv")
+
+
+def journees_disponibles(dossier=DOSSIER_HISTORIQUE):
+    """Liste triee des journees presentes dans l'historique."""
+    if not os.path.isdir(dossier):
+        return []
+    journees = []
+    for nom in os.listdir(dossier):
+        if nom.startswith("journee_") and nom.endswith(".csv"):
+            journees.append(int(nom[len("journee_"):-len(".csv")]))
+    return sorted(journees)
+
+
+def calculer_empreintes(df):
+    """
+    Empreinte (uint64) de chaque ligne sur les colonnes suivies, hors id.
+    Les valeurs sont canonisees (numeriques en Float64, le reste en texte)
+    pour qu'une ligne relue depuis le CSV ait la meme empreinte.
+    """
+    colonnes = [c for c in COLONNES_SNAPSHOT if c in df.columns and c != 'id']
+    canon = pd.DataFrame(index=df.index)
+    for c in colonnes:
+        serie = df[c]
+        if pd.api.types.is_numeric_dtype(serie):
+            serie = serie.astype('Float64')
+        canon[c] = serie.astype('string').fillna('')
+    return pd.util.hash_pandas_object(canon, index=False).astype('uint64')
+
+
+def _dernieres_empreintes(chemin):
+    """Derniere empreinte connue de chaque joueur dans une partition (lecture de 2 colonnes)."""
+    if not os.path.exists(chemin):
+        return pd.Series(dtype='uint64')
+    existant = pd.read_csv(chemin, sep=";", encoding="utf-8", usecols=['id', 'empreinte'],
+                           dtype={'empreinte': 'uint64'})
+    return existant.drop_duplicates('id', keep='last').set_index('id')['empreinte']
+
+
+@profilage.profiler
+def enregistrer_snapshot(df, journee, date_scrape=None, dossier=DOSSIER_HISTORIQUE):
+    """
+    Ajoute un scrape a la partition de la journee.
+    Seules les lignes nouvelles ou modifiees depuis la derniere version du joueur sont ecrites.
+    Retourne le nombre de lignes ajoutees.
+    """
+    if date_scrape is None:
+        date_scrape = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+    chemin = chemin_partition(journee, dossier)
+    os.makedirs(dossier, exist_ok=True)
+
+    colonnes = [c for c in COLONNES_SNAPSHOT if c in df.columns]
+    snapshot = df[colonnes].copy()
+    snapshot['journee'] = int(journee)
+    snapshot['date_scrape'] = date_scrape
+    snapshot['empreinte'] = calculer_empreintes(df).values
+
+    precedentes = _dernieres_empreintes(chemin)
+    if len(precedentes) > 0:
+        connues = pd.MultiIndex.from_arrays([precedentes.index, precedentes.values])
+        nouvelles = pd.MultiIndex.from_arrays([snapshot['id'], snapshot['empreinte']])
+        snapshot = snapshot[~nouvelles.isin(connues)]
+
+    if len(snapshot) > 0:
+        nouveau_fichier = not os.path.exists(chemin)
+        snapshot.to_csv(chemin, mode='a', header=nouveau_fichier, index=False, sep=";", encoding="utf-8")
+
+    print(f"[OK] Historique journee {int(journee)}: {len(snapshot)} lignes ajoutees "
+          f"({len(df) - len(snapshot)} inchangees)")
+    return len(snapshot)
+
+
+def charger_journee(journee, dossier=DOSSIER_HISTORIQUE):
+    """Pool d'une journee : derniere version connue de chaque joueur (DataFrame vide si absente)."""
+    chemin = chemin_partition(journee, dossier)
+    if not os.path.exists(chemin):
+        return pd.DataFrame(columns=COLONNES_SNAPSHOT + COLONNES_META)
+
+    df = pd.read_csv(chemin, sep=";", encoding="utf-8", dtype={'empreinte': 'uint64'})
+    return df.drop_duplicates('id', keep='last').reset_index(drop=True)
+
+
+def _signature(dossier):
+    """Identifie l'etat des partitions (nom, taille, date de modification)."""
+    signature = []
+    for journee in journees_disponibles(dossier):
+        st = os.stat(chemin_partition(journee, dossier))
+        signature.append((journee, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def charger_historique(dossier=DOSSIER_HISTORIQUE):
+    """
+    Historique complet, indexe et trie par id puis journee/date de scrape.
+    Reutilise la version en memoire si aucune partition n'a change.
+    """
+    signature = _signature(dossier)
+    cache = _cache_historique.get(dossier)
+    if cache is not None and cache['signature'] == signature:
+        return cache['df']
+
+    morceaux = [
+        pd.read_csv(chemin_partition(j, dossier), sep=";", encoding="utf-8", dtype={'empreinte': 'uint64'})
+        for j, _, _ in signature
+    ]
+    if morceaux:
+        df = pd.concat(morceaux, ignore_index=True)
+    else:
+        df = pd.DataFrame(columns=COLONNES_SNAPSHOT + COLONNES_META)
+    df = df.sort_values(['id', 'journee', 'date_scrape'], kind='stable').set_index('id')
+
+    _cache_historique[dossier] = {'signature': signature, 'df': df}
+    return df
+
+
+def historique_joueur(id_joueur, dossier=DOSSIER_HISTORIQUE):
+    """Toutes les versions d'un joueur (une ou plusieurs par journee), de la plus ancienne a la plus recente."""
+    df = charger_historique(dossier)
+    if id_joueur not in df.index:
+        return df.iloc[0:0].reset_index()
+    return df.loc[[id_joueur]].reset_index()
+
+
+def historique_par_journee(dossier=DOSSIER_HISTORIQUE):
+    """Une ligne par joueur et par journee (derniere version de la journee), triee par id puis journee."""
+    df = charger_historique(dossier).reset_index()
+    return df.drop_duplicates(['id', 'journee'], keep='last').reset_index(drop=True)
@@ -0,0 +1,213 @@
+"""
+Index des joueurs par poste - Fantasy Rugby "La Grande Melee"
+Repond en O(log n) a la question que se posent tous les solveurs :
+"meilleur joueur libre au poste P qui coute au plus B millions".
+
+- Par poste, les joueurs sont tries par prix croissant : les joueurs abordables
+  forment un prefixe (recherche dichotomique)
+- Un arbre de segments sur cet ordre donne le meilleur joueur libre du prefixe ;
+  marquer un joueur pris ou libre est une mise a jour ponctuelle
+- Les joueurs sont classes une fois pour toutes (score decroissant, puis ordre
+  dans le pool) : meme departage qu'un tri stable ou qu'un idxmax sur le DataFrame
+- Stockage en tableaux types (array / numpy), sans objet Python par joueur
+
+Usage (solveurs, exploration interactive) :
+    index = IndexJoueurs(df)
+    joueur = index.meilleur('Pilier', 12.5)   # JoueurSelectionne ou None
+    index.marquer_utilise(joueur.id)
+    index.meilleur(budget_max=8)              # Tous postes confondus
+"""
+
+import bisect
+import math
+from array import array
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class JoueurSelectionne(NamedTuple):
+    """Joueur retenu par un solveur (enregistrement leger, sans __dict__ par instance)."""
+    ligne: object            # Etiquette de la ligne dans le pool
+    id: int
+    position: str
+    valeur: float
+    score: float
+
+
+class IndexPosition:
+    """Joueurs d'un poste tries par prix, avec arbre de segments du meilleur joueur libre."""
+
+    def __init__(self, lignes, valeurs, priorites):
+        """
+        lignes: positions des joueurs du poste dans le pool, deja triees par prix croissant
+        valeurs: prix correspondants ; priorites: rang de classement (0 = meilleur joueur du pool)
+        """
+        self.lignes = _tableau('i', lignes)
+        self.valeurs = _tableau('d', valeurs)
+        self._priorites = _tableau('i', priorites)
+        nb = len(self.lignes)
+        self._taille = 1
+        while self._taille < nb:
+            self._taille *= 2
+
+        # Noeud -> feuille (indice dans le poste) du meilleur joueur libre, -1 si aucun.
+        # Construction vectorisee, un niveau de l'arbre a la fois
+        arbre = np.full(2 * self._taille, -1, dtype=np.int32)
+        arbre[self._taille:self._taille + nb] = np.arange(nb)
+        priorites_ext = np.append(priorites, np.iinfo(np.int32).max)  # Indice -1 : aucune feuille
+        debut = self._taille
+        while debut > 1:
+            gauche, droite = arbre[debut:2 * debut:2], arbre[debut + 1:2 * debut:2]
+            arbre[debut // 2:debut] = np.where(priorites_ext[gauche] <= priorites_ext[droite], gauche, droite)
+            debut //= 2
+        self._arbre = _tableau('i', arbre)
+
+    def __len__(self):
+        return len(self.lignes)
+
+    def priorite(self, feuille):
+        return self._priorites[feuille]
+
+    def _meilleure_feuille(self, a, b):
+        if a < 0:
+            return b
+        if b < 0 or self._priorites[a] < self._priorites[b]:
+            return a
+        return b
+
+    def meilleure_feuille(self, budget_max=math.inf):
+        """Feuille du meilleur joueur libre de prix <= budget_max (-1 si aucun)."""
+        fin = bisect.bisect_right(self.valeurs, budget_max)
+        meilleure = -1
+        gauche, droite = self._taille, self._taille + fin
+        while gauche < droite:
+            if gauche & 1:
+                meilleure = self._meilleure_feuille(meilleure, self._arbre[gauche])
+                gauche += 1
+            if droite & 1:
+                droite -= 1
+                meilleure = self._meilleure_feuille(meilleure, self._arbre[droite])
+            gauche //= 2
+            droite //= 2
+        return meilleure
+
+    def marquer(self, feuille, utilise):
+        """Marque le joueur d'une feuille comme pris (utilise=True) ou libre."""
+        noeud = self._taille + feuille
+        self._arbre[noeud] = -1 if utilise else feuille
+        noeud //= 2
+        while noeud:
+            self._arbre[noeud] = self._meilleure_feuille(self._arbre[2 * noeud], self._arbre[2 * noeud + 1])
+            noeud //= 2
+
+    def est_utilise(self, feuille):
+        return self._arbre[self._taille + feuille] < 0
+
+
+class IndexJoueurs:
+    """
+    Index des requetes "meilleur joueur libre sous X M" sur un pool de joueurs.
+    colonne: score maximise (defaut: score_predictif) ; un score manquant passe en dernier.
+    Les joueurs sans prix sont ignores. Les joueurs sont marques pris / libres par id,
+    sans modifier le DataFrame.
+    """
+
+    def __init__(self, df, colonne='score_predictif'):
+        self._df = df
+        self._ids = df['id'].to_numpy()
+        self._valeurs = df['valeur'].to_numpy(dtype=float)
+        self._scores = df[colonne].to_numpy(dtype=float)
+        codes_postes, postes = pd.factorize(df['position'])
+
+        # Classement global : score decroissant, puis ordre dans le pool
+        classement = np.argsort(-np.nan_to_num(self._scores, nan=-np.inf), kind='stable')
+        priorites = np.empty(len(df), dtype=np.int32)
+        priorites[classement] = np.arange(len(df), dtype=np.int32)
+
+        self.postes = {}
+        # Ligne du pool -> poste (numero dans self.postes, -1 : hors index) et feuille dans ce poste
+        self._numeros_postes = np.full(len(df), -1, dtype=np.int32)
+        self._feuilles = np.zeros(len(df), dtype=np.int32)
+        valides = ~np.isnan(self._valeurs)
+        for code in np.unique(codes_postes[valides]):
+            position = postes[code]
+            numero = len(self.postes)
+            lignes = np.flatnonzero(valides & (codes_postes == code))
+            lignes = lignes[np.argsort(self._valeurs[lignes], kind='stable')]
+            self.postes[position] = IndexPosition(lignes, self._valeurs[lignes], priorites[lignes])
+            self._numeros_postes[lignes] = numero
+            self._feuilles[lignes] = np.arange(len(lignes))
+        self._liste_postes = list(self.postes.values())
+        # Recherche d'un id par dichotomie (pas de dict id -> ligne)
+        self._ordre_ids = np.argsort(self._ids, kind='stable')
+        self._ids_tries = self._ids[self._ordre_ids]
+
+    def __len__(self):
+        return int((self._numeros_postes >= 0).sum())
+
+    def __contains__(self, id_joueur):
+        return self._emplacement(id_joueur) is not None
+
+    def _emplacement(self, id_joueur):
+        """(IndexPosition, feuille) d'un id, ou None s'il n'est pas indexe."""
+        k = int(np.searchsorted(self._ids_tries, id_joueur))
+        if k >= len(self._ids_tries) or self._ids_tries[k] != id_joueur:
+            return None
+        ligne = self._ordre_ids[k]
+        numero = self._numeros_postes[ligne]
+        if numero < 0:
+            return None
+        return self._liste_postes[numero], int(self._feuilles[ligne])
+
+    def meilleur(self, position=None, budget_max=math.inf):
+        """
+        Meilleur joueur libre de prix <= budget_max au poste donne (None : tous postes).
+        Retourne un JoueurSelectionne, ou None si aucun joueur ne convient.
+        """
+        if position is not None:
+            postes = [(position, self.postes[position])] if position in self.postes else []
+        else:
+            postes = self.postes.items()
+
+        meilleur_poste, meilleure = None, -1
+        for poste, index_poste in postes:
+            feuille = index_poste.meilleure_feuille(budget_max)
+            if feuille >= 0 and (meilleur_poste is None or
+                                 index_poste.priorite(feuille) < self.postes[meilleur_poste].priorite(meilleure)):
+                meilleur_poste, meilleure = poste, feuille
+        if meilleur_poste is None:
+            return None
+        i = self.postes[meilleur_poste].lignes[meilleure]
+        return JoueurSelectionne(self._df.index[i], int(self._ids[i]), meilleur_poste,
+                                 float(self._valeurs[i]), float(self._scores[i]))
+
+    def marquer_utilise(self, *ids):
+        """Marque des joueurs comme pris (ids absents de l'index ignores)."""
+        self._marquer(ids, True)
+
+    def marquer_libre(self, *ids):
+        """Rend des joueurs disponibles (ids absents de l'index ignores)."""
+        self._marquer(ids, False)
+
+    def _marquer(self, ids, utilise):
+        for id_joueur in ids:
+            emplacement = self._emplacement(id_joueur)
+            if emplacement is not None:
+                index_poste, feuille = emplacement
+                index_poste.marquer(feuille, utilise)
+
+    def est_utilise(self, id_joueur):
+        emplacement = self._emplacement(id_joueur)
+        if emplacement is None:
+            raise KeyError(id_joueur)
+        index_poste, feuille = emplacement
+        return index_poste.est_utilise(feuille)
+
+
+def _tableau(code, valeurs):
+    """Tableau array.array : acces element par element aussi rapide qu'une liste, sans objet par valeur."""
+    tableau = array(code)
+    tableau.frombytes(np.ascontiguousarray(valeurs, dtype='int32' if code == 'i' else 'float64').tobytes())
+    return tableau
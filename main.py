@@ -12,14 +12,25 @@ Usage:
     python main.py --url-compos URL             # URL specifique des compos
     python main.py --budget 250                 # Budget personnalise
     python main.py --skip-scrape                # Ne pas re-scraper (utiliser les CSV existants)
+    python main.py --offline                    # Rejouer les reponses HTTP en cache (sans reseau)
+    python main.py --watch                      # Puis surveiller la publication des compos
+    python main.py --profile                    # Mesurer temps/CPU/memoire par etape
+    python main.py --forme-historique           # Forme depuis l'historique des journees
+    python main.py --notations                  # Notations attaque/defense des clubs
+    python main.py --lot equipes.json           # Optimiser plusieurs equipes (voir optimisation_lot.py)
 """
 
 import subprocess
 import sys
 import os
 import argparse
+import atexit
+import time
 from datetime import datetime
 
+import cache_http
+import profilage
+
 
 def run_script(script_name, args=None, description=""):
     """Execute un script Python et affiche le resultat."""
@@ -32,7 +43,11 @@ def run_script(script_name, args=None, description=""):
     if args:
         cmd.extend(args)
     
+    debut = time.perf_counter()
     result = subprocess.run(cmd, capture_output=False, text=True)
+    if profilage.actif():
+        profilage.enregistrer_etape(description, script_name, time.perf_counter() - debut,
+                                    succes=result.returncode == 0)
     
     if result.returncode != 0:
         print(f"[ERREUR] Erreur lors de l'execution de {script_name}")
@@ -54,15 +69,38 @@ def main():
                        help='Ne pas re-scraper les donnees (utiliser CSV existants)')
     parser.add_argument('--inclure-remplacants', action='store_true',
                        help='Inclure les remplacants reels dans la pool de joueurs')
+    parser.add_argument('--offline', action='store_true',
+                       help='Rejouer les reponses HTTP en cache, sans acces reseau')
+    parser.add_argument('--watch', action='store_true',
+                       help='Apres le pipeline, surveiller compos et prix et re-optimiser a chaque changement')
+    parser.add_argument('--intervalle', type=int, default=30,
+                       help='Secondes entre deux verifications en mode --watch (defaut: 30)')
+    parser.add_argument('--lot', type=str, default=None, metavar='FICHIER',
+                       help='Optimiser un lot de configurations (JSON/YAML) au lieu d\'une seule equipe')
+    parser.add_argument('--forme-historique', action='store_true',
+                       help='Scorer la forme depuis l\'historique des journees (points, titularisations)')
+    parser.add_argument('--notations', action='store_true',
+                       help='Bonus equipe/adversaire depuis les notations attaque/defense des clubs')
+    parser.add_argument('--profile', action='store_true',
+                       help='Profiler chaque etape (trace JSON dans output/profils/ + resume)')
     
     args = parser.parse_args()
     
+    # Propage aux sous-scripts via l'environnement
+    if args.offline:
+        cache_http.activer_mode_offline()
+    if args.profile:
+        profilage.activer()
+        atexit.register(profilage.finaliser)
+    
     print("=" * 60)
     print("PIPELINE FANTASY RUGBY - LA GRANDE MELEE")
     print("=" * 60)
     print(f"   Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
     print(f"   Budget: {args.budget}M")
     print(f"   Skip scrape: {args.skip_scrape}")
+    print(f"   Offline: {args.offline}")
+    print(f"   Watch: {args.watch}")
     
     # Etape 1: Scraper les joueurs Fantasy
     if not args.skip_scrape:
@@ -105,24 +143,38 @@ def main():
         print("\n[SKIP] Etape 3 ignoree (--skip-scrape)")
     
     # Etape 4: Calculer les scores predictifs
+    score_args = []
+    if args.forme_historique:
+        score_args.append("--forme-historique")
+    if args.notations:
+        score_args.append("--notations")
+    
     success = run_script(
         "score_predictif.py",
+        args=score_args if score_args else None,
         description="Etape 4/5 - Calcul des scores predictifs"
     )
     if not success:
         print("[ERREUR] Pipeline interrompu a l'etape 4")
         return 1
     
-    # Etape 5: Optimiser la composition
-    optim_args = ["--budget", str(args.budget)]
-    if args.inclure_remplacants:
-        optim_args.append("--remplacants")
-    
-    success = run_script(
-        "optimiseur_compo.py",
-        args=optim_args,
-        description="Etape 5/5 - Optimisation de la composition"
-    )
+    # Etape 5: Optimiser la composition (ou chaque equipe du lot)
+    if args.lot:
+        success = run_script(
+            "optimisation_lot.py",
+            args=[args.lot],
+            description="Etape 5/5 - Optimisation du lot de compositions"
+        )
+    else:
+        optim_args = ["--budget", str(args.budget)]
+        if args.inclure_remplacants:
+            optim_args.append("--remplacants")
+        
+        success = run_script(
+            "optimiseur_compo.py",
+            args=optim_args,
+            description="Etape 5/5 - Optimisation de la composition"
+        )
     if not success:
         print("[ERREUR] Pipeline interrompu a l'etape 5")
         return 1
@@ -135,7 +187,24 @@ def main():
     print("   - output/joueurs_lagrandemelee_complet.csv - Tous les joueurs")
     print("   - output/joueurs_enrichis.csv - Joueurs avec statut compo")
     print("   - output/joueurs_avec_score.csv - Joueurs avec score predictif")
-    print("   - output/ma_composition.csv - Composition optimale (18 joueurs)")
+    if args.lot:
+        print("   - output/lots/ - Une composition par configuration + resume_lot.csv")
+    else:
+        print("   - output/ma_composition.csv - Composition optimale (18 joueurs)")
+        print("   - output/shortlist.csv - Joueurs les plus proches d'entrer dans la composition")
+    
+    if args.watch:
+        import scrape_compos
+        import surveillance
+        
+        url_compos = args.url_compos or scrape_compos.trouver_url_compos()
+        if not url_compos:
+            print("[ERREUR] URL des compositions introuvable, utilisez --url-compos")
+            return 1
+        return surveillance.surveiller(url_compos, args.budget, inclure_remplacants=args.inclure_remplacants,
+                                       intervalle=args.intervalle, avec_forme_historique=args.forme_historique,
+                                       avec_notations=args.notations)
+    
     print("\nProchaine etape: Ouvre output/ma_composition.csv pour voir ta composition !")
     
     return 0
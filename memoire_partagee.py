@@ -0,0 +1,97 @@
+"""
+Pool de joueurs en memoire partagee - Fantasy Rugby "La Grande Melee"
+Les processus de travail (optimisation par lot, simulations) lisent le pool score
+sans qu'il soit serialise puis copie dans chacun d'eux :
+
+- Le processus principal exporte une fois les colonnes utiles dans un bloc
+  multiprocessing.shared_memory (colonnes a type fixe, cote a cote)
+- Un processus de travail s'y attache en lecture seule : le DataFrame obtenu
+  pointe directement dans le bloc (aucune copie, demarrage en temps constant)
+- Les colonnes texte sont stockees en codes entiers (categories), leurs libelles
+  voyagent dans le descripteur
+- Seul le descripteur (nom du bloc, types, decalages) est transmis aux processus
+
+Usage:
+    bloc, descripteur = exporter_pool(df)          # Processus principal
+    bloc_lu, df = attacher_pool(descripteur)       # Processus de travail (garder bloc_lu)
+    liberer(bloc)                                  # Processus principal, en fin de travail
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+# Colonnes lues par les solveurs (objectifs compris)
+COLONNES_PARTAGEES = ['id', 'position', 'valeur', 'score_predictif', 'rapport_qp', 'stat_moy']
+ALIGNEMENT = 8  # Octets
+
+
+def _colonne_fixe(serie):
+    """(tableau numpy a type fixe, categories ou None) pour une colonne du pool."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.array.codes, list(serie.cat.categories)
+    if serie.dtype.kind in 'biuf':
+        return serie.to_numpy(), None
+    codes, categories = pd.factorize(serie)
+    return codes.astype(np.int32), list(categories)
+
+
+def exporter_pool(df, colonnes=None):
+    """
+    Copie les colonnes du pool (defaut: COLONNES_PARTAGEES presentes) dans un bloc
+    de memoire partagee. Retourne (bloc, descripteur) ; le descripteur est un petit
+    dict serialisable a transmettre aux processus. L'index du DataFrame n'est pas
+    conserve (lignes numerotees 0..n-1).
+    """
+    if colonnes is None:
+        colonnes = [c for c in COLONNES_PARTAGEES if c in df.columns]
+    tableaux = []
+    descripteur = {'lignes': len(df), 'colonnes': []}
+    taille = 0
+    for nom in colonnes:
+        tableau, categories = _colonne_fixe(df[nom])
+        tableaux.append(tableau)
+        descripteur['colonnes'].append({
+            'nom': nom,
+            'dtype': tableau.dtype.str,
+            'decalage': taille,
+            'categories': categories,
+        })
+        taille += -(-tableau.nbytes // ALIGNEMENT) * ALIGNEMENT
+
+    bloc = shared_memory.SharedMemory(create=True, size=max(taille, 1))
+    for tableau, colonne in zip(tableaux, descripteur['colonnes']):
+        vue = np.ndarray(len(df), dtype=tableau.dtype, buffer=bloc.buf, offset=colonne['decalage'])
+        vue[:] = tableau
+    descripteur['bloc'] = bloc.name
+    return bloc, descripteur
+
+
+def attacher_pool(descripteur):
+    """
+    S'attache au bloc decrit et retourne (bloc, df) : df lit directement la memoire
+    partagee, en lecture seule. Garder une reference a bloc tant que df est utilise.
+    Le bloc reste a la charge du processus qui l'a cree (liberer) : les processus de
+    travail, ses descendants, partagent son suivi des ressources.
+    """
+    bloc = shared_memory.SharedMemory(name=descripteur['bloc'])
+    n = descripteur['lignes']
+    donnees = {}
+    for colonne in descripteur['colonnes']:
+        vue = np.ndarray(n, dtype=np.dtype(colonne['dtype']), buffer=bloc.buf, offset=colonne['decalage'])
+        vue.flags.writeable = False
+        if colonne['categories'] is not None:
+            vue = pd.Categorical.from_codes(vue, categories=colonne['categories'], validate=False)
+        donnees[colonne['nom']] = vue
+    return bloc, pd.DataFrame(donnees, copy=False)
+
+
+def liberer(bloc):
+    """Ferme et supprime un bloc cree par exporter_pool."""
+    bloc.close()
+    try:
+        bloc.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,357 @@
+"""
+Notations attaque / defense des clubs - Fantasy Rugby "La Grande Melee"
+Remplace le bonus adversaire lineaire sur le rang et la forme G/N/P de l'equipe par
+des notations de type Elo, ajustees match apres match :
+
+- Points attendus de A contre B : moyenne x exp(attaque_A - defense_B [+ domicile])
+- Apres chaque journee : ecart r = ln((observe + L) / (attendu + L)),
+  attaque_A += K x r, defense_B -= K x r (toutes les rencontres de la journee a la fois)
+- Groupe 'club' : score du match (output/calendrier_saison.csv)
+- Groupes de postes (avants, demis, arrieres) : points Fantasy moyens par joueur du groupe,
+  tires de l'historique des joueurs (output/historique_joueurs/)
+
+Un etat est conserve par journee (output/notations_clubs.npz) : l'ajout d'une journee
+n'applique que ses matchs, une journee corrigee n'est rejouee qu'a partir d'elle, et les
+notations a n'importe quelle journee passee (backtest) sont une simple lecture de tableau.
+Le score predictif lit les notations en tableaux (club x groupe), sans dict par joueur.
+
+Usage:
+    python notation_clubs.py                    # Notations apres la derniere journee jouee
+    python notation_clubs.py --journee 10       # Notations a l'issue de la journee 10
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import calcul_classement
+import forme_historique
+import historique_joueurs
+import scrape_classement
+
+# --- CONFIGURATION ---
+FICHIER_NOTATIONS = os.path.join(os.path.dirname(__file__), "output", "notations_clubs.npz")
+K_NOTATION = 0.08          # Pas de mise a jour par match (echelle log)
+K_DOMICILE = 0.02          # Pas de mise a jour de l'avantage du terrain
+LISSAGE_POINTS = 5.0       # Ajoute aux points observes et attendus (scores faibles)
+BORNES_BONUS = (0.80, 1.20)
+GROUPES = ['club', 'avants', 'demis', 'arrieres']
+GROUPES_POSTES = {
+    'lib_pilier': 'avants', 'lib_talonneur': 'avants', 'lib_2emeligne': 'avants', 'lib_3emeligne': 'avants',
+    'lib_12melee': 'demis', 'lib_ouverture': 'demis',
+    'lib_34centre': 'arrieres', 'lib_34aile': 'arrieres', 'lib_arriere': 'arrieres',
+}
+
+
+def codes_clubs(noms, clubs):
+    """Indice de chaque nom de club (brut ou normalise) dans clubs, -1 si inconnu. Un calcul par nom distinct."""
+    codes, libelles = pd.factorize(pd.Series(noms).astype(object))
+    numeros = {club: i for i, club in enumerate(clubs)}
+    correspondance = np.array([numeros.get(scrape_classement.normaliser_nom_club(str(nom)), -1) for nom in libelles]
+                              + [-1], dtype=np.int32)
+    return correspondance[codes]
+
+
+def codes_groupes(positions):
+    """Indice du groupe de postes de chaque joueur dans GROUPES (0 : 'club' si poste inconnu)."""
+    numeros = {poste: GROUPES.index(groupe) for poste, groupe in GROUPES_POSTES.items()}
+    return pd.Series(positions).astype(object).map(numeros).fillna(0).to_numpy(dtype=np.int32)
+
+
+def _matchs_par_journee(matchs, clubs):
+    """{journee: (dom, ext, score_dom, score_ext)} en tableaux, matchs joues seulement."""
+    numeros = {club: i for i, club in enumerate(clubs)}
+    par_journee = {}
+    for m in matchs:
+        if m.get('joue') and m['score_dom'] is not None and m['score_ext'] is not None:
+            par_journee.setdefault(int(m['journee']), []).append(m)
+    return {
+        j: (np.array([numeros[m['club_dom']] for m in ms]), np.array([numeros[m['club_ext']] for m in ms]),
+            np.array([m['score_dom'] for m in ms], dtype=float), np.array([m['score_ext'] for m in ms], dtype=float))
+        for j, ms in par_journee.items()
+    }
+
+
+def points_par_groupe(historique, clubs):
+    """
+    Points Fantasy moyens par joueur, par journee de match, club et groupe de postes.
+    Les points entre deux snapshots sont attribues a la journee precedant le second.
+    Retourne {journee: tableau (clubs x GROUPES), NaN sans observation}.
+    """
+    observations = forme_historique.observations_historique(historique)
+    observations = observations[observations['points'].notna()]
+    if len(observations) == 0:
+        return {}
+    club = codes_clubs(observations['club'], clubs)
+    groupe = codes_groupes(observations['position'])
+    journee = observations['journee'].to_numpy(dtype=np.int64) - 1
+    valides = (club >= 0) & (groupe > 0)
+    moyennes = pd.Series(observations['points'].to_numpy()[valides]).groupby(
+        [journee[valides], club[valides], groupe[valides]]).mean()
+
+    resultat = {}
+    for (j, c, g), points in moyennes.items():
+        if j not in resultat:
+            resultat[j] = np.full((len(clubs), len(GROUPES)), np.nan)
+        resultat[j][c, g] = points
+    return resultat
+
+
+def _empreinte(matchs_journee, points):
+    h = hashlib.sha1()
+    for tableau in matchs_journee:
+        h.update(np.ascontiguousarray(tableau).tobytes())
+    if points is not None:
+        h.update(np.ascontiguousarray(points).tobytes())
+    return h.hexdigest()
+
+
+def notations_vides(clubs):
+    """Notations sans aucune journee appliquee."""
+    nb_clubs, nb_groupes = len(clubs), len(GROUPES)
+    return {
+        'clubs': np.array(clubs, dtype=str),
+        'journees': np.zeros(0, dtype=np.int16),
+        'empreintes': np.zeros(0, dtype='U40'),
+        'attaque': np.zeros((0, nb_clubs, nb_groupes)),
+        'defense': np.zeros((0, nb_clubs, nb_groupes)),
+        'domicile': np.zeros((0, nb_groupes)),
+        'somme_points': np.zeros((0, nb_groupes)),
+        'nb_points': np.zeros((0, nb_groupes)),
+    }
+
+
+def appliquer_journee(etat, matchs_journee, points):
+    """
+    Applique une journee a un etat (dict attaque, defense, domicile, somme_points, nb_points
+    pour une journee) et retourne le nouvel etat. Toutes les rencontres de la journee sont
+    evaluees avec les notations d'avant la journee, puis appliquees ensemble.
+    """
+    dom, ext, score_dom, score_ext = matchs_journee
+    attaque, defense = etat['attaque'].copy(), etat['defense'].copy()
+    domicile = etat['domicile'].copy()
+    somme, nombre = etat['somme_points'].copy(), etat['nb_points'].copy()
+
+    # Observations (rencontre x groupe) : score du match puis points par groupe de postes
+    obs_dom = np.full((len(dom), len(GROUPES)), np.nan)
+    obs_ext = np.full((len(dom), len(GROUPES)), np.nan)
+    obs_dom[:, 0], obs_ext[:, 0] = score_dom, score_ext
+    if points is not None:
+        obs_dom[:, 1:], obs_ext[:, 1:] = points[dom, 1:], points[ext, 1:]
+
+    # Moyenne de reference : moyenne des journees precedentes (ou de celle-ci pour la premiere)
+    observes = np.concatenate([obs_dom, obs_ext])
+    nb_journee = (~np.isnan(observes)).sum(axis=0)
+    somme_journee = np.nansum(observes, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moyenne = np.where(nombre > 0, somme / nombre, somme_journee / nb_journee)
+
+    attendu_dom = moyenne * np.exp(attaque[dom] - defense[ext] + domicile)
+    attendu_ext = moyenne * np.exp(attaque[ext] - defense[dom])
+    # Points Fantasy negatifs possibles : observe + L borne a 1
+    r_dom = np.nan_to_num(np.log(np.maximum(obs_dom + LISSAGE_POINTS, 1) / (attendu_dom + LISSAGE_POINTS)))
+    r_ext = np.nan_to_num(np.log(np.maximum(obs_ext + LISSAGE_POINTS, 1) / (attendu_ext + LISSAGE_POINTS)))
+
+    np.add.at(attaque, dom, K_NOTATION * r_dom)
+    np.add.at(defense, ext, -K_NOTATION * r_dom)
+    np.add.at(attaque, ext, K_NOTATION * r_ext)
+    np.add.at(defense, dom, -K_NOTATION * r_ext)
+    domicile += K_DOMICILE * (r_dom - r_ext).sum(axis=0) / 2
+
+    # Notations centrees : niveau moyen porte par la moyenne observee, pas par une derive des notations
+    attaque -= attaque.mean(axis=0)
+    defense -= defense.mean(axis=0)
+
+    return {
+        'attaque': attaque, 'defense': defense, 'domicile': domicile,
+        'somme_points': somme + somme_journee, 'nb_points': nombre + nb_journee,
+    }
+
+
+def mettre_a_jour(notations, matchs, historique):
+    """
+    Met a jour les notations avec les matchs joues (format calendrier_saison) et l'historique
+    des joueurs. Seules les journees nouvelles ou modifiees (et les suivantes) sont rejouees.
+    Retourne (notations, journees recalculees).
+    """
+    clubs = list(notations['clubs'])
+    par_journee = _matchs_par_journee(matchs, clubs)
+    points = points_par_groupe(historique, clubs)
+    journees = sorted(par_journee)
+    empreintes = {j: _empreinte(par_journee[j], points.get(j)) for j in journees}
+
+    # Premiere journee modifiee depuis le dernier calcul
+    anciennes = dict(zip(notations['journees'].tolist(), notations['empreintes'].tolist()))
+    premiere_modifiee = None
+    for j in sorted(set(journees) | set(anciennes)):
+        if anciennes.get(j) != empreintes.get(j):
+            premiere_modifiee = j
+            break
+    if premiere_modifiee is None:
+        return notations, []
+
+    conservees = int(np.searchsorted(notations['journees'], premiere_modifiee))
+    tableaux = {nom: list(notations[nom][:conservees]) for nom in
+                ('journees', 'empreintes', 'attaque', 'defense', 'domicile', 'somme_points', 'nb_points')}
+    if conservees > 0:
+        etat = {nom: tableaux[nom][-1] for nom in ('attaque', 'defense', 'domicile', 'somme_points', 'nb_points')}
+    else:
+        etat = {
+            'attaque': np.zeros((len(clubs), len(GROUPES))), 'defense': np.zeros((len(clubs), len(GROUPES))),
+            'domicile': np.zeros(len(GROUPES)), 'somme_points': np.zeros(len(GROUPES)),
+            'nb_points': np.zeros(len(GROUPES)),
+        }
+
+    recalculees = []
+    for j in journees:
+        if j < premiere_modifiee:
+            continue
+        etat = appliquer_journee(etat, par_journee[j], points.get(j))
+        tableaux['journees'].append(j)
+        tableaux['empreintes'].append(empreintes[j])
+        for nom, valeur in etat.items():
+            tableaux[nom].append(valeur)
+        recalculees.append(j)
+
+    resultat = notations_vides(clubs)
+    for nom, valeurs in tableaux.items():
+        if valeurs:
+            resultat[nom] = np.array(valeurs, dtype=resultat[nom].dtype)
+    return resultat, recalculees
+
+
+def notations_a_la_journee(notations, journee=None):
+    """
+    Notations a l'issue d'une journee (defaut : derniere journee calculee), par recherche
+    dichotomique. Retourne un dict clubs, attaque et defense (clubs x GROUPES), domicile (GROUPES),
+    ou None si aucune journee <= journee n'a ete jouee.
+    """
+    if journee is None:
+        k = len(notations['journees'])
+    else:
+        k = int(np.searchsorted(notations['journees'], journee, side='right'))
+    if k == 0:
+        return None
+    return {
+        'clubs': notations['clubs'],
+        'journee': int(notations['journees'][k - 1]),
+        'attaque': notations['attaque'][k - 1],
+        'defense': notations['defense'][k - 1],
+        'domicile': notations['domicile'][k - 1],
+    }
+
+
+def charger_notations(fichier=FICHIER_NOTATIONS):
+    """Notations persistees (None si absentes ou illisibles)."""
+    if not os.path.exists(fichier):
+        return None
+    try:
+        with np.load(fichier, allow_pickle=False) as f:
+            return {nom: f[nom] for nom in f.files}
+    except (OSError, ValueError):
+        print(f"[WARN] Notations illisibles, recalcul complet: {fichier}")
+        return None
+
+
+def sauvegarder_notations(notations, fichier=FICHIER_NOTATIONS):
+    """Sauvegarde les notations (ecriture atomique)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(fichier), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **notations)
+        os.replace(tmp, fichier)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def notations_a_jour(fichier_calendrier=scrape_classement.FICHIER_CALENDRIER,
+                     dossier_historique=historique_joueurs.DOSSIER_HISTORIQUE, fichier=FICHIER_NOTATIONS):
+    """Notations persistees, mises a jour avec le calendrier et l'historique des joueurs."""
+    if not os.path.exists(fichier_calendrier):
+        print(f"[WARN] Calendrier introuvable: {fichier_calendrier}")
+        return None
+    matchs = calcul_classement.charger_matchs_calendrier(fichier_calendrier)
+    clubs = sorted({m['club_dom'] for m in matchs} | {m['club_ext'] for m in matchs})
+
+    notations = charger_notations(fichier)
+    if notations is None or list(notations['clubs']) != clubs:
+        notations = notations_vides(clubs)
+    notations, recalculees = mettre_a_jour(notations, matchs, historique_joueurs.historique_par_journee(dossier_historique))
+    if recalculees:
+        sauvegarder_notations(notations, fichier)
+        print(f"[OK] Notations des clubs: journees {recalculees[0]} a {recalculees[-1]} calculees")
+    return notations
+
+
+def bonus_notations(df, notations_journee):
+    """
+    Bonus equipe et adversaire de chaque joueur de df, lus dans les tableaux de notations
+    (club x groupe de postes, groupe 'club' si le groupe du joueur n'a pas d'observation).
+    Retourne (bonus_equipe, bonus_adversaire) en tableaux numpy, 1.0 pour un club inconnu.
+    """
+    clubs = list(notations_journee['clubs'])
+    club = codes_clubs(df['club'], clubs)
+    adversaire = codes_clubs(df['adversaire'], clubs)
+    groupe = codes_groupes(df['position'])
+
+    # Ligne supplementaire (indice -1) : club inconnu, bonus neutre
+    equipe, contre = multiplicateurs(notations_journee)
+    equipe = np.vstack([equipe, np.ones((1, len(GROUPES)))])
+    contre = np.vstack([contre, np.ones((1, len(GROUPES)))])
+    return equipe[club, groupe], contre[adversaire, groupe]
+
+
+def multiplicateurs(notations_journee):
+    """
+    Bonus par club et groupe de postes (tableaux clubs x GROUPES, bornes a BORNES_BONUS) :
+    equipe (attaque du club) et contre (bonus des joueurs qui affrontent ce club, depuis sa defense).
+    Un groupe sans observation (notations toutes nulles) reprend le groupe 'club'.
+    """
+    observes = np.any(notations_journee['attaque'] != 0, axis=0)
+    groupes = np.where(observes, np.arange(len(GROUPES)), 0)
+    equipe = np.clip(np.exp(notations_journee['attaque'][:, groupes]), *BORNES_BONUS)
+    contre = np.clip(np.exp(-notations_journee['defense'][:, groupes]), *BORNES_BONUS)
+    return equipe, contre
+
+
+def afficher(notations_journee):
+    """Table des notations (multiplicateurs) par club, du plus fort au plus faible."""
+    table = pd.DataFrame(index=notations_journee['clubs'])
+    for g, groupe in enumerate(GROUPES):
+        table[f"att_{groupe}"] = np.round(np.exp(notations_journee['attaque'][:, g]), 3)
+        table[f"def_{groupe}"] = np.round(np.exp(notations_journee['defense'][:, g]), 3)
+    table = table.loc[(table['att_club'] * table['def_club']).sort_values(ascending=False).index]
+    print(f"Notations a l'issue de la journee {notations_journee['journee']} "
+          f"(> 1 : attaque prolifique / defense solide)")
+    print(table.to_string())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notations attaque / defense des clubs')
+    parser.add_argument('--journee', type=int, default=None,
+                        help='Notations a l\'issue de cette journee (defaut: derniere journee jouee)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("NOTATIONS ATTAQUE / DEFENSE DES CLUBS")
+    print("=" * 60)
+
+    notations = notations_a_jour()
+    if notations is None:
+        return
+    notations_journee = notations_a_la_journee(notations, args.journee)
+    if notations_journee is None:
+        print("[WARN] Aucune journee jouee")
+        return
+    afficher(notations_journee)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Optimisation par lot - Fantasy Rugby "La Grande Melee"
+Optimise plusieurs equipes en une fois (budgets, verrous, exclus, objectifs, solveurs) :
+
+- Le pool score est charge une seule fois, puis filtre une fois par variante
+  (titulaires seuls / titulaires + remplacants)
+- Les pools filtres sont exportes une fois en memoire partagee : chaque processus
+  de travail s'y attache sans copie (voir memoire_partagee.py), et les
+  configurations sont reparties sur les coeurs
+- Un fichier de composition par configuration (format de ma_composition.csv)
+  et un recapitulatif du lot (resume_lot.csv)
+- Les configurations deja calculees sur le meme pool sont relues du cache des
+  resultats (voir cache_resultats.py)
+
+Fichier de lot (JSON, ou YAML si PyYAML est installe) : liste de configurations
+    [
+      {"nom": "equipe_a", "budget": 300},
+      {"nom": "equipe_b", "budget": 250, "verrous": [123], "exclus": [456],
+       "objectif": "rapport_qp", "solveur": "recuit", "remplacants": true}
+    ]
+Cles : nom, budget, verrous, exclus, objectif, solveur, iterations, temps_max, graine, remplacants
+
+Usage:
+    python optimisation_lot.py lot.json
+    python optimisation_lot.py lot.yaml --processus 4 --dossier output/lots
+    python optimisation_lot.py lot.json --sans-cache
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import yaml
+except ImportError:  # PyYAML optionnel : lots en JSON uniquement
+    yaml = None
+
+import cache_resultats
+import memoire_partagee
+import optimiseur_compo
+
+# --- CONFIGURATION ---
+DOSSIER_LOTS = os.path.join(os.path.dirname(__file__), "output", "lots")
+FICHIER_RESUME = "resume_lot.csv"
+CLES_CONFIG = {'nom', 'budget', 'verrous', 'exclus', 'objectif', 'solveur', 'iterations',
+               'temps_max', 'graine', 'remplacants'}
+COLONNES_RESUME = ['nom', 'budget', 'solveur', 'objectif', 'score_predictif', 'budget_utilise',
+                   'joueurs', 'complete', 'depuis_cache', 'duree_s', 'fichier', 'erreur']
+
+# Pools filtres du processus courant : {inclure_remplacants: df}
+_pools = {}
+# Blocs de memoire partagee des pools (processus de travail)
+_blocs = []
+# Empreintes des pools pour le cache des resultats (vide : cache desactive)
+_empreintes = {}
+
+
+def valider_configs(configs):
+    """Verifie les configurations et nomme celles qui n'ont pas de nom. Leve ValueError."""
+    if not isinstance(configs, list) or not configs:
+        raise ValueError("Le lot doit etre une liste non vide de configurations")
+    noms = set()
+    valides = []
+    for i, config in enumerate(configs, start=1):
+        if not isinstance(config, dict):
+            raise ValueError(f"Configuration {i}: objet attendu")
+        inconnues = set(config) - CLES_CONFIG
+        if inconnues:
+            raise ValueError(f"Configuration {i}: cles inconnues {sorted(inconnues)}")
+        config = {'nom': f"config_{i}", **config}
+        config['nom'] = str(config['nom'])
+        if config['nom'] in noms:
+            raise ValueError(f"Nom de configuration en double: {config['nom']}")
+        noms.add(config['nom'])
+        valides.append(config)
+    return valides
+
+
+def charger_configs(fichier):
+    """Lit un fichier de lot JSON ou YAML. Leve ValueError s'il est invalide."""
+    with open(fichier, 'r', encoding='utf-8') as f:
+        if fichier.lower().endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("PyYAML est requis pour les lots YAML (pip install pyyaml)")
+            configs = yaml.safe_load(f)
+        else:
+            configs = json.load(f)
+    return valider_configs(configs)
+
+
+def preparer_pools(configs, df=None):
+    """Charge le pool score (une fois) et le filtre pour chaque variante utilisee par le lot."""
+    if df is None:
+        df = optimiseur_compo.charger_joueurs()
+    pools = {}
+    for remplacants in sorted({bool(c.get('remplacants', False)) for c in configs}):
+        pools[remplacants] = optimiseur_compo.filtrer_joueurs_disponibles(
+            df, inclure_remplacants=remplacants
+        ).reset_index(drop=True)
+    return pools
+
+
+def _initialiser_processus(pools, empreintes=None):
+    _pools.clear()
+    _pools.update(pools)
+    _empreintes.clear()
+    _empreintes.update(empreintes or {})
+
+
+def _attacher_processus(descripteurs, empreintes=None):
+    """Initialisation d'un processus de travail : lecture des pools en memoire partagee."""
+    pools = {}
+    for remplacants, descripteur in descripteurs.items():
+        bloc, pools[remplacants] = memoire_partagee.attacher_pool(descripteur)
+        _blocs.append(bloc)
+    _initialiser_processus(pools, empreintes)
+
+
+def optimiser_config(config):
+    """
+    Optimise une configuration sur le pool partage du processus.
+    Retourne un dict de resultat (ids des titulaires et remplacants, ou erreur).
+    """
+    debut = time.perf_counter()
+    resultat = {'nom': config['nom'], 'config': config, 'depuis_cache': False}
+    remplacants_reels = bool(config.get('remplacants', False))
+    pool = _pools[remplacants_reels]
+
+    cle = None
+    if remplacants_reels in _empreintes:
+        parametres = {k: v for k, v in config.items() if k != 'nom'}
+        cle = cache_resultats.cle_resultat(pool, parametres, _empreintes[remplacants_reels])
+        entree = cache_resultats.lire(cle)
+        if entree is not None:
+            resultat.update(ids_titulaires=entree['titulaires'], ids_remplacants=entree['remplacants'],
+                            depuis_cache=True, duree_s=round(time.perf_counter() - debut, 3))
+            return resultat
+
+    try:
+        (titulaires, remplacants), = optimiseur_compo.optimiser_requete(
+            pool,
+            float(config.get('budget', 300)),
+            verrous=[int(i) for i in config.get('verrous', [])],
+            exclus=[int(i) for i in config.get('exclus', [])],
+            objectif=config.get('objectif', 'score_predictif'),
+            iterations=int(config.get('iterations', 500)),
+            solveur=config.get('solveur', 'amelioration'),
+            temps_max=config.get('temps_max'),
+            graine=config.get('graine'),
+        )
+    except (TypeError, ValueError) as e:
+        resultat['erreur'] = str(e)
+    else:
+        resultat['ids_titulaires'] = [int(i) for i in titulaires['id']]
+        resultat['ids_remplacants'] = [int(i) for i in remplacants['id']]
+        if cle is not None:
+            cache_resultats.ecrire(cle, parametres, resultat['ids_titulaires'], resultat['ids_remplacants'])
+    resultat['duree_s'] = round(time.perf_counter() - debut, 3)
+    return resultat
+
+
+def optimiser_lot(configs, processus=None, df=None, cache=True):
+    """
+    Optimise une liste de configurations (dicts, voir l'en-tete du module).
+    Le pool est charge et filtre une seule fois ; les configurations sont reparties
+    sur `processus` processus (defaut: un par coeur, 1 = dans le processus courant),
+    qui lisent les pools en memoire partagee.
+    df: pool score deja charge (defaut: optimiseur_compo.charger_joueurs()).
+    cache: relire / memoriser les resultats dans le cache des resultats.
+    Retourne les resultats dans l'ordre des configurations.
+    """
+    configs = valider_configs(configs)
+    pools = preparer_pools(configs, df)
+    empreintes = {k: cache_resultats.empreinte_pool(pool) for k, pool in pools.items()} if cache else {}
+    processus = min(processus or os.cpu_count() or 1, len(configs))
+
+    if processus <= 1:
+        _initialiser_processus(pools, empreintes)
+        resultats = [optimiser_config(config) for config in configs]
+    else:
+        blocs, descripteurs = [], {}
+        try:
+            for remplacants, pool in pools.items():
+                bloc, descripteurs[remplacants] = memoire_partagee.exporter_pool(pool)
+                blocs.append(bloc)
+            with ProcessPoolExecutor(max_workers=processus, initializer=_attacher_processus,
+                                     initargs=(descripteurs, empreintes)) as executor:
+                resultats = list(executor.map(optimiser_config, configs))
+        finally:
+            for bloc in blocs:
+                memoire_partagee.liberer(bloc)
+
+    # Lignes completes (nom, club...) reprises du pool du processus principal
+    for resultat in resultats:
+        if 'ids_titulaires' in resultat:
+            pool = pools[bool(resultat['config'].get('remplacants', False))]
+            resultat['titulaires'] = optimiseur_compo.lignes_par_id(pool, resultat.pop('ids_titulaires'))
+            resultat['remplacants'] = optimiseur_compo.lignes_par_id(pool, resultat.pop('ids_remplacants'))
+    return resultats
+
+
+def _nom_fichier(nom):
+    return re.sub(r'[^\w\-]', '_', nom) + ".csv"
+
+
+def sauvegarder_resultats(resultats, dossier=DOSSIER_LOTS):
+    """Une composition par configuration reussie + recapitulatif du lot (resume_lot.csv)."""
+    os.makedirs(dossier, exist_ok=True)
+    lignes = []
+    for r in resultats:
+        config = r['config']
+        ligne = {
+            'nom': r['nom'],
+            'budget': config.get('budget', 300),
+            'solveur': config.get('solveur', 'amelioration'),
+            'objectif': config.get('objectif', 'score_predictif'),
+            'depuis_cache': r['depuis_cache'],
+            'duree_s': r['duree_s'],
+            'erreur': r.get('erreur', ''),
+        }
+        if 'titulaires' in r:
+            fichier = os.path.join(dossier, _nom_fichier(r['nom']))
+            optimiseur_compo.sauvegarder_composition(r['titulaires'], r['remplacants'], fichier)
+            ligne.update(
+                score_predictif=round(float(r['titulaires']['score_predictif'].sum()), 2),
+                budget_utilise=round(float(r['titulaires']['valeur'].sum() + r['remplacants']['valeur'].sum()), 1),
+                joueurs=len(r['titulaires']) + len(r['remplacants']),
+                complete=len(r['titulaires']) == optimiseur_compo.TOTAL_TITULAIRES,
+                fichier=os.path.basename(fichier),
+            )
+        lignes.append(ligne)
+
+    fichier_resume = os.path.join(dossier, FICHIER_RESUME)
+    tmp = fichier_resume + ".tmp"
+    with open(tmp, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLONNES_RESUME, delimiter=';')
+        writer.writeheader()
+        writer.writerows(lignes)
+    os.replace(tmp, fichier_resume)
+    print(f"\n[OK] Recapitulatif du lot: {fichier_resume}")
+    return lignes
+
+
+def afficher_resume(lignes):
+    """Tableau recapitulatif du lot."""
+    print("\n" + "=" * 78)
+    print("OPTIMISATION PAR LOT")
+    print("=" * 78)
+    print(f"   {'Configuration':20} | {'Budget':>6} | {'Solveur':12} | {'Objectif':15} | {'Score':>7} | {'Duree':>6}")
+    print("   " + "-" * 76)
+    for l in lignes:
+        if l['erreur']:
+            print(f"   {l['nom'][:20]:20} | {l['budget']:>6} | [ERREUR] {l['erreur']}")
+            continue
+        print(f"   {l['nom'][:20]:20} | {l['budget']:>6} | {l['solveur']:12} | {l['objectif']:15} | "
+              f"{l['score_predictif']:7.1f} | {l['duree_s']:5.2f}s"
+              f"{' (cache)' if l['depuis_cache'] else ''}"
+              f"{'' if l['complete'] else ' [WARN] composition incomplete'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimisation de plusieurs equipes en un seul lot")
+    parser.add_argument('fichier', help='Fichier de lot (JSON ou YAML) : liste de configurations')
+    parser.add_argument('--processus', type=int, default=None,
+                        help='Processus de travail (defaut: un par coeur, 1 = sequentiel)')
+    parser.add_argument('--dossier', type=str, default=DOSSIER_LOTS,
+                        help='Dossier des resultats (defaut: output/lots)')
+    parser.add_argument('--sans-cache', action='store_true',
+                        help='Ignorer le cache des resultats (recalcul force)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("OPTIMISATION PAR LOT - LA GRANDE MELEE")
+    print("=" * 60)
+
+    try:
+        configs = charger_configs(args.fichier)
+    except (OSError, ValueError) as e:
+        print(f"[ERREUR] Lot invalide: {e}")
+        return 1
+    if not os.path.exists(optimiseur_compo.FICHIER_JOUEURS):
+        print(f"[ERREUR] {optimiseur_compo.FICHIER_JOUEURS} introuvable. Executez d'abord score_predictif.py")
+        return 1
+
+    print(f"   {len(configs)} configurations")
+    debut = time.perf_counter()
+    resultats = optimiser_lot(configs, processus=args.processus, cache=not args.sans_cache)
+    lignes = sauvegarder_resultats(resultats, args.dossier)
+    afficher_resume(lignes)
+    print(f"\n[OK] Lot termine en {time.perf_counter() - debut:.1f}s")
+    return 1 if any(l['erreur'] for l in lignes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,13 +6,27 @@ Usage:
     python optimiseur_compo.py                    # Budget par defaut (300M)
     python optimiseur_compo.py --budget 250       # Budget personnalise
     python optimiseur_compo.py --help             # Aide
+    python optimiseur_compo.py --stats --trace-convergence output/convergence.csv
+    python optimiseur_compo.py --solveur exact    # Optimum exact (programmation dynamique)
+    python optimiseur_compo.py --sans-sensibilite # Sans analyse de sensibilite (shortlist.csv)
 """
 
 import pandas as pd
+import numpy as np
 import argparse
 from itertools import combinations
+import csv
+import heapq
 import json
+import math
 import os
+import random
+import time
+
+import cache_resultats
+import profilage
+import schema_joueurs
+from index_joueurs import IndexJoueurs, JoueurSelectionne
 
 # --- CONFIGURATION ---
 FICHIER_JOUEURS = os.path.join(os.path.dirname(__file__), "output", "joueurs_avec_score.csv")
@@ -36,6 +50,26 @@ TOTAL_TITULAIRES = sum(COMPOSITION_REQUISE.values())  # 15
 NB_REMPLACANTS_FANTASY = 3  # 3 remplacants Fantasy
 TOTAL_JOUEURS = TOTAL_TITULAIRES + NB_REMPLACANTS_FANTASY  # 18
 
+# Colonnes pouvant servir d'objectif a maximiser (service / requetes parametrees)
+OBJECTIFS = ('score_predictif', 'rapport_qp', 'stat_moy')
+
+# Solveurs des titulaires (voir optimiser_titulaires)
+SOLVEURS = ('glouton', 'amelioration', 'recuit', 'exact')
+UNITE_BUDGET = 0.1  # Granularite des prix pour les solveurs exact et recuit (dixieme de million)
+TOLERANCE_OPTIMUM = 1e-3  # Ecart de score sous lequel une composition vaut l'optimum (scores a 2 decimales)
+
+# Recuit simule
+MOUVEMENTS_PAR_ITERATION = 100  # Un mouvement coute ~100x moins qu'une iteration d'amelioration (filtre pandas)
+TEMPERATURE_INITIALE = 3.0      # En points : une degradation de 3 pts est acceptee ~1 fois sur 3 au debut
+TEMPERATURE_FINALE = 0.05
+PROBA_NB_ECHANGES = (0.3, 0.4, 0.3)  # Mouvements a 1, 2 ou 3 echanges
+MAX_COMPOSITIONS_VISITEES = 200000  # Au-dela, la table des compositions visitees est videe
+
+# Analyse de sensibilite (voir analyser_sensibilite)
+FICHIER_SHORTLIST = os.path.join(os.path.dirname(__file__), "output", "shortlist.csv")
+TAILLE_SHORTLIST = 30
+COLONNES_SENSIBILITE = ['perte_si_exclu', 'ecart_entree', 'score_entree', 'prix_entree']
+
 
 def charger_joueurs(fichier=FICHIER_JOUEURS, fichier_compos=FICHIER_COMPOS):
     """Charge les joueurs avec leurs scores predictifs."""
@@ -54,7 +88,8 @@ def charger_joueurs(fichier=FICHIER_JOUEURS, fichier_compos=FICHIER_COMPOS):
     except:
         pass
     
-    return df
+    # Schema compact : categories et float32 (pool garde en memoire par le service)
+    return schema_joueurs.compacter_joueurs(df)
 
 
 def filtrer_joueurs_disponibles(df, inclure_remplacants=False):
@@ -68,68 +103,168 @@ def filtrer_joueurs_disponibles(df, inclure_remplacants=False):
     else:
         mask = df['statut_compo'] == 'titulaire'
     
-    df_filtre = df[mask].copy()
+    df_filtre = df[mask]
     print(f"   {len(df_filtre)} joueurs disponibles (titulaires{'+ remplacants' if inclure_remplacants else ''})")
     
     return df_filtre
 
 
-def optimiser_composition(df, budget, verbose=True):
-    """Trouve la meilleure composition sous contrainte de budget."""
-    if verbose:
-        print(f"\n[OPTIM] Budget: {budget}M")
-        print("-" * 40)
-    
+def _debut_stats(stats, solveur):
+    """Initialise un dict de statistiques de recherche (sans effet si stats est None)."""
+    if stats is None:
+        return time.perf_counter()
+    stats.update({
+        'solveur': solveur,
+        'mouvements_evalues': 0,
+        'candidats_evalues': 0,
+        'mouvements_ameliorants': 0,
+        'meilleur_score': None,
+        'temps_meilleure_s': None,
+        'duree_s': None,
+        'evaluations_par_s': None,
+        'trace': [],
+    })
+    return time.perf_counter()
+
+
+def _noter_meilleure(stats, debut, phase, score):
+    """Enregistre une nouvelle meilleure solution (point de la trace de convergence)."""
+    if stats is None:
+        return
+    temps = round(time.perf_counter() - debut, 6)
+    stats['meilleur_score'] = round(float(score), 2)
+    stats['temps_meilleure_s'] = temps
+    stats['trace'].append({'temps_s': temps, 'phase': phase, 'score': stats['meilleur_score'],
+                           'mouvements_evalues': stats['mouvements_evalues']})
+
+
+def _fin_stats(stats, debut):
+    if stats is None:
+        return
+    stats['duree_s'] = round(time.perf_counter() - debut, 6)
+    stats['evaluations_par_s'] = round(stats['mouvements_evalues'] / stats['duree_s'], 1) if stats['duree_s'] else None
+
+
+def afficher_stats(stats):
+    """Affiche les statistiques de recherche d'un solveur."""
+    print(f"\n[STATS] Solveur: {stats['solveur']}")
+    print(f"   Mouvements evalues: {stats['mouvements_evalues']} ({stats['evaluations_par_s'] or 0:.0f}/s)")
+    print(f"   Candidats examines: {stats['candidats_evalues']}")
+    print(f"   Mouvements ameliorants: {stats['mouvements_ameliorants']}")
+    if 'compositions_deja_visitees' in stats:
+        print(f"   Compositions deja visitees (ignorees): {stats['compositions_deja_visitees']}")
+    if stats['meilleur_score'] is None:
+        print(f"   Aucune composition complete (duree totale {stats['duree_s']}s)")
+    else:
+        print(f"   Meilleure solution: {stats['meilleur_score']} pts trouvee a {stats['temps_meilleure_s']}s "
+              f"(duree totale {stats['duree_s']}s)")
+
+
+def exporter_trace_convergence(stats, fichier):
+    """Exporte la trace de convergence (score de la meilleure solution au cours du temps) en CSV."""
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    with open(fichier, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['solveur', 'temps_s', 'phase', 'score', 'mouvements_evalues'])
+        for point in stats['trace']:
+            writer.writerow([stats['solveur'], point['temps_s'], point['phase'], point['score'],
+                             point['mouvements_evalues']])
+    print(f"[OK] Trace de convergence sauvegardee: {fichier}")
+
+
+def _glouton(index, budget, composition_requise, stats=None, verbose=True):
+    """
+    Coeur du solveur glouton sur un IndexJoueurs : a chaque poste, meilleur joueur libre
+    qui tient dans le budget restant, tant que le poste n'est pas complet.
+    Les joueurs choisis sont marques pris dans l'index. Retourne (composition, budget_restant).
+    """
     composition = []
     budget_restant = budget
-    joueurs_utilises = set()
     
-    for position, nb_requis in COMPOSITION_REQUISE.items():
-        df_pos = df[
-            (df['position'] == position) & 
-            (~df['id'].isin(joueurs_utilises))
-        ].copy()
-        
-        df_pos = df_pos.sort_values('score_predictif', ascending=False)
+    for position, nb_requis in composition_requise.items():
+        if nb_requis <= 0:
+            continue
         
         selectionnes = 0
-        for _, joueur in df_pos.iterrows():
-            if selectionnes >= nb_requis:
+        while selectionnes < nb_requis:
+            joueur = index.meilleur(position, budget_restant)
+            if stats is not None:
+                stats['mouvements_evalues'] += 1
+                stats['candidats_evalues'] += 1
+            if joueur is None:
                 break
-            
-            if joueur['valeur'] <= budget_restant:
-                composition.append(joueur)
-                joueurs_utilises.add(joueur['id'])
-                budget_restant -= joueur['valeur']
-                selectionnes += 1
+            composition.append(joueur)
+            index.marquer_utilise(joueur.id)
+            budget_restant -= joueur.valeur
+            selectionnes += 1
         
         if selectionnes < nb_requis:
             if verbose:
                 print(f"   [WARN] {position}: seulement {selectionnes}/{nb_requis} trouves")
     
-    df_compo = pd.DataFrame(composition)
+    return composition, budget_restant
+
+
+def optimiser_composition(df, budget, verbose=True, composition_requise=None, stats=None):
+    """
+    Trouve la meilleure composition sous contrainte de budget.
+    composition_requise: nombre de joueurs a choisir par poste (defaut: COMPOSITION_REQUISE).
+    stats: dict optionnel rempli avec les statistiques de recherche.
+    """
+    if composition_requise is None:
+        composition_requise = COMPOSITION_REQUISE
+    debut = _debut_stats(stats, 'glouton')
+    
+    if verbose:
+        print(f"\n[OPTIM] Budget: {budget}M")
+        print("-" * 40)
+    
+    composition, budget_restant = _glouton(IndexJoueurs(df), budget, composition_requise,
+                                           stats=stats, verbose=verbose)
+    
+    df_compo = df.loc[[j.ligne for j in composition]]
+    if len(df_compo) > 0:
+        _noter_meilleure(stats, debut, 'glouton', df_compo['score_predictif'].sum())
+    _fin_stats(stats, debut)
     
     if verbose:
-        print(f"\n   [OK] {len(df_compo)}/{TOTAL_TITULAIRES} joueurs selectionnes")
+        print(f"\n   [OK] {len(df_compo)}/{sum(composition_requise.values())} joueurs selectionnes")
         print(f"   Budget utilise: {budget - budget_restant:.1f}M / {budget}M")
         print(f"   Score total: {df_compo['score_predictif'].sum():.1f} pts")
     
     return df_compo, budget_restant
 
 
-def optimiser_avec_amelioration(df, budget, iterations=100, verbose=True):
-    """Optimisation avec amelioration iterative."""
-    import random
+@profilage.profiler
+def optimiser_avec_amelioration(df, budget, iterations=100, verbose=True, composition_requise=None,
+                                stats=None, temps_max=None):
+    """
+    Optimisation avec amelioration iterative.
+    composition_requise: nombre de joueurs a choisir par poste (defaut: COMPOSITION_REQUISE).
+    stats: dict optionnel rempli avec les statistiques de recherche et la trace de convergence.
+    temps_max: duree maximale (secondes) de la phase aleatoire, en plus du nombre d'iterations.
+    """
+    if composition_requise is None:
+        composition_requise = COMPOSITION_REQUISE
+    debut = _debut_stats(stats, 'amelioration')
+    nb_requis = sum(composition_requise.values())
+    if nb_requis == 0:
+        _fin_stats(stats, debut)
+        return df.iloc[0:0].copy(), budget
     
-    df_compo, budget_restant = optimiser_composition(df, budget, verbose=False)
+    # Index par poste : "meilleur joueur libre sous X M" en O(log n), sans filtrer le DataFrame
+    index = IndexJoueurs(df)
+    compo, budget_restant = _glouton(index, budget, composition_requise, verbose=False)
     
-    if len(df_compo) < TOTAL_TITULAIRES:
+    if len(compo) < nb_requis:
         if verbose:
             print("[WARN] Composition incomplete, optimisation limitee")
-        return df_compo, budget_restant
+        _fin_stats(stats, debut)
+        return df.loc[[j.ligne for j in compo]], budget_restant
     
-    meilleur_score = df_compo['score_predictif'].sum()
-    budget_utilise = df_compo['valeur'].sum()
+    meilleur_score = sum(j.score for j in compo)
+    budget_utilise = budget - budget_restant
+    _noter_meilleure(stats, debut, 'initiale', meilleur_score)
     
     if verbose:
         print(f"\n[PHASE 1] Composition initiale: {meilleur_score:.1f} pts, {budget_utilise:.1f}M utilises")
@@ -141,102 +276,673 @@ def optimiser_avec_amelioration(df, budget, iterations=100, verbose=True):
     amelioration = True
     passes = 0
     max_passes = 20
+    nb_evalues = 0
+    nb_candidats = 0
+    nb_ameliorants = 0
     
     while amelioration and passes < max_passes:
         amelioration = False
         passes += 1
         
-        for idx in range(len(df_compo)):
-            joueur_actuel = df_compo.iloc[idx]
-            position = joueur_actuel['position']
+        for idx, joueur_actuel in enumerate(compo):
+            nb_evalues += 1
+            budget_dispo = budget_restant + joueur_actuel.valeur
             
-            budget_dispo = budget_restant + joueur_actuel['valeur']
-            
-            candidats = df[
-                (df['position'] == position) &
-                (~df['id'].isin(df_compo['id'].values)) &
-                (df['valeur'] <= budget_dispo) &
-                (df['score_predictif'] > joueur_actuel['score_predictif'])
-            ].copy()
-            
-            if len(candidats) > 0:
-                meilleur_candidat = candidats.loc[candidats['score_predictif'].idxmax()]
-                
-                df_compo = df_compo.drop(df_compo.index[idx]).reset_index(drop=True)
-                df_compo = pd.concat([df_compo, pd.DataFrame([meilleur_candidat])], ignore_index=True)
-                budget_restant = budget_dispo - meilleur_candidat['valeur']
+            meilleur_candidat = index.meilleur(joueur_actuel.position, budget_dispo)
+            if meilleur_candidat is not None and meilleur_candidat.score > joueur_actuel.score:
+                nb_candidats += 1
+                index.marquer_libre(joueur_actuel.id)
+                index.marquer_utilise(meilleur_candidat.id)
+                del compo[idx]
+                compo.append(meilleur_candidat)
+                budget_restant = budget_dispo - meilleur_candidat.valeur
+                meilleur_score += meilleur_candidat.score - joueur_actuel.score
                 amelioration = True
+                nb_ameliorants += 1
+                if stats is not None:
+                    stats['mouvements_evalues'] = nb_evalues
+                    _noter_meilleure(stats, debut, 'upgrade', meilleur_score)
                 break
     
     if verbose:
-        nouveau_score = df_compo['score_predictif'].sum()
-        print(f"   Apres {passes} passes d'upgrade: {nouveau_score:.1f} pts")
+        print(f"   Apres {passes} passes d'upgrade: {meilleur_score:.1f} pts")
     
     # Phase 3: Optimisation aleatoire
     if verbose:
         print(f"[PHASE 3] Optimisation aleatoire ({iterations} tentatives)...")
     
-    meilleur_score = df_compo['score_predictif'].sum()
-    meilleure_compo = df_compo.copy()
-    
     for i in range(iterations):
-        if len(df_compo) == 0:
+        if temps_max is not None and time.perf_counter() - debut > temps_max:
+            if verbose:
+                print(f"   Temps limite atteint apres {i} tentatives")
             break
             
-        idx_remplacer = random.randint(0, len(df_compo) - 1)
-        joueur_actuel = df_compo.iloc[idx_remplacer]
-        position = joueur_actuel['position']
+        nb_evalues += 1
+        idx_remplacer = random.randint(0, len(compo) - 1)
+        joueur_actuel = compo[idx_remplacer]
+        
+        budget_dispo = budget_restant + joueur_actuel.valeur
+        
+        meilleur_candidat = index.meilleur(joueur_actuel.position, budget_dispo)
+        if meilleur_candidat is not None and meilleur_candidat.score > joueur_actuel.score:
+            nb_candidats += 1
+            index.marquer_libre(joueur_actuel.id)
+            index.marquer_utilise(meilleur_candidat.id)
+            del compo[idx_remplacer]
+            compo.append(meilleur_candidat)
+            budget_restant = budget_dispo - meilleur_candidat.valeur
+            meilleur_score += meilleur_candidat.score - joueur_actuel.score
+            nb_ameliorants += 1
+            if stats is not None:
+                stats['mouvements_evalues'] = nb_evalues
+                _noter_meilleure(stats, debut, 'aleatoire', meilleur_score)
+    
+    profilage.compteur('echanges_evalues', nb_evalues)
+    profilage.compteur('echanges_ameliorants', nb_ameliorants)
+    if stats is not None:
+        stats['mouvements_evalues'] = nb_evalues
+        stats['candidats_evalues'] = nb_candidats
+        stats['mouvements_ameliorants'] = nb_ameliorants
+    _fin_stats(stats, debut)
+    
+    meilleure_compo = df.loc[[j.ligne for j in compo]]
+    if verbose:
+        budget_final = budget - meilleure_compo['valeur'].sum()
+        print(f"   Score final: {meilleure_compo['score_predictif'].sum():.1f} pts (budget restant: {budget_final:.1f}M)")
+    
+    return meilleure_compo, budget - meilleure_compo['valeur'].sum()
+
+
+def _candidats_non_domines(couts, scores, nb_requis):
+    """
+    Joueurs d'un poste pouvant figurer dans une composition optimale.
+    Un joueur est domine si nb_requis autres joueurs coutent autant ou moins
+    et rapportent autant ou plus : il n'est jamais indispensable.
+    Retourne les positions (dans couts/scores) des joueurs gardes, par cout croissant.
+    """
+    ordre = np.lexsort((-scores, couts))
+    # Au plus nb_requis joueurs par prix (les meilleurs), puis balayage par prix croissant
+    rang_prix = pd.Series(couts[ordre]).groupby(couts[ordre]).cumcount().to_numpy()
+    ordre = ordre[rang_prix < nb_requis]
+    
+    gardes = []
+    meilleurs = []  # Tas des nb_requis meilleurs scores deja vus (moins chers)
+    for i in ordre:
+        if len(meilleurs) == nb_requis and scores[i] <= meilleurs[0]:
+            continue
+        gardes.append(i)
+        if len(meilleurs) < nb_requis:
+            heapq.heappush(meilleurs, scores[i])
+        else:
+            heapq.heapreplace(meilleurs, scores[i])
+    return np.array(gardes, dtype=int)
+
+
+def _table_poste(couts, scores, nb_requis, budget_max, avec_choix=True):
+    """
+    Sac a dos avec cardinalite pour un poste.
+    meilleur[j, b] : meilleur score avec exactement j joueurs pour un cout <= b.
+    prend[t, j, b] : le joueur t fait partie de la solution (j, b) apres examen des t premiers
+    (None si avec_choix=False : seules les valeurs optimales sont calculees).
+    """
+    meilleur = np.full((nb_requis + 1, budget_max + 1), -np.inf)
+    meilleur[0, :] = 0.0
+    prend = np.zeros((len(couts), nb_requis + 1, budget_max + 1), dtype=bool) if avec_choix else None
+    
+    for t, (cout, score) in enumerate(zip(couts, scores)):
+        if cout > budget_max:
+            continue
+        for j in range(min(t + 1, nb_requis), 0, -1):
+            candidat = meilleur[j - 1, :budget_max + 1 - cout] + score
+            mieux = candidat > meilleur[j, cout:]
+            meilleur[j, cout:][mieux] = candidat[mieux]
+            if avec_choix:
+                prend[t, j, cout:] = mieux
+    return meilleur, prend
+
+
+def _joueurs_poste(prend, couts, nb_requis, budget_poste):
+    """Retrouve les joueurs de la solution optimale d'un poste pour un budget donne."""
+    choisis = []
+    j, b = nb_requis, budget_poste
+    for t in range(len(couts) - 1, -1, -1):
+        if j == 0:
+            break
+        if prend[t, j, b]:
+            choisis.append(t)
+            b -= couts[t]
+            j -= 1
+    return choisis
+
+
+@profilage.profiler
+def optimiser_exact(df, budget, verbose=True, composition_requise=None, stats=None):
+    """
+    Composition optimale exacte (programmation dynamique sur le budget).
+    - Prix comptes en UNITE_BUDGET (dixiemes de million), budget arrondi a l'unite inferieure
+    - Par poste : elimination des joueurs domines, puis sac a dos avec cardinalite
+    - Postes combines par convolution (max, +) des tables de chaque poste
+    Sert de reference pour mesurer la qualite des heuristiques (benchmark.py).
+    composition_requise / stats : comme optimiser_composition.
+    """
+    if composition_requise is None:
+        composition_requise = COMPOSITION_REQUISE
+    debut = _debut_stats(stats, 'exact')
+    budget_max = int(np.floor(budget / UNITE_BUDGET + 1e-6))
+    
+    valeurs = df['valeur'].to_numpy(dtype=float)
+    couts_tous = np.ceil(np.round(valeurs / UNITE_BUDGET, 6)).astype(np.int64)
+    scores_tous = df['score_predictif'].fillna(0).to_numpy(dtype=float)
+    positions_tous = df['position'].to_numpy()
+    
+    postes = []
+    total = np.zeros(budget_max + 1)
+    nb_gardes = 0
+    for position, nb_requis in composition_requise.items():
+        if nb_requis <= 0:
+            continue
+        lignes = np.flatnonzero((positions_tous == position) & ~np.isnan(valeurs))
+        gardes = lignes[_candidats_non_domines(couts_tous[lignes], scores_tous[lignes], nb_requis)]
+        nb_gardes += len(gardes)
+        couts, scores = couts_tous[gardes], scores_tous[gardes]
+        meilleur, prend = _table_poste(couts, scores, nb_requis, budget_max)
+        
+        # Convolution (max, +) : seuls les budgets ou le poste s'ameliore sont utiles
+        table = meilleur[nb_requis]
+        utiles = np.flatnonzero(np.isfinite(table) & (table > np.concatenate(([-np.inf], table[:-1]))))
+        combine = np.full(budget_max + 1, -np.inf)
+        part_poste = np.zeros(budget_max + 1, dtype=np.int64)
+        for c in utiles:
+            candidat = total[:budget_max + 1 - c] + table[c]
+            mieux = candidat > combine[c:]
+            combine[c:][mieux] = candidat[mieux]
+            part_poste[c:][mieux] = c
+        total = combine
+        postes.append((position, nb_requis, gardes, couts, prend, part_poste))
+    
+    if stats is not None:
+        stats['candidats_evalues'] = len(df)
+        stats['mouvements_evalues'] = nb_gardes
+    
+    if not np.isfinite(total[budget_max]):
+        if verbose:
+            print(f"[WARN] Aucune composition complete possible avec {budget}M")
+        _fin_stats(stats, debut)
+        return df.iloc[0:0].copy(), budget
+    
+    selection = []
+    b = budget_max
+    for position, nb_requis, gardes, couts, prend, part_poste in reversed(postes):
+        budget_poste = part_poste[b]
+        selection.extend(gardes[t] for t in _joueurs_poste(prend, couts, nb_requis, budget_poste))
+        b -= budget_poste
+    
+    df_compo = df.iloc[sorted(selection)].reset_index(drop=True)
+    budget_restant = budget - df_compo['valeur'].sum()
+    _noter_meilleure(stats, debut, 'exact', df_compo['score_predictif'].sum())
+    _fin_stats(stats, debut)
+    
+    if verbose:
+        print(f"\n[EXACT] {nb_gardes} joueurs non domines sur {len(df)}")
+        print(f"   Score optimal: {df_compo['score_predictif'].sum():.1f} pts "
+              f"(budget restant: {budget_restant:.1f}M)")
+    
+    return df_compo, budget_restant
+
+
+def _convolution_max(a, b):
+    """
+    Convolution (max, +) de deux tables "meilleur score pour un cout <= budget" :
+    resultat[x] = max(a[c] + b[x - c]). Boucle sur les couts ou la table la plus
+    creuse s'ameliore (comme dans optimiser_exact).
+    """
+    utiles_a = np.flatnonzero(np.isfinite(a) & (a > np.concatenate(([-np.inf], a[:-1]))))
+    utiles_b = np.flatnonzero(np.isfinite(b) & (b > np.concatenate(([-np.inf], b[:-1]))))
+    if len(utiles_b) < len(utiles_a):
+        a, b, utiles_a = b, a, utiles_b
+    n = len(a)
+    resultat = np.full(n, -np.inf)
+    for c in utiles_a:
+        np.maximum(resultat[c:], b[:n - c] + a[c], out=resultat[c:])
+    return resultat
+
+
+def _valeurs_entree(table_sans, scores, couts, optimum, budget_max):
+    """
+    Entree forcee de joueurs d'un meme poste. table_sans[x] : meilleur score du reste
+    de la composition (sans ces joueurs) pour un cout <= x.
+    Retourne (ecart au score optimal, NaN si le joueur ne peut pas entrer a son prix ;
+    cout maximal en UNITE_BUDGET pour entrer, -1 si jamais).
+    """
+    restes = budget_max - couts
+    valeur_forcee = np.where(restes >= 0, table_sans[np.clip(restes, 0, budget_max)], -np.inf)
+    with np.errstate(invalid='ignore'):
+        ecart = np.where(np.isfinite(valeur_forcee), np.maximum(optimum - (scores + valeur_forcee), 0.0), np.nan)
+    # table_sans est croissante : premier budget de reste suffisant pour egaler l'optimum
+    premier = np.searchsorted(table_sans, optimum - scores - 1e-6, side='left')
+    cout_max = np.where(premier <= budget_max, budget_max - premier, -1)
+    return ecart, cout_max
+
+
+@profilage.profiler
+def analyser_sensibilite(df, budget, composition_requise=None):
+    """
+    Sensibilite de la composition optimale (solveur exact) a chaque joueur du pool,
+    en une passe sur les tables de programmation dynamique :
+    - perte_si_exclu : points perdus par l'optimum si le joueur est exclu
+    - ecart_entree : points manquants au joueur pour entrer dans une composition
+      optimale a son prix (0 : il en fait partie)
+    - score_entree : score a partir duquel il entre (score_predictif + ecart_entree)
+    - prix_entree : prix maximal (M) auquel il entre a son score (vide : jamais)
+    Les tables des autres postes sont combinees une fois (prefixes / suffixes) ; seul le
+    poste du joueur est recalcule, et uniquement pour ses joueurs non domines.
+    Retourne un DataFrame (index de df, colonnes COLONNES_SENSIBILITE), None si aucune
+    composition complete n'existe.
+    """
+    if composition_requise is None:
+        composition_requise = COMPOSITION_REQUISE
+    budget_max = int(np.floor(budget / UNITE_BUDGET + 1e-6))
+    
+    valeurs = df['valeur'].to_numpy(dtype=float)
+    couts_tous = np.ceil(np.round(valeurs / UNITE_BUDGET, 6)).astype(np.int64)
+    scores_tous = df['score_predictif'].fillna(0).to_numpy(dtype=float)
+    positions_tous = df['position'].to_numpy()
+    
+    # Tables par poste. Non domines au sens de nb_requis + 1 : ils le restent
+    # quand un joueur du poste est retire
+    postes = []
+    for position, nb_requis in composition_requise.items():
+        if nb_requis <= 0:
+            continue
+        lignes = np.flatnonzero((positions_tous == position) & ~np.isnan(valeurs))
+        gardes = lignes[_candidats_non_domines(couts_tous[lignes], scores_tous[lignes], nb_requis + 1)]
+        meilleur, _ = _table_poste(couts_tous[gardes], scores_tous[gardes], nb_requis, budget_max,
+                                   avec_choix=False)
+        postes.append((nb_requis, lignes, gardes, meilleur))
+    
+    # Autres postes : prefixes[k] combine les postes avant k, suffixes[k] ceux a partir de k
+    prefixes = [np.zeros(budget_max + 1)]
+    for nb_requis, _, _, meilleur in postes:
+        prefixes.append(_convolution_max(prefixes[-1], meilleur[nb_requis]))
+    suffixes = [np.zeros(budget_max + 1)]
+    for nb_requis, _, _, meilleur in reversed(postes):
+        suffixes.append(_convolution_max(suffixes[-1], meilleur[nb_requis]))
+    suffixes.reverse()
+    optimum = prefixes[-1][budget_max]
+    if not np.isfinite(optimum):
+        return None
+    
+    perte = np.zeros(len(df))
+    ecart = np.full(len(df), np.nan)
+    cout_max = np.full(len(df), -1, dtype=np.int64)
+    for k, (nb_requis, lignes, gardes, meilleur) in enumerate(postes):
+        autres = _convolution_max(prefixes[k], suffixes[k + 1])
+        
+        # Joueurs domines : le reste du poste est pris parmi les non domines, table commune
+        domines = np.setdiff1d(lignes, gardes)
+        reste = _convolution_max(meilleur[nb_requis - 1], autres)
+        ecart[domines], cout_max[domines] = _valeurs_entree(reste, scores_tous[domines], couts_tous[domines],
+                                                            optimum, budget_max)
         
-        budget_dispo = budget_restant + joueur_actuel['valeur']
+        # Joueurs non domines : poste recalcule sans eux
+        for t, ligne in enumerate(gardes):
+            sans = np.delete(gardes, t)
+            meilleur_sans, _ = _table_poste(couts_tous[sans], scores_tous[sans], nb_requis, budget_max,
+                                            avec_choix=False)
+            perte[ligne] = optimum - np.max(meilleur_sans[nb_requis] + autres[::-1])
+            reste = _convolution_max(meilleur_sans[nb_requis - 1], autres)
+            ecart[[ligne]], cout_max[[ligne]] = _valeurs_entree(reste, scores_tous[[ligne]], couts_tous[[ligne]],
+                                                                optimum, budget_max)
+    
+    return pd.DataFrame({
+        'perte_si_exclu': np.round(perte, 2),
+        'ecart_entree': np.round(ecart, 2),
+        'score_entree': np.round(scores_tous + ecart, 2),
+        'prix_entree': np.where(cout_max >= 0, np.round(cout_max * UNITE_BUDGET, 1), np.nan),
+    }, index=df.index)
+
+
+def composition_optimale(df, budget, df_titulaires, composition_requise=None):
+    """
+    True si les titulaires atteignent le score de l'optimum exact : les colonnes de
+    sensibilite (mesurees par rapport a cet optimum) valent alors pour cette composition.
+    Memes joueurs que l'optimum, ou meme score a l'arrondi des scores pres (sommes en float64 :
+    les scores float32 sommes dans un autre ordre different de quelques 1e-5).
+    """
+    df_exact, _ = optimiser_exact(df, budget, verbose=False, composition_requise=composition_requise)
+    if len(df_exact) == 0 or len(df_exact) != len(df_titulaires):
+        return False
+    if set(df_titulaires['id']) == set(df_exact['id']):
+        return True
+    return bool(np.isclose(df_titulaires['score_predictif'].sum(dtype=np.float64),
+                           df_exact['score_predictif'].sum(dtype=np.float64), rtol=0, atol=TOLERANCE_OPTIMUM))
+
+
+def sauvegarder_shortlist(df, sensibilite, ids_composition, fichier=FICHIER_SHORTLIST, taille=TAILLE_SHORTLIST):
+    """
+    Joueurs hors composition les plus proches d'y entrer (ecart_entree croissant),
+    avec le score et le prix qui les feraient entrer.
+    """
+    df_short = df.join(sensibilite)
+    df_short = df_short[~df_short['id'].isin(ids_composition) & df_short['ecart_entree'].notna()]
+    df_short = df_short.sort_values(['ecart_entree', 'score_predictif'], ascending=[True, False]).head(taille)
+    
+    colonnes = ['nom', 'club', 'position', 'valeur', 'score_predictif'] + COLONNES_SENSIBILITE
+    cols = [c for c in colonnes if c in df_short.columns]
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    tmp = fichier + ".tmp"
+    df_short[cols].to_csv(tmp, index=False, sep=";", encoding="utf-8-sig")
+    os.replace(tmp, fichier)
+    print(f"[OK] Shortlist sauvegardee: {fichier} ({len(df_short)} joueurs)")
+    return df_short
+
+
+@profilage.profiler
+def optimiser_recuit(df, budget, iterations=500 * MOUVEMENTS_PAR_ITERATION, verbose=True,
+                     composition_requise=None, stats=None, temps_max=None, graine=None):
+    """
+    Recuit simule par mouvements composes de 1 a 3 echanges, tous postes confondus.
+    - Les premiers echanges d'un mouvement sont aleatoires (souvent vers un joueur moins
+      cher) ; le dernier prend le meilleur joueur abordable de son poste avec le budget
+      ainsi libere : descendre a un poste pour monter a un autre
+    - Score et cout mis a jour par difference (O(1) par echange), prix en UNITE_BUDGET
+    - Empreinte de la composition (hachage de Zobrist) : une composition deja visitee
+      n'est pas reprise
+    - Seuls les joueurs non domines de chaque poste sont candidats (voir optimiser_exact)
+    iterations: nombre de mouvements ; temps_max: duree maximale en secondes.
+    graine: graine aleatoire (reproductibilite).
+    """
+    if composition_requise is None:
+        composition_requise = COMPOSITION_REQUISE
+    debut = _debut_stats(stats, 'recuit')
+    rng = random.Random(graine)
+    budget_max = int(np.floor(budget / UNITE_BUDGET + 1e-6))
+    
+    valeurs = df['valeur'].to_numpy(dtype=float)
+    couts_tous = np.ceil(np.round(valeurs / UNITE_BUDGET, 6)).astype(np.int64)
+    scores_tous = df['score_predictif'].fillna(0).to_numpy(dtype=float)
+    positions_tous = df['position'].to_numpy()
+    
+    # Candidats par poste (tries par cout croissant) et cles de Zobrist
+    lignes_poste, couts_poste, scores_poste, cles_poste = [], [], [], []
+    postes_places = []  # Poste de chaque place de la composition
+    choix = []          # Candidat occupant chaque place (indice dans le poste)
+    for position, nb_requis in composition_requise.items():
+        if nb_requis <= 0:
+            continue
+        lignes = np.flatnonzero((positions_tous == position) & ~np.isnan(valeurs))
+        gardes = lignes[_candidats_non_domines(couts_tous[lignes], scores_tous[lignes], nb_requis)]
+        if len(gardes) < nb_requis:
+            if verbose:
+                print(f"[WARN] {position}: seulement {len(gardes)}/{nb_requis} joueurs disponibles")
+            _fin_stats(stats, debut)
+            return df.iloc[0:0].copy(), budget
+        p = len(lignes_poste)
+        lignes_poste.append(gardes)
+        couts_poste.append(couts_tous[gardes].tolist())
+        scores_poste.append(scores_tous[gardes].tolist())
+        cles_poste.append([rng.getrandbits(64) for _ in gardes])
+        # Depart : les moins chers du poste (composition realisable s'il en existe une)
+        postes_places.extend([p] * nb_requis)
+        choix.extend(range(nb_requis))
+    
+    places = range(len(choix))
+    pris = [set() for _ in lignes_poste]
+    for place in places:
+        pris[postes_places[place]].add(choix[place])
+    cout = sum(couts_poste[postes_places[i]][choix[i]] for i in places)
+    score = sum(scores_poste[postes_places[i]][choix[i]] for i in places)
+    empreinte = 0
+    for place in places:
+        empreinte ^= cles_poste[postes_places[place]][choix[place]]
+    
+    if cout > budget_max:
+        if verbose:
+            print(f"[WARN] Aucune composition complete possible avec {budget}M")
+        _fin_stats(stats, debut)
+        return df.iloc[0:0].copy(), budget
+    
+    meilleur_score, meilleur_choix = score, list(choix)
+    _noter_meilleure(stats, debut, 'initiale', score)
+    visitees = {empreinte}
+    nb_evalues = nb_candidats = nb_ameliorants = nb_deja_visitees = 0
+    ratio_temperature = TEMPERATURE_FINALE / TEMPERATURE_INITIALE
+    temperature = TEMPERATURE_INITIALE
+    
+    for i in range(iterations):
+        if i % 256 == 0:
+            avancement = i / iterations
+            if temps_max is not None:
+                ecoule = time.perf_counter() - debut
+                if ecoule > temps_max:
+                    break
+                avancement = max(avancement, ecoule / temps_max)
+            temperature = TEMPERATURE_INITIALE * ratio_temperature ** avancement
+        nb_evalues += 1
         
-        candidats = df[
-            (df['position'] == position) &
-            (~df['id'].isin(df_compo['id'].values)) &
-            (df['valeur'] <= budget_dispo) &
-            (df['score_predictif'] > joueur_actuel['score_predictif'])
-        ]
+        nb_echanges = rng.choices((1, 2, 3), PROBA_NB_ECHANGES)[0]
+        echanges = []  # (place, nouveau candidat)
+        utilises = {}  # Candidats pris par ce mouvement, par poste
+        delta_cout = delta_score = 0
+        delta_empreinte = 0
         
-        if len(candidats) > 0:
-            meilleur_candidat = candidats.loc[candidats['score_predictif'].idxmax()]
+        places_mouvement = rng.sample(places, min(nb_echanges, len(choix)))
+        for k, place in enumerate(places_mouvement):
+            p, ancien = postes_places[place], choix[place]
+            deja = utilises.setdefault(p, set())
+            couts, scores = couts_poste[p], scores_poste[p]
             
-            nouvelle_compo = df_compo.drop(df_compo.index[idx_remplacer]).reset_index(drop=True)
-            nouvelle_compo = pd.concat([nouvelle_compo, pd.DataFrame([meilleur_candidat])], ignore_index=True)
-            nouveau_score = nouvelle_compo['score_predictif'].sum()
+            if k < len(places_mouvement) - 1:
+                # Echange aleatoire
+                nouveau = rng.randrange(len(couts))
+                if nouveau in pris[p] or nouveau in deja:
+                    continue
+            else:
+                # Dernier echange : meilleur joueur abordable avec le budget libere
+                disponible = budget_max - cout - delta_cout + couts[ancien]
+                nouveau, meilleur = None, None
+                for j, c in enumerate(couts):
+                    if c > disponible:
+                        break
+                    nb_candidats += 1
+                    if (meilleur is None or scores[j] > meilleur) and (j == ancien or (j not in pris[p] and j not in deja)):
+                        nouveau, meilleur = j, scores[j]
+                if nouveau is None:
+                    continue
             
-            if nouveau_score > meilleur_score:
-                meilleur_score = nouveau_score
-                meilleure_compo = nouvelle_compo.copy()
-                df_compo = nouvelle_compo
-                budget_restant = budget_dispo - meilleur_candidat['valeur']
+            deja.add(nouveau)
+            echanges.append((place, nouveau))
+            delta_cout += couts[nouveau] - couts[ancien]
+            delta_score += scores[nouveau] - scores[ancien]
+            delta_empreinte ^= cles_poste[p][ancien] ^ cles_poste[p][nouveau]
+        
+        if not echanges or delta_empreinte == 0 or cout + delta_cout > budget_max:
+            continue
+        if empreinte ^ delta_empreinte in visitees:
+            nb_deja_visitees += 1
+            continue
+        if delta_score < 0 and rng.random() >= math.exp(delta_score / temperature):
+            continue
+        
+        # Mouvement accepte
+        for place, nouveau in echanges:
+            p = postes_places[place]
+            pris[p].discard(choix[place])
+            pris[p].add(nouveau)
+            choix[place] = nouveau
+        cout += delta_cout
+        score += delta_score
+        empreinte ^= delta_empreinte
+        if len(visitees) >= MAX_COMPOSITIONS_VISITEES:
+            visitees.clear()
+        visitees.add(empreinte)
+        
+        if score > meilleur_score + 1e-9:
+            meilleur_score, meilleur_choix = score, list(choix)
+            nb_ameliorants += 1
+            if stats is not None:
+                stats['mouvements_evalues'] = nb_evalues
+                _noter_meilleure(stats, debut, 'recuit', meilleur_score)
+    
+    profilage.compteur('mouvements_recuit', nb_evalues)
+    if stats is not None:
+        stats['mouvements_evalues'] = nb_evalues
+        stats['candidats_evalues'] = nb_candidats
+        stats['mouvements_ameliorants'] = nb_ameliorants
+        stats['compositions_deja_visitees'] = nb_deja_visitees
+    _fin_stats(stats, debut)
+    
+    selection = sorted(lignes_poste[postes_places[i]][meilleur_choix[i]] for i in places)
+    df_compo = df.iloc[selection].reset_index(drop=True)
+    budget_restant = budget - df_compo['valeur'].sum()
     
     if verbose:
-        budget_final = budget - meilleure_compo['valeur'].sum()
-        print(f"   Score final: {meilleur_score:.1f} pts (budget restant: {budget_final:.1f}M)")
+        print(f"\n[RECUIT] {nb_evalues} mouvements, {nb_ameliorants} ameliorations")
+        print(f"   Score final: {df_compo['score_predictif'].sum():.1f} pts (budget restant: {budget_restant:.1f}M)")
     
-    return meilleure_compo, budget - meilleure_compo['valeur'].sum()
+    return df_compo, budget_restant
+
 
+def optimiser_titulaires(df, budget, solveur='amelioration', iterations=500, verbose=True,
+                         composition_requise=None, stats=None, temps_max=None, graine=None):
+    """
+    Optimise les titulaires avec le solveur choisi (voir SOLVEURS).
+    Pour le recuit, iterations est converti en mouvements (MOUVEMENTS_PAR_ITERATION).
+    """
+    if solveur == 'glouton':
+        return optimiser_composition(df, budget, verbose=verbose, composition_requise=composition_requise,
+                                     stats=stats)
+    if solveur == 'amelioration':
+        return optimiser_avec_amelioration(df, budget, iterations=iterations, verbose=verbose,
+                                           composition_requise=composition_requise, stats=stats,
+                                           temps_max=temps_max)
+    if solveur == 'recuit':
+        return optimiser_recuit(df, budget, iterations=iterations * MOUVEMENTS_PAR_ITERATION, verbose=verbose,
+                                composition_requise=composition_requise, stats=stats, temps_max=temps_max,
+                                graine=graine)
+    if solveur == 'exact':
+        return optimiser_exact(df, budget, verbose=verbose, composition_requise=composition_requise,
+                               stats=stats)
+    raise ValueError(f"Solveur inconnu: {solveur} (possibles: {', '.join(SOLVEURS)})")
 
+
+@profilage.profiler
 def selectionner_remplacants_fantasy(df, df_titulaires, budget_restant, nb_remplacants=NB_REMPLACANTS_FANTASY):
     """Selectionne les remplacants Fantasy (3 meilleurs joueurs restants dans le budget)."""
-    ids_titulaires = set(df_titulaires['id'].values)
-    df_dispo = df[~df['id'].isin(ids_titulaires)].copy()
-    
-    df_dispo = df_dispo.sort_values('score_predictif', ascending=False)
+    index = IndexJoueurs(df)
+    index.marquer_utilise(*df_titulaires['id'].values)
     
     remplacants = []
     budget = budget_restant
     
-    for _, joueur in df_dispo.iterrows():
-        if len(remplacants) >= nb_remplacants:
+    while len(remplacants) < nb_remplacants:
+        joueur = index.meilleur(budget_max=budget)
+        if joueur is None:
             break
-        if joueur['valeur'] <= budget:
-            remplacants.append(joueur)
-            budget -= joueur['valeur']
+        remplacants.append(joueur)
+        index.marquer_utilise(joueur.id)
+        budget -= joueur.valeur
     
-    df_remplacants = pd.DataFrame(remplacants)
+    df_remplacants = df.loc[[j.ligne for j in remplacants]]
     return df_remplacants, budget
 
 
+def variantes_un_echange(df, df_titulaires, budget, nb_variantes, fixes=()):
+    """
+    Meilleures compositions voisines : pour chaque titulaire (hors fixes), remplacement
+    par le meilleur joueur du meme poste qui tient dans le budget.
+    Retourne au plus nb_variantes compositions, de la plus proche a la plus eloignee en score.
+    """
+    if nb_variantes <= 0 or len(df_titulaires) == 0:
+        return []
+    
+    budget_restant = budget - df_titulaires['valeur'].sum()
+    index = IndexJoueurs(df)
+    index.marquer_utilise(*df_titulaires['id'].values)
+    
+    variantes = []
+    for idx, joueur in df_titulaires.iterrows():
+        if joueur['id'] in fixes:
+            continue
+        remplacant = index.meilleur(joueur['position'], budget_restant + joueur['valeur'])
+        if remplacant is None:
+            continue
+        variante = pd.concat([df_titulaires.drop(idx), df.loc[[remplacant.ligne]]], ignore_index=True)
+        variantes.append((remplacant.score - joueur['score_predictif'], variante))
+    
+    variantes.sort(key=lambda v: v[0], reverse=True)
+    return [v for _, v in variantes[:nb_variantes]]
+
+
+def lignes_par_id(df, ids):
+    """Lignes du pool correspondant a une liste d'ids (dans le meme ordre)."""
+    if len(ids) == 0:
+        return df.iloc[0:0].copy()
+    return df.set_index('id').loc[list(ids)].reset_index()
+
+
+def _lignes_origine(df, selection):
+    """Lignes du pool d'origine correspondant a une selection (dans le meme ordre)."""
+    return lignes_par_id(df, selection['id'].values)
+
+
+def optimiser_requete(df, budget, verrous=(), exclus=(), objectif='score_predictif', top_k=1,
+                      iterations=500, nb_remplacants=NB_REMPLACANTS_FANTASY, stats=None,
+                      solveur='amelioration', temps_max=None, graine=None):
+    """
+    Optimisation parametree (service d'optimisation, optimisation par lot).
+    - verrous: ids imposes parmi les titulaires ; exclus: ids interdits
+    - objectif: colonne maximisee (voir OBJECTIFS)
+    - top_k: nombre de compositions retournees (la meilleure, puis les meilleures
+      variantes a un echange pres)
+    - solveur, temps_max, graine: voir optimiser_titulaires
+    stats: dict optionnel rempli par le solveur (voir optimiser_avec_amelioration).
+    Retourne une liste de (df_titulaires, df_remplacants), meilleure d'abord.
+    Leve ValueError si la requete est irrealisable.
+    """
+    if objectif not in OBJECTIFS or objectif not in df.columns:
+        raise ValueError(f"Objectif inconnu: {objectif} (possibles: {', '.join(OBJECTIFS)})")
+    verrous = list(dict.fromkeys(verrous))
+    exclus = set(exclus)
+    if set(verrous) & exclus:
+        raise ValueError("Des joueurs sont a la fois verrouilles et exclus")
+    
+    pool = df[~df['id'].isin(exclus)]
+    if objectif != 'score_predictif':
+        pool = pool.assign(score_predictif=pool[objectif].fillna(0))
+    
+    df_verrous = pool[pool['id'].isin(verrous)]
+    manquants = set(verrous) - set(df_verrous['id'])
+    if manquants:
+        raise ValueError(f"Joueurs verrouilles absents du pool: {sorted(manquants)}")
+    
+    composition_requise = dict(COMPOSITION_REQUISE)
+    for position, nb in df_verrous['position'].value_counts().items():
+        if nb > composition_requise.get(position, 0):
+            raise ValueError(f"Trop de joueurs verrouilles au poste {position}")
+        composition_requise[position] -= nb
+    budget_libre = budget - df_verrous['valeur'].sum()
+    if budget_libre < 0:
+        raise ValueError("Les joueurs verrouilles depassent le budget")
+    
+    libres = pool[~pool['id'].isin(verrous)]
+    df_compo, _ = optimiser_titulaires(libres, budget_libre, solveur=solveur, iterations=iterations,
+                                       verbose=False, composition_requise=composition_requise,
+                                       stats=stats, temps_max=temps_max, graine=graine)
+    df_titulaires = pd.concat([df_verrous, df_compo], ignore_index=True)
+    
+    solutions = [df_titulaires] + variantes_un_echange(pool, df_titulaires, budget, top_k - 1, fixes=set(verrous))
+    solutions.sort(key=lambda tit: tit['score_predictif'].sum(), reverse=True)
+    
+    resultats = []
+    for tit in solutions:
+        remp, _ = selectionner_remplacants_fantasy(pool, tit, budget - tit['valeur'].sum(), nb_remplacants)
+        if objectif != 'score_predictif':
+            tit, remp = _lignes_origine(df, tit), _lignes_origine(df, remp)
+        resultats.append((tit, remp))
+    return resultats
+
+
 def afficher_composition(df_titulaires, df_remplacants, budget_initial):
     """Affiche la composition complete avec capitaine et supersub."""
     print("\n" + "=" * 70)
@@ -323,18 +1029,47 @@ def sauvegarder_composition(df_titulaires, df_remplacants, fichier=None):
     df_total = pd.concat([df_tit, df_remp], ignore_index=True)
     
     colonnes = ['nom', 'nomcomplet', 'club', 'position', 'valeur', 
-                'score_predictif', 'adversaire', 'domicile', 'role_fantasy']
+                'score_predictif', 'adversaire', 'domicile', 'role_fantasy',
+                'perte_si_exclu', 'ecart_entree', 'prix_entree']
     cols = [c for c in colonnes if c in df_total.columns]
-    df_total[cols].to_csv(fichier, index=False, sep=";", encoding="utf-8-sig")
+    # Ecriture atomique : un lecteur ne voit jamais de fichier a moitie ecrit
+    tmp = fichier + ".tmp"
+    df_total[cols].to_csv(tmp, index=False, sep=";", encoding="utf-8-sig")
+    os.replace(tmp, fichier)
     print(f"\n[OK] Composition sauvegardee: {fichier}")
 
 
+def afficher_sensibilite(df_titulaires, df_shortlist, nb=5):
+    """Titulaires les plus indispensables et joueurs les plus proches d'entrer."""
+    print("\n[SENSIBILITE] Titulaires les plus couteux a perdre:")
+    for _, j in df_titulaires.sort_values('perte_si_exclu', ascending=False).head(nb).iterrows():
+        perte = "seul joueur possible au poste" if np.isinf(j['perte_si_exclu']) else f"-{j['perte_si_exclu']:.1f} pts si exclu"
+        print(f"   {j['nom']:20} | {j['valeur']:5.1f}M | {perte}")
+    print("[SENSIBILITE] Joueurs les plus proches d'entrer:")
+    for _, j in df_shortlist.head(nb).iterrows():
+        prix = "" if pd.isna(j['prix_entree']) else f" ou a {j['prix_entree']:.1f}M"
+        print(f"   {j['nom']:20} | {j['valeur']:5.1f}M | manque {j['ecart_entree']:.1f} pts "
+              f"(entre a {j['score_entree']:.1f} pts{prix})")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Optimiseur de Composition Fantasy Rugby")
     parser.add_argument('--budget', type=float, default=300, help='Budget en millions (defaut: 300)')
     parser.add_argument('--remplacants', action='store_true', help='Inclure les remplacants reels dans la pool de joueurs')
     parser.add_argument('--iterations', type=int, default=500, help='Nb iterations optimisation (defaut: 500)')
     parser.add_argument('--output', type=str, default=None, help='Fichier de sortie')
+    parser.add_argument('--solveur', choices=SOLVEURS, default='amelioration',
+                        help='Solveur des titulaires (defaut: amelioration)')
+    parser.add_argument('--temps-max', type=float, default=None,
+                        help='Duree maximale de la recherche (phase aleatoire, recuit) en secondes (defaut: aucune)')
+    parser.add_argument('--sans-cache', action='store_true',
+                        help='Ignorer le cache des resultats (recalcul force)')
+    parser.add_argument('--sans-sensibilite', action='store_true',
+                        help="Ne pas calculer l'analyse de sensibilite (colonnes de sensibilite, shortlist.csv). "
+                             "Calculee avec --solveur exact, ou si la composition atteint l'optimum exact")
+    parser.add_argument('--stats', action='store_true', help='Afficher les statistiques de recherche')
+    parser.add_argument('--trace-convergence', type=str, default=None, metavar='FICHIER',
+                        help='Exporter la trace de convergence (score au cours du temps) en CSV')
     
     args = parser.parse_args()
     
@@ -355,23 +1090,66 @@ def main():
         print("[ERREUR] Pas de score_predictif. Executez d'abord score_predictif.py")
         return
     
-    # 4. Optimiser les 15 titulaires
-    df_titulaires, budget_restant = optimiser_avec_amelioration(
-        df, args.budget, iterations=args.iterations
-    )
+    # 4. Resultat deja calcule pour ce pool et ces parametres ? (statistiques : recherche obligatoire)
+    stats = {} if (args.stats or args.trace_convergence) else None
+    cle, entree = None, None
+    if not args.sans_cache and stats is None:
+        parametres = {'budget': args.budget, 'solveur': args.solveur, 'iterations': args.iterations,
+                      'temps_max': args.temps_max, 'remplacants': args.remplacants}
+        cle = cache_resultats.cle_resultat(df, parametres)
+        entree = cache_resultats.lire(cle)
     
-    # 5. Selectionner les 3 remplacants Fantasy
-    df_remplacants, budget_final = selectionner_remplacants_fantasy(
-        df, df_titulaires, budget_restant
-    )
+    if entree is not None:
+        print("\n[CACHE] Resultat deja calcule pour ce pool et ces parametres (--sans-cache pour recalculer)")
+        df_titulaires = lignes_par_id(df, entree['titulaires'])
+        df_remplacants = lignes_par_id(df, entree['remplacants'])
+    else:
+        # 5. Optimiser les 15 titulaires
+        df_titulaires, budget_restant = optimiser_titulaires(
+            df, args.budget, solveur=args.solveur, iterations=args.iterations, stats=stats,
+            temps_max=args.temps_max
+        )
+        if args.stats:
+            afficher_stats(stats)
+        if args.trace_convergence:
+            exporter_trace_convergence(stats, args.trace_convergence)
+        
+        # 6. Selectionner les 3 remplacants Fantasy
+        df_remplacants, budget_final = selectionner_remplacants_fantasy(
+            df, df_titulaires, budget_restant
+        )
+        if cle is not None:
+            cache_resultats.ecrire(cle, parametres, df_titulaires['id'], df_remplacants['id'])
     
     print(f"\n   [OK] {len(df_titulaires)} titulaires + {len(df_remplacants)} remplacants selectionnes")
     
-    # 6. Afficher
+    # 7. Sensibilite de l'optimum a chaque joueur (une passe sur les tables du solveur exact).
+    #    Mesuree par rapport a l'optimum exact : seulement si la composition l'atteint
+    sensibilite = None
+    if not args.sans_sensibilite:
+        if args.solveur == 'exact' or composition_optimale(df, args.budget, df_titulaires):
+            sensibilite = analyser_sensibilite(df, args.budget)
+        else:
+            print(f"\n[WARN] Composition du solveur '{args.solveur}' sous l'optimum exact : "
+                  "ma_composition.csv sans colonnes de sensibilite et pas de shortlist.csv "
+                  "(--solveur exact pour les obtenir)")
+    if sensibilite is not None:
+        sensibilite_par_id = sensibilite.set_index(df['id'].to_numpy())
+        df_titulaires = df_titulaires.join(sensibilite_par_id, on='id')
+        df_remplacants = df_remplacants.join(sensibilite_par_id, on='id')
+    
+    # 8. Afficher
     afficher_composition(df_titulaires, df_remplacants, args.budget)
     
-    # 7. Sauvegarder
+    # 9. Sauvegarder
     sauvegarder_composition(df_titulaires, df_remplacants, args.output)
+    if sensibilite is not None:
+        fichier_shortlist = FICHIER_SHORTLIST
+        if args.output:
+            fichier_shortlist = os.path.join(os.path.dirname(os.path.abspath(args.output)), "shortlist.csv")
+        ids_composition = list(df_titulaires['id']) + list(df_remplacants['id'])
+        df_shortlist = sauvegarder_shortlist(df, sensibilite, ids_composition, fichier_shortlist)
+        afficher_sensibilite(df_titulaires, df_shortlist)
     
     print("\n[OK] Termine !")
 
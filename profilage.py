@@ -0,0 +1,262 @@
+"""
+Profilage du pipeline - Fantasy Rugby "La Grande Melee"
+Mesure ou passe le temps : reseau, parsing HTML, matching, scoring, recherche.
+
+- Par etape (script) : temps mur, temps CPU, pic de memoire (RSS)
+- Par fonction chaude (decorateur @profiler) : nombre d'appels, temps mur et CPU cumules
+- Compteurs : requetes HTTP, octets, noms matches, joueurs scores, echanges evalues...
+
+Chaque script lance par main.py ajoute ses mesures a la trace en fin d'execution ;
+main.py assemble la trace JSON (output/profils/) et affiche un tableau recapitulatif.
+Sans profilage actif, les decorateurs ne modifient pas les fonctions (cout nul).
+
+Variable d'environnement (heritee par les sous-scripts lances depuis main.py):
+    LGM_PROFIL=chemin/trace.json   Active le profilage
+
+Usage:
+    python main.py --profile                         # Pipeline profile
+    python profilage.py output/profils/X.json        # Relire une trace
+    python profilage.py ancienne.json nouvelle.json  # Comparer deux executions
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure du pic memoire
+    resource = None
+
+# --- CONFIGURATION ---
+VAR_PROFIL = "LGM_PROFIL"
+DOSSIER_PROFILS = os.path.join(os.path.dirname(__file__), "output", "profils")
+NB_FONCTIONS_RESUME = 5     # Fonctions les plus couteuses affichees par etape
+
+# Mesures du processus courant
+_mesures = {'fonctions': {}, 'compteurs': {}}
+_etapes = []
+_verrou = threading.Lock()
+_debut_processus = (time.perf_counter(), time.process_time())
+
+
+def actif():
+    """Indique si le profilage est actif (propage aux sous-processus)."""
+    return bool(os.environ.get(VAR_PROFIL))
+
+
+def activer(chemin=None):
+    """Active le profilage ; la trace sera ecrite dans `chemin` (defaut: output/profils/profil_<date>.json)."""
+    if chemin is None:
+        chemin = os.path.join(DOSSIER_PROFILS, f"profil_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    os.environ[VAR_PROFIL] = os.path.abspath(chemin)
+    return os.environ[VAR_PROFIL]
+
+
+def rss_max_mo():
+    """Pic de memoire residente du processus courant (Mo), None si non mesurable."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def compteur(nom, valeur=1):
+    """Incremente un compteur (sans effet si le profilage est inactif)."""
+    if not actif():
+        return
+    with _verrou:
+        _mesures['compteurs'][nom] = _mesures['compteurs'].get(nom, 0) + valeur
+
+
+def _cumuler(nom, wall, cpu):
+    with _verrou:
+        stats = _mesures['fonctions'].setdefault(nom, {'appels': 0, 'wall_s': 0.0, 'cpu_s': 0.0})
+        stats['appels'] += 1
+        stats['wall_s'] += wall
+        stats['cpu_s'] += cpu
+
+
+@contextmanager
+def mesurer(nom):
+    """Mesure un bloc de code comme une fonction chaude."""
+    if not actif():
+        yield
+        return
+    debut_wall, debut_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        _cumuler(nom, time.perf_counter() - debut_wall, time.thread_time() - debut_cpu)
+
+
+def profiler(fonction):
+    """
+    Decorateur des fonctions chaudes : appels, temps mur et CPU cumules.
+    Le temps CPU est celui du thread appelant (appels concurrents additionnes).
+    """
+    if not actif():
+        return fonction
+    module = fonction.__module__
+    if module == '__main__':
+        module = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    nom = f"{module}.{fonction.__name__}"
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        debut_wall, debut_cpu = time.perf_counter(), time.thread_time()
+        try:
+            return fonction(*args, **kwargs)
+        finally:
+            _cumuler(nom, time.perf_counter() - debut_wall, time.thread_time() - debut_cpu)
+
+    return enveloppe
+
+
+def mesures_processus():
+    """Mesures du processus courant depuis l'import du module."""
+    debut_wall, debut_cpu = _debut_processus
+    return {
+        'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python',
+        'pid': os.getpid(),
+        'wall_s': round(time.perf_counter() - debut_wall, 4),
+        'cpu_s': round(time.process_time() - debut_cpu, 4),
+        'rss_max_mo': rss_max_mo(),
+        'fonctions': {
+            nom: {'appels': s['appels'], 'wall_s': round(s['wall_s'], 4), 'cpu_s': round(s['cpu_s'], 4)}
+            for nom, s in _mesures['fonctions'].items()
+        },
+        'compteurs': dict(_mesures['compteurs']),
+    }
+
+
+def _ajouter_a_la_trace():
+    """En fin de sous-script : ajoute ses mesures aux fragments de la trace."""
+    chemin = os.environ.get(VAR_PROFIL)
+    if not chemin:
+        return
+    with open(chemin + ".parts", 'a', encoding='utf-8') as f:
+        f.write(json.dumps(mesures_processus(), ensure_ascii=False) + "\n")
+
+
+def enregistrer_etape(nom, script, wall_s, succes=True):
+    """Enregistre une etape du pipeline (temps mur vu par main.py, demarrage de Python compris)."""
+    _etapes.append({'etape': nom, 'script': script, 'wall_total_s': round(wall_s, 4), 'succes': succes})
+
+
+def finaliser(chemin=None):
+    """
+    Assemble la trace (etapes de main.py + mesures de chaque sous-script),
+    l'ecrit en JSON et affiche le resume. Retourne la trace.
+    """
+    chemin = chemin or os.environ.get(VAR_PROFIL)
+    if not chemin:
+        return None
+
+    processus = []
+    if os.path.exists(chemin + ".parts"):
+        with open(chemin + ".parts", 'r', encoding='utf-8') as f:
+            processus = [json.loads(ligne) for ligne in f if ligne.strip()]
+        os.remove(chemin + ".parts")
+
+    etapes = []
+    restants = list(processus)
+    for etape in _etapes:
+        mesures = next((p for p in restants if p['script'] == etape['script']), None)
+        if mesures is not None:
+            restants.remove(mesures)
+            etape = {**etape, **mesures}
+        etapes.append(etape)
+    etapes.extend(restants)
+
+    trace = {
+        'date': datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        'commande': ' '.join(sys.argv),
+        'wall_total_s': round(sum(e.get('wall_total_s', e.get('wall_s', 0)) for e in etapes), 4),
+        'etapes': etapes,
+    }
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False, indent=2)
+
+    afficher_resume(trace)
+    print(f"\n[OK] Trace de profilage: {chemin}")
+    return trace
+
+
+def afficher_resume(trace):
+    """Tableau recapitulatif d'une trace : etapes, fonctions chaudes, compteurs."""
+    print("\n" + "=" * 78)
+    print(f"PROFIL D'EXECUTION - {trace['date']}")
+    print("=" * 78)
+    print(f"   {'Etape':28} | {'Mur (s)':>8} | {'Hors import':>11} | {'CPU (s)':>8} | {'RSS max (Mo)':>12}")
+    print("   " + "-" * 76)
+    for e in trace['etapes']:
+        nom = e.get('script', e.get('etape', '?'))
+        rss = e.get('rss_max_mo')
+        print(f"   {nom[:28]:28} | {e.get('wall_total_s', e.get('wall_s', 0)):8.2f} | "
+              f"{e.get('wall_s', 0):11.2f} | {e.get('cpu_s', 0):8.2f} | "
+              f"{'-' if rss is None else f'{rss:.0f}':>12}")
+    print("   " + "-" * 76)
+    print(f"   {'TOTAL':28} | {trace['wall_total_s']:8.2f} |")
+
+    for e in trace['etapes']:
+        fonctions = sorted(e.get('fonctions', {}).items(), key=lambda f: f[1]['wall_s'], reverse=True)
+        compteurs = e.get('compteurs', {})
+        if not fonctions and not compteurs:
+            continue
+        print(f"\n   {e.get('script', e.get('etape', '?'))}")
+        for nom, s in fonctions[:NB_FONCTIONS_RESUME]:
+            print(f"      {nom[:44]:44} {s['appels']:6d} appels | {s['wall_s']:7.3f}s mur | {s['cpu_s']:7.3f}s CPU")
+        for nom, valeur in sorted(compteurs.items()):
+            print(f"      # {nom:42} {valeur}")
+
+
+def comparer(trace_a, trace_b):
+    """Compare deux traces etape par etape (temps mur et pic memoire)."""
+    print("\n" + "=" * 78)
+    print(f"COMPARAISON {trace_a['date']} -> {trace_b['date']}")
+    print("=" * 78)
+    avant = {e.get('script', e.get('etape')): e for e in trace_a['etapes']}
+    for e in trace_b['etapes']:
+        nom = e.get('script', e.get('etape'))
+        a = avant.get(nom)
+        if a is None:
+            print(f"   {nom[:28]:28} | nouvelle etape")
+            continue
+        mur_a = a.get('wall_total_s', a.get('wall_s', 0))
+        mur_b = e.get('wall_total_s', e.get('wall_s', 0))
+        ecart = (mur_b - mur_a) / mur_a * 100 if mur_a else 0.0
+        print(f"   {nom[:28]:28} | {mur_a:7.2f}s -> {mur_b:7.2f}s ({ecart:+5.0f}%) | "
+              f"RSS {a.get('rss_max_mo') or '-'} -> {e.get('rss_max_mo') or '-'} Mo")
+    print(f"   {'TOTAL':28} | {trace_a['wall_total_s']:7.2f}s -> {trace_b['wall_total_s']:7.2f}s")
+
+
+# Sous-script lance avec LGM_PROFIL : mesures ajoutees a la trace a la sortie
+if actif():
+    atexit.register(_ajouter_a_la_trace)
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        return
+    traces = []
+    for chemin in sys.argv[1:]:
+        with open(chemin, 'r', encoding='utf-8') as f:
+            traces.append(json.load(f))
+    if len(traces) == 1:
+        afficher_resume(traces[0])
+    else:
+        comparer(*traces)
+
+
+if __name__ == "__main__":
+    main()
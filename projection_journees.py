@@ -0,0 +1,352 @@
+"""
+Projection des scores sur les prochaines journees - Fantasy Rugby "La Grande Melee"
+score_predictif.py ne note que le prochain match de chaque joueur. Pour les decisions
+sur plusieurs semaines (transferts, rotation du capitaine), ce module projette le score
+de chaque joueur sur les N prochaines journees du calendrier :
+
+- Table de difficulte club x groupe de postes x journee, construite depuis
+  output/calendrier_saison.csv et le classement : facteur = bonus domicile/exterieur x
+  bonus adversaire, avec les coefficients de score_predictif (0 : pas de match cette
+  journee). Avec les notations des clubs (--notations, ou pool score avec --notations),
+  bonus adversaire et forme equipe viennent des notations attaque/defense par groupe
+  de postes (voir notation_clubs.py) au lieu du rang et de la forme G/N/P
+- Matrice joueurs x journees en une passe vectorisee : part du score independante du
+  match (stat_moy x forme joueur x forme equipe) multipliee par la ligne de la table
+  du club et du groupe de postes du joueur
+- Cache dans output/projection/ : la table n'est recalculee que si le calendrier, le
+  classement, les notations ou les coefficients changent ; la matrice aussi si le pool change
+
+Usage:
+    python projection_journees.py                   # 5 prochaines journees
+    python projection_journees.py --journees 8      # Horizon personnalise
+    python projection_journees.py --journee 14      # A partir d'une journee donnee
+    python projection_journees.py --notations       # Difficulte depuis les notations des clubs
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import calcul_classement
+import notation_clubs
+import scrape_classement
+import score_predictif
+
+# --- CONFIGURATION ---
+FICHIER_JOUEURS = os.path.join(os.path.dirname(__file__), "output", "joueurs_avec_score.csv")
+FICHIER_COMPOSITION = os.path.join(os.path.dirname(__file__), "output", "ma_composition.csv")
+FICHIER_SORTIE = os.path.join(os.path.dirname(__file__), "output", "projection_journees.csv")
+DOSSIER_PROJECTION = os.path.join(os.path.dirname(__file__), "output", "projection")
+NB_JOURNEES_PROJECTION = 5
+# Colonnes du pool qui determinent la matrice
+COLONNES_POOL = ['id', 'club', 'position', 'stat_moy', 'forme_recent', 'bonus_forme_historique']
+
+
+def _empreinte(*parties):
+    brut = json.dumps(parties, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(brut.encode('utf-8')).hexdigest()
+
+
+def cle_table(matchs, classement, journees, notations=None):
+    """Cle de la table : affiches des journees, classement, notations, coefficients du scoring."""
+    affiches = sorted((m['journee'], m['club_dom'], m['club_ext']) for m in matchs if m['journee'] in journees)
+    etat = {club: (info.get('rang', 0), info.get('forme', '')) for club, info in classement.items()}
+    notes = None
+    if notations is not None:
+        notes = (list(notations['clubs']), int(notations['journee']),
+                 notations['attaque'].tolist(), notations['defense'].tolist())
+    return _empreinte(list(journees), affiches, etat, notes, score_predictif.coefficients_scoring())
+
+
+def cle_matrice(df, cle_de_table):
+    """Cle de la matrice : cle de la table + empreinte des colonnes du pool utilisees."""
+    colonnes = [c for c in COLONNES_POOL if c in df.columns]
+    h = hashlib.sha256(cle_de_table.encode('utf-8'))
+    h.update(','.join(colonnes).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df[colonnes], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def journees_a_projeter(matchs, journee_debut=None, nb_journees=NB_JOURNEES_PROJECTION):
+    """Journees projetees : a partir de la prochaine journee a jouer (ou journee_debut), bornees a la saison."""
+    if journee_debut is None:
+        journee_debut = scrape_classement.detecter_journee_courante(matchs) or scrape_classement.JOURNEE_DEFAUT
+    derniere = max([m['journee'] for m in matchs], default=scrape_classement.NB_JOURNEES_SAISON)
+    return list(range(journee_debut, min(journee_debut + nb_journees, derniere + 1)))
+
+
+def construire_table(matchs, classement, journees, notations=None):
+    """
+    Table de difficulte club x groupe de postes x journee. Retourne un dict de tableaux :
+    clubs (noms normalises), journees, facteur (clubs x groupes x journees, float32,
+    0 sans match), adversaire (clubs x journees, indice dans clubs, -1 sans match),
+    domicile (bool), forme_equipe (bonus de forme de chaque club, clubs x groupes).
+    notations: notations des clubs a une journee (notation_clubs.notations_a_la_journee) ;
+    bonus adversaire et forme equipe en sont alors tires, par groupe de postes.
+    """
+    clubs = sorted({m['club_dom'] for m in matchs} | {m['club_ext'] for m in matchs} | set(classement))
+    numeros = {club: i for i, club in enumerate(clubs)}
+    colonnes = {journee: k for k, journee in enumerate(journees)}
+    nb_groupes = len(notation_clubs.GROUPES)
+
+    if notations is None:
+        # Bonus adversaire (rang) et forme G/N/P : un calcul par club, le meme pour tous les postes
+        bonus_adversaire = np.array([score_predictif.calculer_bonus_adversaire(classement.get(c, {}).get('rang', 0))
+                                     for c in clubs])
+        forme_equipe = np.array([score_predictif.calculer_bonus_forme_equipe(classement.get(c, {}).get('forme', ''))
+                                 for c in clubs])
+        bonus_adversaire = np.repeat(bonus_adversaire[:, None], nb_groupes, axis=1)
+        forme_equipe = np.repeat(forme_equipe[:, None], nb_groupes, axis=1)
+    else:
+        # Notations attaque/defense par groupe de postes ; club non note (indice -1) : neutre
+        equipe, contre = notation_clubs.multiplicateurs(notations)
+        lignes = notation_clubs.codes_clubs(clubs, list(notations['clubs']))
+        forme_equipe = np.vstack([equipe, np.ones((1, nb_groupes))])[lignes]
+        bonus_adversaire = np.vstack([contre, np.ones((1, nb_groupes))])[lignes]
+
+    facteur = np.zeros((len(clubs), nb_groupes, len(journees)), dtype=np.float32)
+    adversaire = np.full((len(clubs), len(journees)), -1, dtype=np.int16)
+    domicile = np.zeros((len(clubs), len(journees)), dtype=bool)
+    for m in matchs:
+        k = colonnes.get(m['journee'])
+        if k is None or not m['club_dom'] or not m['club_ext']:
+            continue
+        dom, ext = numeros[m['club_dom']], numeros[m['club_ext']]
+        facteur[dom, :, k] = score_predictif.BONUS_DOMICILE * bonus_adversaire[ext]
+        facteur[ext, :, k] = score_predictif.BONUS_EXTERIEUR * bonus_adversaire[dom]
+        adversaire[dom, k], adversaire[ext, k] = ext, dom
+        domicile[dom, k] = True
+
+    return {
+        'clubs': np.array(clubs, dtype=str),
+        'journees': np.array(journees, dtype=np.int16),
+        'facteur': facteur,
+        'adversaire': adversaire,
+        'domicile': domicile,
+        'forme_equipe': forme_equipe.astype(np.float32),
+    }
+
+
+def _codes_clubs(df, clubs):
+    """Indice de chaque joueur dans clubs (noms du pool normalises), -1 si club inconnu."""
+    codes, libelles = pd.factorize(df['club'].astype(object))
+    numeros = {club: i for i, club in enumerate(clubs)}
+    correspondance = np.array([numeros.get(scrape_classement.normaliser_nom_club(str(nom)), -1) for nom in libelles]
+                              + [-1], dtype=np.int32)
+    return correspondance[codes]  # Code -1 (club manquant) -> dernier element
+
+
+def calculer_matrice(df, table):
+    """
+    Matrice des scores projetes (float32, une ligne par joueur du pool, une colonne par journee).
+    Un joueur sans stat_moy, sans club connu ou sans match une journee y vaut 0.
+    """
+    stat_moy = np.nan_to_num(df['stat_moy'].to_numpy(dtype=float), nan=0.0)
+
+    # Bonus forme joueur : un calcul par chaine de forme distincte, sauf forme historique deja scoree
+    codes_forme, formes = pd.factorize(df['forme_recent'].astype(object))
+    bonus_forme = np.array([score_predictif.calculer_bonus_forme(f) for f in formes] + [1.0])[codes_forme]
+    if 'bonus_forme_historique' in df.columns:
+        historique = df['bonus_forme_historique'].to_numpy(dtype=float)
+        bonus_forme = np.where(np.isnan(historique), bonus_forme, historique)
+
+    codes = _codes_clubs(df, table['clubs'])
+    if 'position' in df.columns:
+        groupes = notation_clubs.codes_groupes(df['position'])
+    else:
+        groupes = np.zeros(len(df), dtype=np.int32)
+    # Ligne supplementaire (indice -1) : club inconnu, aucun match
+    _, nb_groupes, nb_journees = table['facteur'].shape
+    facteur = np.concatenate([table['facteur'], np.zeros((1, nb_groupes, nb_journees), dtype=np.float32)])
+    forme_equipe = np.vstack([table['forme_equipe'], np.ones((1, nb_groupes), dtype=np.float32)])
+
+    base = (stat_moy * bonus_forme * forme_equipe[codes, groupes]).astype(np.float32)
+    return base[:, None] * facteur[codes, groupes]
+
+
+def _lire_npz(chemin, cle):
+    """Contenu d'un fichier .npz du cache si sa cle correspond, sinon None."""
+    try:
+        with np.load(chemin, allow_pickle=False) as f:
+            if str(f['cle']) != cle:
+                return None
+            return {nom: f[nom] for nom in f.files if nom != 'cle'}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _ecrire_npz(chemin, cle, tableaux):
+    """Ecriture atomique d'un fichier .npz du cache."""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(chemin), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, cle=np.array(cle), **tableaux)
+        os.replace(tmp, chemin)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def projeter(df, matchs, classement, journee_debut=None, nb_journees=NB_JOURNEES_PROJECTION,
+             cache=True, dossier=DOSSIER_PROJECTION, notations=None):
+    """
+    Retourne (table, matrice) pour le pool df sur les nb_journees a partir de journee_debut
+    (defaut : prochaine journee a jouer). La table et la matrice sont relues depuis le
+    cache tant que calendrier, classement, notations, coefficients et pool n'ont pas change.
+    """
+    journees = journees_a_projeter(matchs, journee_debut, nb_journees)
+    cle = cle_table(matchs, classement, journees, notations)
+    chemin_table = os.path.join(dossier, "difficulte.npz")
+    table = _lire_npz(chemin_table, cle) if cache else None
+    if table is None:
+        table = construire_table(matchs, classement, journees, notations)
+        if cache:
+            _ecrire_npz(chemin_table, cle, table)
+    else:
+        print("[CACHE] Table de difficulte inchangee")
+
+    cle_mat = cle_matrice(df, cle)
+    chemin_matrice = os.path.join(dossier, "matrice.npz")
+    contenu = _lire_npz(chemin_matrice, cle_mat) if cache else None
+    if contenu is None:
+        matrice = calculer_matrice(df, table)
+        if cache:
+            _ecrire_npz(chemin_matrice, cle_mat, {'matrice': matrice})
+    else:
+        print("[CACHE] Matrice de projection inchangee")
+        matrice = contenu['matrice']
+    return table, matrice
+
+
+def capitaines_par_journee(df, matrice, table, ids=None):
+    """
+    Rotation du capitaine : pour chaque journee, le joueur au plus fort score projete
+    (parmi ids si fourni, ex: la composition). DataFrame journee, id, nom, club, adversaire, score.
+    """
+    lignes = np.arange(len(df)) if ids is None else np.flatnonzero(df['id'].isin(ids).to_numpy())
+    if len(lignes) == 0:
+        return pd.DataFrame(columns=['journee', 'id', 'nom', 'club', 'adversaire', 'score'])
+    meilleurs = lignes[np.argmax(matrice[lignes], axis=0)]
+    codes = _codes_clubs(df.iloc[meilleurs], table['clubs'])
+    colonnes = np.arange(len(table['journees']))
+    adversaires = np.where(codes >= 0, table['adversaire'][codes, colonnes], -1)
+    return pd.DataFrame({
+        'journee': table['journees'],
+        'id': df['id'].to_numpy()[meilleurs],
+        'nom': df['nom'].to_numpy()[meilleurs] if 'nom' in df.columns else '',
+        'club': df['club'].astype(object).to_numpy()[meilleurs],
+        'adversaire': [table['clubs'][a] if a >= 0 else '' for a in adversaires],
+        'score': np.round(matrice[meilleurs, colonnes], 2),
+    })
+
+
+def ids_titulaires(df, compo):
+    """Ids des titulaires (capitaine compris) d'une composition au format de ma_composition.csv."""
+    titulaires = compo[compo['role_fantasy'].isin(['titulaire', 'capitaine'])]
+    if 'id' in titulaires.columns:
+        return titulaires['id']
+    # ma_composition.csv n'exporte pas l'id : correspondance par nom complet et club
+    cles = ['nomcomplet', 'club']
+    return df[cles + ['id']].astype({c: object for c in cles}).merge(
+        titulaires[cles].astype(object), on=cles)['id']
+
+
+def tableau_projection(df, matrice, table):
+    """DataFrame exportable : infos joueur, une colonne J<journee> par journee, total."""
+    colonnes = [c for c in ('id', 'nom', 'club', 'position', 'valeur') if c in df.columns]
+    sortie = df[colonnes].reset_index(drop=True)
+    projections = pd.DataFrame(np.round(matrice.astype(float), 2),
+                               columns=[f"J{j}" for j in table['journees']])
+    sortie = pd.concat([sortie, projections], axis=1)
+    sortie['total'] = np.round(matrice.sum(axis=1, dtype=float), 2)
+    return sortie.sort_values('total', ascending=False, kind='stable')
+
+
+def sauvegarder_projection(sortie, fichier=FICHIER_SORTIE):
+    """Sauvegarde la projection (CSV, ecriture atomique)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    sortie.to_csv(tmp, sep=';', index=False, encoding='utf-8-sig')
+    os.replace(tmp, fichier)
+    print(f"[OK] Projection sauvegardee: {fichier}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Projection des scores sur les prochaines journees')
+    parser.add_argument('--journees', type=int, default=NB_JOURNEES_PROJECTION,
+                        help=f'Nombre de journees projetees (defaut: {NB_JOURNEES_PROJECTION})')
+    parser.add_argument('--journee', type=int, default=None,
+                        help='Premiere journee projetee (defaut: prochaine journee a jouer)')
+    parser.add_argument('--input', type=str, default=FICHIER_JOUEURS,
+                        help='CSV des joueurs scores')
+    parser.add_argument('--output', type=str, default=FICHIER_SORTIE,
+                        help='CSV de sortie')
+    parser.add_argument('--composition', type=str, default=FICHIER_COMPOSITION,
+                        help='Composition pour la rotation du capitaine')
+    parser.add_argument('--notations', action='store_true',
+                        help='Bonus equipe et adversaire depuis les notations attaque/defense des clubs '
+                             '(automatique si le pool a ete score avec --notations)')
+    parser.add_argument('--sans-cache', action='store_true',
+                        help='Recalculer la table et la matrice sans lire ni ecrire le cache')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PROJECTION SUR LES PROCHAINES JOURNEES")
+    print("=" * 60)
+
+    if not os.path.exists(scrape_classement.FICHIER_CALENDRIER):
+        print(f"[ERREUR] Calendrier introuvable: {scrape_classement.FICHIER_CALENDRIER}")
+        print("   Lancez d'abord scrape_classement.py")
+        return
+    if not os.path.exists(args.input):
+        print(f"[ERREUR] Fichier {args.input} non trouve. Lancez d'abord score_predictif.py")
+        return
+
+    matchs = calcul_classement.charger_matchs_calendrier(scrape_classement.FICHIER_CALENDRIER)
+    if args.journee is not None:
+        classement = score_predictif.charger_classement_journee(args.journee)
+    else:
+        classement = score_predictif.charger_classement()
+    df = pd.read_csv(args.input, sep=';', encoding='utf-8-sig')
+    print(f"   {len(df)} joueurs, {len(matchs)} matchs au calendrier")
+
+    notations = None
+    if args.notations or 'bonus_equipe_notation' in df.columns:
+        # Memes notations que le score du prochain match (score_predictif.py --notations)
+        notations = score_predictif.charger_notations(args.journee)
+        if notations is None:
+            print("[WARN] Aucune notation de club disponible : difficulte depuis le classement")
+        else:
+            print(f"   Notations des clubs a l'issue de la journee {notations['journee']}")
+
+    table, matrice = projeter(df, matchs, classement, args.journee, args.journees,
+                              cache=not args.sans_cache, notations=notations)
+    if len(table['journees']) == 0:
+        print("[WARN] Aucune journee a projeter")
+        return
+    print(f"[OK] Journees {table['journees'][0]} a {table['journees'][-1]} projetees "
+          f"({matrice.shape[0]} x {matrice.shape[1]})")
+
+    sortie = tableau_projection(df, matrice, table)
+    sauvegarder_projection(sortie, args.output)
+
+    print(f"\nTop 15 sur {len(table['journees'])} journees:")
+    print(sortie.head(15).to_string(index=False))
+
+    if os.path.exists(args.composition):
+        compo = pd.read_csv(args.composition, sep=';', encoding='utf-8-sig')
+        capitaines = capitaines_par_journee(df, matrice, table, ids=ids_titulaires(df, compo))
+        print("\nRotation du capitaine (composition actuelle):")
+        for c in capitaines.itertuples(index=False):
+            print(f"   J{c.journee}: {c.nom} ({c.club}) contre {c.adversaire or '?'} - {c.score:.2f} pts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Table de resolution des noms AllRugby -> id joueur La Grande Melee
+Memorise les associations (nom de compo normalise, club normalise) -> id Fantasy trouvees
+par le matching, pour que les semaines suivantes se resument a une lecture de dictionnaire.
+
+- output/resolution_noms.csv : associations apprises automatiquement (avec score de confiance)
+- resolution_noms_manuel.csv : corrections manuelles, prioritaires (colonnes nom_source;club;id)
+
+Seules les associations manuelles ou de confiance >= SEUIL_CONFIANCE sont conservees : un
+matching approximatif plus faible est refait chaque semaine au lieu d'etre fige pour la saison.
+"""
+
+import csv
+import os
+from datetime import datetime
+
+# --- CONFIGURATION ---
+FICHIER_RESOLUTIONS = os.path.join(os.path.dirname(__file__), "output", "resolution_noms.csv")
+FICHIER_MANUEL = os.path.join(os.path.dirname(__file__), "resolution_noms_manuel.csv")
+
+COLONNES = ['nom_source', 'club', 'id', 'confiance', 'source', 'date_maj']
+SEUIL_CONFIANCE = 0.85   # Confiance minimale d'une association automatique pour etre reutilisee
+
+
+def cle(nom_source, club):
+    """Cle d'une association : nom normalise + club normalise ('' si inconnu)."""
+    return (nom_source, club or '')
+
+
+def fiable(entree, seuil=SEUIL_CONFIANCE):
+    """True si l'association peut etre reutilisee telle quelle (manuelle ou assez sure)."""
+    return entree['source'] == 'manuel' or entree['confiance'] >= seuil
+
+
+def _lire(fichier, source_defaut):
+    table = {}
+    if not os.path.exists(fichier):
+        return table
+
+    with open(fichier, 'r', encoding='utf-8-sig', newline='') as f:
+        for ligne in csv.DictReader(f, delimiter=';'):
+            if not ligne.get('nom_source') or not ligne.get('id'):
+                continue
+            try:
+                id_joueur = int(float(ligne['id']))
+            except ValueError:
+                continue
+            table[cle(ligne['nom_source'], ligne.get('club'))] = {
+                'id': id_joueur,
+                'confiance': float(ligne.get('confiance') or 1.0),
+                'source': ligne.get('source') or source_defaut,
+                'date_maj': ligne.get('date_maj') or '',
+            }
+    return table
+
+
+def charger_resolutions(fichier=FICHIER_RESOLUTIONS, fichier_manuel=FICHIER_MANUEL):
+    """
+    Charge la table (les corrections manuelles remplacent les associations automatiques).
+    Les associations automatiques peu sures (anciens fichiers) sont ecartees.
+    """
+    table = {k: entree for k, entree in _lire(fichier, 'auto').items() if fiable(entree)}
+    manuel = _lire(fichier_manuel, 'manuel')
+    for entree in manuel.values():
+        entree['source'] = 'manuel'
+        entree['confiance'] = 1.0
+    table.update(manuel)
+    return table
+
+
+def ajouter_resolutions(table, nouvelles):
+    """
+    Ajoute des associations {(nom_source, club): (id, confiance)} a la table.
+    Les entrees manuelles ne sont jamais ecrasees ; une association sous SEUIL_CONFIANCE
+    n'est pas memorisee (elle sera re-resolue au prochain passage).
+    """
+    aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+    for (nom_source, club), (id_joueur, confiance) in nouvelles.items():
+        k = cle(nom_source, club)
+        if table.get(k, {}).get('source') == 'manuel' or confiance < SEUIL_CONFIANCE:
+            continue
+        table[k] = {'id': int(id_joueur), 'confiance': round(float(confiance), 3),
+                    'source': 'auto', 'date_maj': aujourd_hui}
+
+
+def sauvegarder_resolutions(table, fichier=FICHIER_RESOLUTIONS):
+    """Sauvegarde les associations automatiques (les manuelles restent dans leur propre fichier)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    with open(tmp, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(COLONNES)
+        for (nom_source, club), entree in sorted(table.items()):
+            if entree['source'] == 'manuel':
+                continue
+            writer.writerow([nom_source, club, entree['id'], entree['confiance'],
+                             entree['source'], entree['date_maj']])
+    os.replace(tmp, fichier)
@@ -0,0 +1,52 @@
+"""
+Schema compact des DataFrames de joueurs - Fantasy Rugby "La Grande Melee"
+Les colonnes texte a faible cardinalite (club, poste, adversaire, statut...) sont
+converties en categories (un code entier par ligne), les numeriques en float32 / int16.
+Divise plusieurs fois la memoire par joueur des grands pools (simulations, benchmark).
+Les prix (valeur) restent en float64 : en float32, 12.3 devient 12.30000019 et les
+contraintes de budget exactes (dixiemes de million) ne tombent plus juste.
+
+Les CSV ecrits a partir d'un DataFrame compact sont identiques (les categories
+s'ecrivent comme leurs libelles).
+"""
+
+import pandas as pd
+
+# --- CONFIGURATION ---
+COLONNES_CATEGORIES = [
+    'club', 'position', 'adversaire', 'domicile', 'date_match', 'forme_recent',
+    'statut_compo', 'force_adversaire',
+]
+COLONNES_FLOAT32 = [
+    'stat_moy', 'pourcentage_selection', 'score_predictif', 'rapport_qp', 'numero_compo',
+]
+# Entiers : convertis seulement sans valeur manquante (sinon laisses en float)
+COLONNES_ENTIERS = {
+    'id': 'int32',
+    'stat_nb': 'int16',
+    'rang_adversaire': 'int16',
+}
+
+
+def compacter_joueurs(df):
+    """
+    Convertit les colonnes connues au schema compact (en place, sans copier les autres).
+    Les colonnes absentes ou deja compactes sont ignorees. Retourne df.
+    """
+    for col in COLONNES_CATEGORIES:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in COLONNES_FLOAT32:
+        if col in df.columns and df[col].dtype != 'float32':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float32')
+    for col, type_entier in COLONNES_ENTIERS.items():
+        if col in df.columns and df[col].dtype != type_entier and df[col].notna().all():
+            df[col] = df[col].astype(type_entier)
+    return df
+
+
+def octets_par_joueur(df):
+    """Memoire occupee par joueur (octets, chaines comprises)."""
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / len(df)
@@ -2,20 +2,39 @@
 Script de scoring predictif Fantasy Rugby "La Grande Melee"
 Calcule un score predictif pour chaque joueur base sur:
 - stat_moy (performance moyenne)
-- forme recente (T=Titulaire, R=Remplacant, N=Non joue)
-- adversaire (force de l'equipe adverse)
+- forme recente (T=Titulaire, R=Remplacant, N=Non joue), ou forme depuis l'historique
+  des journees (--forme-historique, voir forme_historique.py)
+- adversaire (force de l'equipe adverse), ou notations attaque/defense des clubs
+  (--notations, voir notation_clubs.py)
 - domicile/exterieur
 """
 
+import numpy as np
 import pandas as pd
+import argparse
 import json
 import os
 
+import calcul_classement
+import forme_historique
+import notation_clubs
+import profilage
+import schema_joueurs
+
 # --- CONFIGURATION ---
 FICHIER_JOUEURS = os.path.join(os.path.dirname(__file__), "output", "joueurs_lagrandemelee_complet.csv")
 FICHIER_CLASSEMENT = os.path.join(os.path.dirname(__file__), "output", "classement_top14.json")
 FICHIER_SORTIE = os.path.join(os.path.dirname(__file__), "output", "joueurs_avec_score.csv")
 
+COLONNES_EXPORT = [
+    'id', 'nom', 'nomcomplet', 'club', 'position',
+    'valeur', 'stat_moy', 'stat_nb', 'forme_recent',
+    'adversaire', 'domicile', 'date_match',
+    'force_adversaire', 'rang_adversaire', 'bonus_forme_historique',
+    'bonus_equipe_notation', 'bonus_adversaire_notation',
+    'score_predictif', 'rapport_qp'
+]
+
 # Bonus/Malus pour le score predictif
 BONUS_DOMICILE = 1.20     # +20% a domicile
 BONUS_EXTERIEUR = 1.0     # 0% a l'exterieur (neutre)
@@ -27,6 +46,9 @@ BONUS_EXTERIEUR = 1.0     # 0% a l'exterieur (neutre)
 # Ex: Rang 14 = 1 + (14-7.5)*0.02 = 1.13 (+13%)
 FACTEUR_RANG_ADVERSAIRE = 0.02  # 2% par rang d'ecart avec le milieu
 
+# Poids des 5 derniers matchs (forme joueur et equipe), le plus recent d'abord
+POIDS_FORME = [1.0, 0.7, 0.5, 0.3, 0.1]
+
 # Bonus forme recente (T=Titulaire, R=Remplacant, N=Non joue)
 BONUS_FORME = {
     "T": 1.08,   # Titulaire recent = +8%
@@ -34,6 +56,10 @@ BONUS_FORME = {
     "N": 0.85    # N'a pas joue = -15%
 }
 
+# Forme depuis l'historique (--forme-historique)
+PRIOR_FORME = 2.0         # Matchs effectifs pour que les points recents pesent a moitie
+ECART_MAX_FORME = 0.20    # Points recents : au plus +-20% par rapport a stat_moy
+
 
 def charger_classement(fichier=FICHIER_CLASSEMENT):
     """Charge le fichier JSON de classement."""
@@ -51,6 +77,33 @@ def charger_classement(fichier=FICHIER_CLASSEMENT):
     return classement
 
 
+def charger_classement_journee(journee, fichier_historique=calcul_classement.FICHIER_HISTORIQUE):
+    """
+    Charge le classement tel qu'il etait avant une journee donnee (backtest).
+    Lit l'etat cumule de la journee precedente dans l'historique de classement.
+    """
+    print(f"Chargement du classement avant la journee {journee} depuis {fichier_historique}")
+    
+    historique = calcul_classement.charger_historique(fichier_historique)
+    classement = calcul_classement.classement_a_la_journee(historique, journee - 1)
+    if not classement:
+        print(f"[WARN] Pas de resultats avant la journee {journee}. Utilisation de valeurs par defaut.")
+    else:
+        print(f"   {len(classement)} equipes chargees")
+    return classement
+
+
+def charger_notations(journee=None):
+    """
+    Notations des clubs pour scorer une journee : a l'issue de la journee precedente en
+    backtest, sinon apres la derniere journee jouee. None si aucune notation disponible.
+    """
+    toutes = notation_clubs.notations_a_jour()
+    if toutes is None:
+        return None
+    return notation_clubs.notations_a_la_journee(toutes, journee - 1 if journee is not None else None)
+
+
 def calculer_bonus_forme(forme_str):
     """
     Calcule le bonus de forme base sur les derniers matchs.
@@ -65,7 +118,7 @@ def calculer_bonus_forme(forme_str):
         return 1.0
     
     # Poids decroissants (le plus recent compte plus)
-    poids = [1.0, 0.7, 0.5, 0.3, 0.1]  # 5 derniers matchs, plus forte ponderation recente
+    poids = POIDS_FORME
     
     total_bonus = 0
     total_poids = 0
@@ -82,6 +135,29 @@ def calculer_bonus_forme(forme_str):
     return total_bonus / total_poids
 
 
+def calculer_bonus_forme_historique(df, forme):
+    """
+    Bonus de forme depuis l'historique, pour tous les joueurs de df en une passe.
+    forme: caracteristiques par id (forme_historique.caracteristiques_a_jour)
+    Bonus = titularisation x points recents :
+    - titularisation : de BONUS_FORME['N'] (jamais titulaire) a BONUS_FORME['T'] (toujours)
+    - points : ecart des points recents a stat_moy (borne a +-ECART_MAX_FORME),
+      pondere par matchs_effectifs / (matchs_effectifs + PRIOR_FORME)
+    NaN sans observation : le bonus de la chaine forme_recent s'applique.
+    """
+    f = forme.reindex(df['id'].to_numpy())
+    taux = f['taux_titularisation'].to_numpy(dtype=float)
+    bonus_titu = BONUS_FORME['N'] + taux * (BONUS_FORME['T'] - BONUS_FORME['N'])
+    
+    stat_moy = df['stat_moy'].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ecart = np.clip(f['forme_points'].to_numpy(dtype=float) / stat_moy - 1, -ECART_MAX_FORME, ECART_MAX_FORME)
+    matchs = np.nan_to_num(f['matchs_effectifs'].to_numpy(dtype=float))
+    bonus_points = 1 + np.nan_to_num(ecart) * matchs / (matchs + PRIOR_FORME)
+    
+    return pd.Series(np.round(bonus_titu * bonus_points, 4), index=df.index)
+
+
 def calculer_bonus_adversaire(rang_adversaire):
     """
     Calcule le bonus adversaire base sur le rang.
@@ -120,7 +196,7 @@ def calculer_bonus_forme_equipe(forme_str):
         return 1.0
     
     # Poids decroissants (le plus recent compte plus)
-    poids = [1.0, 0.7, 0.5, 0.3, 0.1]
+    poids = POIDS_FORME
     
     total_bonus = 0
     total_poids = 0
@@ -137,59 +213,141 @@ def calculer_bonus_forme_equipe(forme_str):
     return total_bonus / total_poids
 
 
-def calculer_score_predictif(row, classement):
+def _par_valeur(serie, fonction, defaut=1.0):
+    """
+    Applique une fonction scalaire une seule fois par valeur distincte de la serie
+    (quelques clubs ou chaines de forme pour des milliers de joueurs).
+    Tableau aligne sur la serie ; defaut pour les valeurs manquantes.
+    """
+    codes, valeurs = pd.factorize(serie.astype(object))
+    resultats = np.array([fonction(v) for v in valeurs] + [defaut], dtype=float)
+    return resultats[codes]  # code -1 (manquant) -> derniere case = defaut
+
+
+def _colonne_bonus(df, colonne, repli):
+    """Colonne de bonus precalculee (NaN si absente), completee par repli() la ou elle manque."""
+    if colonne not in df.columns:
+        return repli()
+    bonus = df[colonne].to_numpy(dtype=float, na_value=np.nan)
+    manquant = np.isnan(bonus)
+    if manquant.any():
+        bonus = np.where(manquant, repli(), bonus)
+    return bonus
+
+
+def calculer_score_predictif(df, classement):
     """
-    Calcule le score predictif pour un joueur.
+    Calcule le score predictif de tous les joueurs de df (tableau aligne sur df).
     Score = stat_moy x bonus_forme_joueur x bonus_forme_equipe x bonus_domicile x bonus_adversaire
+    Score nul sans stat_moy.
     """
-    stat_moy = row.get('stat_moy', 0)
-    if pd.isna(stat_moy) or stat_moy == 0:
-        return 0.0
+    stat_moy = np.nan_to_num(df['stat_moy'].to_numpy(dtype=float, na_value=np.nan))
     
-    # Bonus forme joueur
-    forme_recent = row.get('forme_recent', '')
-    bonus_forme_joueur = calculer_bonus_forme(forme_recent)
+    # Bonus forme joueur (historique si disponible, sinon chaine forme_recent)
+    bonus_forme_joueur = _colonne_bonus(
+        df, 'bonus_forme_historique',
+        lambda: _par_valeur(df['forme_recent'], calculer_bonus_forme)
+    )
     
-    # Bonus forme equipe (dynamique de l'equipe)
-    club = row.get('club', '')
-    info_club = classement.get(club, {})
-    forme_equipe = info_club.get('forme', '')
-    bonus_forme_equipe = calculer_bonus_forme_equipe(forme_equipe)
+    # Bonus forme equipe (notation d'attaque si disponible, sinon dynamique de l'equipe)
+    bonus_forme_equipe = _colonne_bonus(
+        df, 'bonus_equipe_notation',
+        lambda: _par_valeur(df['club'], lambda club: calculer_bonus_forme_equipe(
+            classement.get(club, {}).get('forme', '')))
+    )
     
     # Bonus domicile/exterieur
-    domicile = row.get('domicile', '')
-    if domicile == 'domicile':
-        bonus_lieu = BONUS_DOMICILE
-    else:
-        bonus_lieu = BONUS_EXTERIEUR
+    bonus_lieu = np.where(df['domicile'].astype(object) == 'domicile', BONUS_DOMICILE, BONUS_EXTERIEUR)
     
-    # Bonus adversaire (graduel par rang)
-    adversaire = row.get('adversaire', '')
-    info_adv = classement.get(adversaire, {})
-    rang_adv = info_adv.get('rang', 0)
-    bonus_adv = calculer_bonus_adversaire(rang_adv)
+    # Bonus adversaire (notation de defense si disponible, sinon graduel par rang)
+    bonus_adv = _colonne_bonus(
+        df, 'bonus_adversaire_notation',
+        lambda: _par_valeur(df['adversaire'], lambda adv: calculer_bonus_adversaire(
+            classement.get(adv, {}).get('rang', 0)))
+    )
     
     # Score final
     score = stat_moy * bonus_forme_joueur * bonus_forme_equipe * bonus_lieu * bonus_adv
     
-    return round(score, 2)
+    return np.round(score, 2)
 
 
-def calculer_rapport_qualite_prix(row):
+def calculer_rapport_qualite_prix(df):
     """
-    Calcule le rapport qualite/prix = score_predictif / valeur
-    Plus c'est eleve, meilleur est le deal.
+    Calcule le rapport qualite/prix = score_predictif / valeur (tableau aligne sur df)
+    Plus c'est eleve, meilleur est le deal. Nul si la valeur est inconnue ou nulle.
     """
-    score = row.get('score_predictif', 0)
-    valeur = row.get('valeur', 1)
-    
-    if pd.isna(valeur) or valeur == 0:
-        return 0.0
+    score = df['score_predictif'].to_numpy(dtype=float)
+    valeur = df['valeur'].to_numpy(dtype=float, na_value=np.nan)
     
-    return round(score / valeur, 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rapport = np.round(score / valeur, 2)
+    return np.where(np.isnan(valeur) | (valeur == 0), 0.0, rapport)
+
+
+def coefficients_scoring():
+    """Coefficients du score predictif (la modification de l'un d'eux invalide le cache des resultats)."""
+    return {
+        'bonus_domicile': BONUS_DOMICILE,
+        'bonus_exterieur': BONUS_EXTERIEUR,
+        'facteur_rang_adversaire': FACTEUR_RANG_ADVERSAIRE,
+        'poids_forme': POIDS_FORME,
+        'bonus_forme': BONUS_FORME,
+        'bonus_forme_equipe': BONUS_FORME_EQUIPE,
+        'alpha_forme': forme_historique.ALPHA_FORME,
+        'prior_forme': PRIOR_FORME,
+        'ecart_max_forme': ECART_MAX_FORME,
+        'notations': [notation_clubs.K_NOTATION, notation_clubs.K_DOMICILE,
+                      notation_clubs.LISSAGE_POINTS, notation_clubs.BORNES_BONUS],
+    }
+
+
+@profilage.profiler
+def calculer_scores(df, classement, forme=None, notations=None):
+    """
+    Ajoute score_predictif, rapport_qp, force_adversaire et rang_adversaire (en place).
+    forme: caracteristiques de forme_historique ; ajoute alors bonus_forme_historique,
+    utilise a la place de la chaine forme_recent.
+    notations: notations des clubs a une journee (notation_clubs.notations_a_la_journee) ;
+    ajoute alors bonus_equipe_notation et bonus_adversaire_notation, utilises a la place
+    de la forme G/N/P et du rang de l'adversaire.
+    """
+    profilage.compteur('joueurs_scores', len(df))
+    if forme is not None:
+        df['bonus_forme_historique'] = calculer_bonus_forme_historique(df, forme)
+    if notations is not None:
+        bonus_equipe, bonus_adversaire = notation_clubs.bonus_notations(df, notations)
+        df['bonus_equipe_notation'] = np.round(bonus_equipe, 4)
+        df['bonus_adversaire_notation'] = np.round(bonus_adversaire, 4)
+    df['score_predictif'] = calculer_score_predictif(df, classement)
+    df['rapport_qp'] = calculer_rapport_qualite_prix(df)
+    adversaires = df['adversaire'].astype(object)
+    df['force_adversaire'] = adversaires.map(
+        {adv: info.get('force', 'inconnu') for adv, info in classement.items()}
+    ).fillna('inconnu')
+    df['rang_adversaire'] = adversaires.map(
+        {adv: info.get('rang', 0) for adv, info in classement.items()}
+    ).fillna(0).astype(int)
+    return df
+
+
+def colonnes_export(df):
+    """Colonnes de joueurs_avec_score.csv presentes dans le DataFrame."""
+    return [c for c in COLONNES_EXPORT if c in df.columns]
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Calcul des scores predictifs")
+    parser.add_argument('--journee', type=int, default=None,
+                        help='Utiliser le classement tel qu\'il etait avant cette journee (backtest)')
+    parser.add_argument('--forme-historique', action='store_true',
+                        help='Forme calculee depuis l\'historique des journees (points, titularisations) '
+                             'au lieu des 5 derniers T/R/N')
+    parser.add_argument('--notations', action='store_true',
+                        help='Bonus equipe et adversaire depuis les notations attaque/defense des clubs '
+                             'au lieu de la forme G/N/P et du rang')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("CALCUL DES SCORES PREDICTIFS - LA GRANDE MELEE")
     print("=" * 60)
@@ -200,49 +358,46 @@ def main():
     print(f"   {len(df)} joueurs charges")
     
     # 2. Charger le classement
-    classement = charger_classement()
-    
-    # 3. Calculer les scores
+    if args.journee is not None:
+        classement = charger_classement_journee(args.journee)
+    else:
+        classement = charger_classement()
+    
+    # 3. Calculer les scores (et ajouter info adversaire)
+    forme = None
+    if args.forme_historique:
+        forme = forme_historique.caracteristiques_a_jour(journee=args.journee)
+        print(f"   Forme historique: {int(forme['taux_titularisation'].notna().sum())} joueurs avec observations")
+    notations = None
+    if args.notations:
+        notations = charger_notations(args.journee)
+        if notations is None:
+            print("[WARN] Pas de notations disponibles, bonus par rang et forme G/N/P")
+        else:
+            print(f"   Notations des clubs a l'issue de la journee {notations['journee']}")
     print("\nCalcul des scores predictifs...")
-    df['score_predictif'] = df.apply(lambda row: calculer_score_predictif(row, classement), axis=1)
-    df['rapport_qp'] = df.apply(calculer_rapport_qualite_prix, axis=1)
-    
-    # 4. Ajouter info adversaire
-    df['force_adversaire'] = df['adversaire'].apply(
-        lambda adv: classement.get(adv, {}).get('force', 'inconnu')
-    )
-    df['rang_adversaire'] = df['adversaire'].apply(
-        lambda adv: classement.get(adv, {}).get('rang', 0)
-    )
+    calculer_scores(df, classement, forme, notations)
+    schema_joueurs.compacter_joueurs(df)
     
-    # 5. Statistiques
+    # 4. Statistiques
     print("\nSTATISTIQUES:")
     print(f"   Score predictif moyen: {df['score_predictif'].mean():.2f}")
     print(f"   Score max: {df['score_predictif'].max():.2f}")
     print(f"   Joueurs avec score > 30: {len(df[df['score_predictif'] > 30])}")
     
-    # 6. Top 10 joueurs par score predictif
+    # 5. Top 10 joueurs par score predictif
     print("\nTOP 10 JOUEURS (Score Predictif):")
     top10 = df.nlargest(10, 'score_predictif')[['nom', 'club', 'position', 'valeur', 'stat_moy', 'adversaire', 'domicile', 'score_predictif', 'rapport_qp']]
     print(top10.to_string(index=False))
     
-    # 7. Top 10 meilleurs rapports qualite/prix
+    # 6. Top 10 meilleurs rapports qualite/prix
     print("\nTOP 10 RAPPORT QUALITE/PRIX:")
     df_valides = df[df['score_predictif'] > 15]
     top10_qp = df_valides.nlargest(10, 'rapport_qp')[['nom', 'club', 'position', 'valeur', 'score_predictif', 'rapport_qp']]
     print(top10_qp.to_string(index=False))
     
-    # 8. Sauvegarder
-    colonnes_export = [
-        'id', 'nom', 'nomcomplet', 'club', 'position',
-        'valeur', 'stat_moy', 'stat_nb', 'forme_recent',
-        'adversaire', 'domicile', 'date_match',
-        'force_adversaire', 'rang_adversaire',
-        'score_predictif', 'rapport_qp'
-    ]
-    cols_finales = [c for c in colonnes_export if c in df.columns]
-    
-    df[cols_finales].to_csv(FICHIER_SORTIE, index=False, sep=";", encoding="utf-8-sig")
+    # 7. Sauvegarder
+    df[colonnes_export(df)].to_csv(FICHIER_SORTIE, index=False, sep=";", encoding="utf-8-sig")
     print(f"\n[OK] Fichier sauvegarde: {FICHIER_SORTIE}")
     
     print("\n" + "=" * 60)
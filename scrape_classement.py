@@ -1,15 +1,41 @@
 """
 Scraping du classement Top 14 et forme des equipes
 Genere automatiquement le fichier classement_top14.json
-Recupere la forme des equipes depuis l'API La Grande Melee
+Recupere le calendrier complet de la saison et la forme des equipes depuis l'API La Grande Melee
+Le classement (rang, points, bonus) est calcule depuis les resultats (voir calcul_classement.py)
 """
 
 import requests
+import csv
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
 import os
 
+import cache_http
+import calcul_classement
+import profilage
+
+# --- CONFIGURATION ---
+URL_CALENDRIER = "https://lagrandemelee.midi-olympique.fr/v1/private/journeecalendrier/{journee}?lg=fr"
+FICHIER_CALENDRIER = os.path.join(os.path.dirname(__file__), "output", "calendrier_saison.csv")
+TTL_CACHE_CALENDRIER = 1800  # 30 min
+NB_JOURNEES_SAISON = 26      # Top 14 : 14 equipes, matchs aller-retour
+MAX_REQUETES_PARALLELES = NB_JOURNEES_SAISON  # Requetes calendrier simultanees (toute la saison en une vague)
+JOURNEE_DEFAUT = 13          # Si la journee courante ne peut pas etre detectee
+
+# Cles possibles dans la reponse de l'API pour les scores / essais / date d'un match
+CLES_SCORE = {"dom": ("scoredom", "score_dom", "scoreclubdom"), "ext": ("scoreext", "score_ext", "scoreclubext")}
+CLES_ESSAIS = {"dom": ("essaisdom", "essais_dom", "nbessaisdom"), "ext": ("essaisext", "essais_ext", "nbessaisext")}
+CLES_DATE = ("date", "datematch", "date_match")
+
+COLONNES_CALENDRIER = [
+    'journee', 'date', 'club_dom', 'club_ext',
+    'score_dom', 'score_ext', 'essais_dom', 'essais_ext', 'joue',
+]
+
 
 def charger_env():
     """Charge les variables d'environnement depuis .env"""
@@ -76,67 +102,209 @@ def normaliser_nom_club(nom):
     return mapping.get(nom_lower, nom.title())
 
 
-def scraper_forme_equipes_lgm(env_vars, journee=13):
-    """
-    Scrape la forme des equipes depuis l'API La Grande Melee.
-    Endpoint: /v1/private/journeecalendrier/{journee}?lg=fr
-    Retourne un dict {club_normalise: forme_str} ex: {"Toulouse": "G,G,G,G,G"}
-    """
-    if not env_vars:
-        print("[WARN] Pas de credentials .env pour l'API LGM")
-        return {}
-    
-    url = f"https://lagrandemelee.midi-olympique.fr/v1/private/journeecalendrier/{journee}?lg=fr"
-    
-    headers = {
+def get_headers_calendrier(env_vars):
+    """Construit les headers de l'API calendrier avec les credentials du .env"""
+    return {
         "accept": "application/json",
         "authorization": env_vars.get('API_AUTH_TOKEN', ''),
         "cookie": env_vars.get('API_COOKIES', ''),
         "x-access-key": env_vars.get('API_ACCESS_KEY', ''),
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     }
+
+
+def recuperer_journee_calendrier(env_vars, journee):
+    """
+    Recupere les matchs bruts d'une journee.
+    Endpoint: /v1/private/journeecalendrier/{journee}?lg=fr
+    Retourne la liste des matchs (dicts de l'API), ou None en cas d'erreur.
+    """
+    url = URL_CALENDRIER.format(journee=journee)
     
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = cache_http.get(url, headers=get_headers_calendrier(env_vars), ttl=TTL_CACHE_CALENDRIER, timeout=15)
         response.raise_for_status()
         data = response.json()
-        
-        formes = {}
-        
-        if 'journee' in data and 'matchs' in data['journee']:
-            matchs = data['journee']['matchs']
-            
-            for match in matchs:
-                # Equipe domicile
-                club_dom = match.get('clubdom', '')
-                forme_dom = match.get('formeclubdom', [])
-                if club_dom and forme_dom:
-                    club_norm = normaliser_nom_club(club_dom)
-                    formes[club_norm] = ','.join(forme_dom)
-                
-                # Equipe exterieur
-                club_ext = match.get('clubext', '')
-                forme_ext = match.get('formeclubext', [])
-                if club_ext and forme_ext:
-                    club_norm = normaliser_nom_club(club_ext)
-                    formes[club_norm] = ','.join(forme_ext)
-        
-        if formes:
-            print(f"[OK] Forme recuperee pour {len(formes)} equipes via API LGM")
-        
-        return formes
-        
     except requests.exceptions.RequestException as e:
-        print(f"[WARN] Erreur API calendrier: {e}")
+        print(f"[WARN] Erreur API calendrier (journee {journee}): {e}")
+        return None
+    except ValueError as e:
+        print(f"[WARN] Erreur parsing calendrier (journee {journee}): {e}")
+        return None
+    
+    if 'journee' in data and 'matchs' in data['journee']:
+        return data['journee']['matchs']
+    return []
+
+
+def _premiere_valeur(match, cles):
+    """Retourne la premiere valeur non vide parmi les cles candidates."""
+    for cle in cles:
+        valeur = match.get(cle)
+        if valeur not in (None, ''):
+            return valeur
+    return None
+
+
+def _entier_ou_none(valeur):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def normaliser_match(match, journee):
+    """Convertit un match brut de l'API en ligne du tableau calendrier/resultats."""
+    score_dom = _entier_ou_none(_premiere_valeur(match, CLES_SCORE["dom"]))
+    score_ext = _entier_ou_none(_premiere_valeur(match, CLES_SCORE["ext"]))
+    date = _premiere_valeur(match, CLES_DATE) or ''
+    
+    return {
+        'journee': journee,
+        'date': str(date).split('T')[0],
+        'club_dom': normaliser_nom_club(match.get('clubdom', '')),
+        'club_ext': normaliser_nom_club(match.get('clubext', '')),
+        'score_dom': score_dom,
+        'score_ext': score_ext,
+        'essais_dom': _entier_ou_none(_premiere_valeur(match, CLES_ESSAIS["dom"])),
+        'essais_ext': _entier_ou_none(_premiere_valeur(match, CLES_ESSAIS["ext"])),
+        'joue': score_dom is not None and score_ext is not None,
+        'forme_dom': ','.join(match.get('formeclubdom') or []),
+        'forme_ext': ','.join(match.get('formeclubext') or []),
+    }
+
+
+@profilage.profiler
+def scraper_calendrier_saison(env_vars, journees=None, max_workers=MAX_REQUETES_PARALLELES):
+    """
+    Recupere toutes les journees de la saison en parallele (nombre de requetes
+    simultanees borne par max_workers).
+    Retourne la liste des matchs normalises, triee par journee puis date.
+    """
+    if not env_vars:
+        print("[WARN] Pas de credentials .env pour l'API LGM")
+        return []
+    
+    if journees is None:
+        journees = range(1, NB_JOURNEES_SAISON + 1)
+    journees = list(journees)
+    
+    debut = time.perf_counter()
+    # Une requete par journee, toutes lancees ensemble (dans la limite de max_workers)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(journees)))) as executor:
+        resultats = list(executor.map(lambda j: recuperer_journee_calendrier(env_vars, j), journees))
+    duree = time.perf_counter() - debut
+    
+    matchs = []
+    journees_ok = 0
+    for journee, matchs_bruts in zip(journees, resultats):
+        if matchs_bruts is None:
+            continue
+        journees_ok += 1
+        matchs.extend(normaliser_match(m, journee) for m in matchs_bruts)
+    
+    matchs.sort(key=lambda m: (m['journee'], m['date']))
+    print(f"[OK] Calendrier: {journees_ok}/{len(journees)} journees, {len(matchs)} matchs en {duree:.2f}s")
+    return matchs
+
+
+def detecter_journee_courante(matchs, aujourd_hui=None):
+    """
+    Detecte la prochaine journee a jouer : la premiere ayant des matchs sans score
+    (ou, sans score dans l'API, dates d'aujourd'hui ou plus tard).
+    Un match reporte ne bloque pas la detection : les matchs a jouer d'une journee sont
+    ignores s'ils sont minoritaires et qu'une journee suivante a deja commence.
+    Si toute la saison est jouee, retourne la derniere journee. None si pas de donnees.
+    """
+    if not matchs:
+        return None
+    
+    if aujourd_hui is None:
+        aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+    
+    scores_disponibles = any(m['joue'] for m in matchs)
+    nb_matchs, nb_a_jouer = {}, {}
+    for match in matchs:
+        if scores_disponibles:
+            a_jouer = not match['joue']
+        else:
+            a_jouer = not match['date'] or match['date'] >= aujourd_hui
+        journee = match['journee']
+        nb_matchs[journee] = nb_matchs.get(journee, 0) + 1
+        nb_a_jouer[journee] = nb_a_jouer.get(journee, 0) + a_jouer
+    
+    journees = sorted(nb_matchs)
+    commencees = [j for j in journees if nb_a_jouer[j] < nb_matchs[j]]
+    derniere_commencee = commencees[-1] if commencees else None
+    for journee in journees:
+        if nb_a_jouer[journee] == 0:
+            continue
+        reportes = (2 * nb_a_jouer[journee] < nb_matchs[journee]
+                    and derniere_commencee is not None and derniere_commencee > journee)
+        if not reportes:
+            return journee
+    
+    return journees[-1]
+
+
+def saison_terminee(matchs):
+    """True si tous les matchs du calendrier ont un score (plus aucune journee a jouer)."""
+    return bool(matchs) and all(m['joue'] for m in matchs)
+
+
+def extraire_formes(matchs, journee):
+    """
+    Extrait la forme des equipes (formeclubdom / formeclubext) des matchs d'une journee.
+    Retourne un dict {club_normalise: forme_str} ex: {"Toulouse": "G,G,G,G,G"}
+    """
+    formes = {}
+    for match in matchs:
+        if match['journee'] != journee:
+            continue
+        if match['club_dom'] and match['forme_dom']:
+            formes[match['club_dom']] = match['forme_dom']
+        if match['club_ext'] and match['forme_ext']:
+            formes[match['club_ext']] = match['forme_ext']
+    return formes
+
+
+def sauvegarder_calendrier(matchs, fichier=FICHIER_CALENDRIER):
+    """Sauvegarde le tableau calendrier/resultats de la saison (CSV)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    
+    with open(fichier, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLONNES_CALENDRIER, delimiter=';', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(matchs)
+    
+    nb_joues = sum(1 for m in matchs if m['joue'])
+    print(f"[OK] Calendrier sauvegarde: {fichier} ({nb_joues} joues, {len(matchs) - nb_joues} a venir)")
+
+
+def scraper_forme_equipes_lgm(env_vars, journee=JOURNEE_DEFAUT):
+    """
+    Scrape la forme des equipes depuis l'API La Grande Melee pour une journee.
+    Retourne un dict {club_normalise: forme_str} ex: {"Toulouse": "G,G,G,G,G"}
+    """
+    if not env_vars:
+        print("[WARN] Pas de credentials .env pour l'API LGM")
         return {}
-    except Exception as e:
-        print(f"[WARN] Erreur parsing calendrier: {e}")
+    
+    matchs_bruts = recuperer_journee_calendrier(env_vars, journee)
+    if not matchs_bruts:
         return {}
+    
+    formes = extraire_formes([normaliser_match(m, journee) for m in matchs_bruts], journee)
+    if formes:
+        print(f"[OK] Forme recuperee pour {len(formes)} equipes via API LGM")
+    
+    return formes
 
 
 def creer_classement_manuel():
     """Cree un classement manuel avec les dernieres donnees connues.
     Classement Top 14 2025-2026 - Journee 13 (decembre 2025)
+    Utilise uniquement en secours, si aucun resultat de match n'est disponible.
     """
     return {
         "Pau": {"rang": 1, "points": 35},
@@ -182,14 +350,54 @@ def main():
     # Charger les credentials
     env_vars = charger_env()
     
-    # Utiliser le classement manuel comme base
-    classement = creer_classement_manuel()
-    print(f"[OK] {len(classement)} equipes chargees")
+    # Recuperer le calendrier et les resultats depuis l'API LGM
+    matchs = []
+    if env_vars:
+        print("\nRecuperation du calendrier de la saison via API LGM...")
+        matchs = scraper_calendrier_saison(env_vars)
+        if matchs:
+            sauvegarder_calendrier(matchs)
+    elif os.path.exists(FICHIER_CALENDRIER):
+        print(f"[WARN] Pas de .env, resultats relus depuis {FICHIER_CALENDRIER}")
+        matchs = calcul_classement.charger_matchs_calendrier(FICHIER_CALENDRIER)
+    
+    journee = detecter_journee_courante(matchs)
+    if journee is None:
+        journee = JOURNEE_DEFAUT
+        print(f"[WARN] Journee courante non detectee, journee {journee} par defaut")
+    else:
+        print(f"[OK] Journee courante detectee: {journee}")
     
-    # Recuperer la forme depuis l'API LGM
+    # Classement calcule depuis les resultats (mise a jour incrementale)
+    classement = {}
+    if any(m['joue'] for m in matchs):
+        historique = calcul_classement.charger_historique()
+        recalculees = calcul_classement.mettre_a_jour_historique(historique, matchs)
+        if recalculees:
+            calcul_classement.sauvegarder_historique(historique)
+            print(f"[OK] Classement mis a jour pour les journees {recalculees[0]}-{recalculees[-1]}")
+        else:
+            print("[OK] Classement deja a jour (aucun nouveau resultat)")
+        if saison_terminee(matchs):
+            # Derniere journee jouee : le classement final l'inclut
+            classement = calcul_classement.classement_a_la_journee(historique)
+        else:
+            classement = calcul_classement.classement_a_la_journee(historique, journee - 1)
+    
+    if classement and saison_terminee(matchs):
+        print(f"[OK] {len(classement)} equipes classees d'apres les resultats (saison terminee)")
+    elif classement:
+        print(f"[OK] {len(classement)} equipes classees d'apres les resultats (avant journee {journee})")
+    else:
+        print("[WARN] Aucun resultat disponible, utilisation du classement manuel")
+        classement = creer_classement_manuel()
+        print(f"[OK] {len(classement)} equipes chargees")
+    
+    # Forme des equipes : API LGM en priorite, sinon calculee depuis les resultats
     if env_vars:
-        print("\nRecuperation de la forme des equipes via API LGM...")
-        formes_api = scraper_forme_equipes_lgm(env_vars, journee=13)
+        formes_api = extraire_formes(matchs, journee)
+        if formes_api:
+            print(f"[OK] Forme recuperee pour {len(formes_api)} equipes via API LGM")
         
         if formes_api:
             # Mettre a jour le classement avec les formes de l'API
@@ -199,6 +407,8 @@ def main():
                 else:
                     # Club trouve mais pas dans le classement de base
                     print(f"   [INFO] Club trouve dans API mais pas dans classement: {club}")
+        elif any(info.get('forme') for info in classement.values()):
+            print("[WARN] Forme API non disponible, forme calculee depuis les resultats")
         else:
             print("[WARN] API non disponible, utilisation des formes par defaut")
             # Ajouter des formes par defaut
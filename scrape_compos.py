@@ -3,16 +3,71 @@ Scraper des compositions d'equipes - AllRugby
 Recupere les compositions officielles des equipes du Top 14.
 """
 
-import requests
 from bs4 import BeautifulSoup
+import argparse
+import json
 import re
+import math
+import time
+import hashlib
+import numpy as np
 import pandas as pd
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import NamedTuple, Optional
 from unidecode import unidecode
 import os
 
+import cache_http
+import flux_changements
+import profilage
+import resolution_noms
+
 # --- CONFIGURATION ---
 ALLRUGBY_BASE = "https://www.allrugby.com"
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+TTL_CACHE = 300  # 5 min : les compos sont publiees au fil de la semaine
+MAX_PAGES_PARALLELES = 7    # Pages de match telechargees simultanement
+MAX_PAGES_MATCHS = 14       # Garde-fou sur le nombre de pages suivies
+FICHIER_ENRICHI = os.path.join(os.path.dirname(__file__), "output", "joueurs_enrichis.csv")
+FICHIER_ETAT_BLOCS = os.path.join(os.path.dirname(__file__), "output", "compos_blocs.json")
+
+# Backend HTML : lxml (beaucoup plus rapide) si installe, sinon le parseur standard
+try:
+    import lxml  # noqa: F401
+    PARSER_HTML = 'lxml'
+except ImportError:
+    PARSER_HTML = 'html.parser'
+
+# Parsing des feuilles de match (motifs compiles une seule fois)
+NB_TITULAIRES = 15
+NB_JOUEURS_FEUILLE = 23
+CLUBS_PAGE = r'RACING 92|RACING|LA ROCHELLE|BORDEAUX|TOULOUSE|TOULON|CLERMONT|MONTPELLIER|LYON|CASTRES|PAU|BAYONNE|PERPIGNAN|MONTAUBAN|STADE FRANCAIS|STADE FRANÇAIS|PARIS'
+RE_CLUB = re.compile(rf'\b({CLUBS_PAGE})\b', re.IGNORECASE)
+RE_DECOUPE_CLUBS = re.compile(rf'({CLUBS_PAGE})', re.IGNORECASE)
+RE_JOUEUR_TEXTE = re.compile(r'(\d{1,2})\s*[.\-–)]\s*([A-Z][a-zA-ZéèêëàâäùûüôöîïçÉÈÊËÀÂÄÙÛÜÔÖÎÏÇ\'\-\s]+?)(?=\d{1,2}\s*[.\-–)]|$)')
+RE_LIEN_JOUEUR = re.compile(r'/joueurs/')
+# Feuille de match : lien AllRugby (relatif ou absolu) sous /match(s)/ ou /feuille-de-match/,
+# dont le chemin nomme un club du Top 14 (ex: /matchs/top-14/toulouse-vs-pau)
+RE_LIEN_MATCH = re.compile(r'^(?:https?://(?:www\.)?allrugby\.com)?/(?:[^?#]*/)?(?:matchs?|feuille-de-match)/', re.IGNORECASE)
+RE_CLUB_URL = re.compile(rf"(?<![a-z])({CLUBS_PAGE.replace(' ', '[-_]')})(?![a-z])", re.IGNORECASE)
+RE_NUMERO_FIN = re.compile(r'(?:^|\s)(\d{1,2})\s*[.\-–)]?$')
+RE_NUMERO_DEBUT = re.compile(r'^(\d{1,2})(?:\s*[.\-–)]|\s|$)')
+RE_REMPLACANTS = re.compile(r'rempla', re.IGNORECASE)
+RE_CLASSE_TITRE = re.compile(r'club|equipe|team|titre|title', re.IGNORECASE)
+BALISES_TITRE = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'caption'}
+BALISES_LIGNE = {'li', 'p', 'tr', 'dd', 'dt'}
+BALISES_BLOC = {'ul', 'ol', 'table', 'dl', 'section', 'article', 'div'}
+BALISES_CELLULE = {'td', 'th'}
+BALISES_TABLE = {'table'}
+BALISES_RANGEE = {'tr'}
+
+# Matching des noms Fantasy <-> compos
+LONGUEUR_MIN_TOKEN = 3      # Mots plus courts ignores pour l'index (de, le, ...)
+SEUIL_MATCHING = 0.6        # Score de similarite minimum pour accepter un match
+SCORE_EXACT = 2.0           # Nom normalise identique : toujours prioritaire
 
 
 def trouver_url_compos():
@@ -20,10 +75,10 @@ def trouver_url_compos():
     print("Recherche de la page des compositions sur AllRugby...")
     
     try:
-        response = requests.get(ALLRUGBY_BASE, headers={"User-Agent": USER_AGENT}, timeout=10)
+        response = cache_http.get(ALLRUGBY_BASE, headers={"User-Agent": USER_AGENT}, ttl=TTL_CACHE, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(response.text, PARSER_HTML)
         
         for link in soup.find_all('a', href=True):
             href = link['href']
@@ -40,67 +95,308 @@ def trouver_url_compos():
         return None
 
 
-def scraper_compos(url):
-    """Scrape les compositions depuis la page AllRugby."""
-    print(f"Scraping des compositions depuis : {url}")
+class JoueurCompo(NamedTuple):
+    """Joueur lu sur une feuille de match AllRugby."""
+    club: str
+    numero: Optional[int]
+    nom: str
+    statut: str              # 'titulaire' / 'remplacant'
+    numero_deduit: bool      # True si le numero vient de l'ordre dans le bloc
+
+
+def _est_titre(tag):
+    """Element pouvant porter le nom d'un club ou d'une section (titres, entetes, classes club/equipe)."""
+    if tag.name in BALISES_TITRE:
+        return True
+    classes = tag.get('class') or ()
+    return any(RE_CLASSE_TITRE.search(c) for c in classes)
+
+
+def _ancetre(element, noms):
+    """Premier ancetre dont la balise est dans `noms` (remontee directe, sans filtre bs4)."""
+    parent = element.parent
+    while parent is not None and parent.name not in noms:
+        parent = parent.parent
+    return parent
+
+
+def _club_depuis_texte(texte):
+    m = RE_CLUB.search(texte or '')
+    return normaliser_club(m.group(1)) if m else None
+
+
+def _statut(numero, section):
+    if numero is not None:
+        return 'titulaire' if numero <= NB_TITULAIRES else 'remplacant'
+    return 'remplacant' if section and RE_REMPLACANTS.search(section) else 'titulaire'
+
+
+def _clubs_colonnes(table):
+    """Clubs portes par les entetes de colonnes d'un tableau (feuille de match domicile/exterieur)."""
+    for ligne in table.find_all('tr', limit=3):
+        cellules = ligne.find_all(['th', 'td'], recursive=False)
+        clubs = [_club_depuis_texte(c.get_text(" ", strip=True)) for c in cellules]
+        if any(clubs):
+            return clubs
+    return []
+
+
+def _numero_avant(lien, conteneur):
+    """Numero ecrit juste avant le lien dans son conteneur (ex: '9. <a>Dupont</a>')."""
+    morceaux = []
+    for frere in lien.previous_siblings:
+        texte = frere.get_text(" ", strip=True) if hasattr(frere, 'get_text') else str(frere)
+        morceaux.append(texte)
+        if RE_NUMERO_FIN.search(texte.strip()) or len(morceaux) > 3:
+            break
+    texte_avant = ' '.join(reversed(morceaux)).strip()
+    m = RE_NUMERO_FIN.search(texte_avant)
+    if m is None and conteneur is not None and conteneur is not lien.parent:
+        m = RE_NUMERO_DEBUT.match(conteneur.get_text(" ", strip=True))
+    return int(m.group(1)) if m else None
+
+
+@profilage.profiler
+def parser_compos(html, soup=None):
+    """
+    Parse une page de compositions AllRugby en suivant la structure du DOM.
+    - Tableau (une colonne par equipe) : club lu dans l'entete de la colonne,
+      numero dans la premiere cellule de la ligne
+    - Listes par equipe : club lu dans le titre precedent le bloc, numero avant le lien
+      (a defaut, deduit de l'ordre du joueur dans le bloc)
+    soup: page deja analysee (evite de la reconstruire).
+    Retourne une liste de JoueurCompo.
+    """
+    if soup is None:
+        soup = BeautifulSoup(html, PARSER_HTML)
     
-    try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=15)
-        response.raise_for_status()
+    joueurs = []
+    blocs = {}  # id(bloc) -> {'club', 'section', 'rang'}
+    colonnes_tables = {}
+    
+    for lien in soup.find_all('a', href=RE_LIEN_JOUEUR):
+        nom = lien.get_text(" ", strip=True)
+        if len(nom) <= 2:
+            continue
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        cellule = _ancetre(lien, BALISES_CELLULE)
+        if cellule is not None:
+            # Disposition en tableau : colonnes domicile / exterieur
+            table = _ancetre(cellule, BALISES_TABLE)
+            ligne = _ancetre(cellule, BALISES_RANGEE)
+            if id(table) not in colonnes_tables:
+                colonnes_tables[id(table)] = _clubs_colonnes(table)
+            clubs_colonnes = colonnes_tables[id(table)]
+            cellules = ligne.find_all(['td', 'th'], recursive=False)
+            position = next((i for i, c in enumerate(cellules) if c is cellule), 0)
+            club = clubs_colonnes[position] if position < len(clubs_colonnes) else None
+            if club is None:
+                titre = table.find_previous(_est_titre)
+                club = _club_depuis_texte(titre.get_text(" ", strip=True)) if titre else None
+            numero = _numero_avant(lien, None)
+            if numero is None and cellules:
+                m = RE_NUMERO_DEBUT.match(cellules[0].get_text(" ", strip=True))
+                numero = int(m.group(1)) if m else None
+            cle_bloc = (id(table), position)
+        else:
+            conteneur = _ancetre(lien, BALISES_LIGNE)
+            bloc = _ancetre(conteneur or lien, BALISES_BLOC)
+            if bloc is None:
+                # Lien isole (article, menu...) : pas une feuille de match
+                continue
+            cle_bloc = id(bloc)
+            if cle_bloc not in blocs:
+                titre = bloc.find_previous(_est_titre)
+                texte_titre = titre.get_text(" ", strip=True) if titre else ''
+                club = _club_depuis_texte(texte_titre)
+                if club is None and titre is not None:
+                    # Titre de section (ex: "Remplacants") : le club est dans un titre plus haut
+                    titre_club = titre.find_previous(lambda t: _est_titre(t) and _club_depuis_texte(t.get_text(" ", strip=True)))
+                    club = _club_depuis_texte(titre_club.get_text(" ", strip=True)) if titre_club else None
+                blocs[cle_bloc] = {'club': club, 'section': texte_titre, 'rang': 0}
+            club = blocs[cle_bloc]['club']
+            numero = _numero_avant(lien, conteneur)
         
-        # Chercher les joueurs dans les liens
-        joueurs_trouves = {}
-        clubs_avec_compos = set()
+        info_bloc = blocs.setdefault(cle_bloc, {'club': club, 'section': '', 'rang': 0})
+        info_bloc['rang'] += 1
         
-        # Methode 1: Chercher les liens vers les joueurs
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            if '/joueurs/' in href:
-                nom = link.get_text(strip=True)
-                if nom and len(nom) > 2:
-                    nom_norm = normaliser_nom(nom)
-                    if nom_norm not in joueurs_trouves:
-                        joueurs_trouves[nom_norm] = {
-                            'nom': nom,
-                            'statut': 'titulaire',
-                            'numero': None
-                        }
+        if club is None:
+            continue
         
-        # Methode 2: Parser le texte pour trouver les numeros
-        texte = soup.get_text()
+        numero_deduit = numero is None
+        if numero_deduit and not RE_REMPLACANTS.search(info_bloc['section']):
+            numero = info_bloc['rang'] if info_bloc['rang'] <= NB_JOUEURS_FEUILLE else None
+        if numero is not None and not 1 <= numero <= NB_JOUEURS_FEUILLE:
+            continue
         
-        # Pattern pour les blocs par club
-        pattern_club = r'(TOULOUSE|RACING 92|RACING|LA ROCHELLE|BORDEAUX|TOULON|CLERMONT|MONTPELLIER|LYON|CASTRES|PAU|BAYONNE|PERPIGNAN|MONTAUBAN|PARIS|STADE FRANCAIS|STADE FRANÇAIS)'
-        blocs = re.split(pattern_club, texte, flags=re.IGNORECASE)
+        joueurs.append(JoueurCompo(club, numero, nom, _statut(numero, info_bloc['section']), numero_deduit))
+    
+    return joueurs
+
+
+@profilage.profiler
+def parser_compos_texte(html, soup=None):
+    """
+    Ancien parseur (texte brut de la page decoupe par noms de clubs).
+    Conserve en secours si la structure de la page n'est pas reconnue, et pour comparaison.
+    Seuls les joueurs numerotes sous un nom de club sont retenus : un simple lien vers
+    une fiche joueur (article, breve...) n'est pas une feuille de match.
+    soup: page deja analysee (evite de la reconstruire).
+    Retourne (joueurs_trouves, clubs_avec_compos), joueurs_trouves au format de compos_depuis_joueurs.
+    """
+    if soup is None:
+        soup = BeautifulSoup(html, PARSER_HTML)
+    
+    joueurs_trouves = {}
+    clubs_avec_compos = set()
+    
+    # Parser le texte pour trouver les numeros
+    texte = soup.get_text()
+    blocs = RE_DECOUPE_CLUBS.split(texte)
+    
+    current_club = None
+    for bloc in blocs:
+        bloc_upper = bloc.strip().upper()
+        if RE_DECOUPE_CLUBS.match(bloc_upper):
+            current_club = normaliser_club(bloc_upper)
+            clubs_avec_compos.add(current_club)
+            continue
         
-        current_club = None
-        for bloc in blocs:
-            bloc_upper = bloc.strip().upper()
-            if re.match(pattern_club, bloc_upper, re.IGNORECASE):
-                current_club = normaliser_club(bloc_upper)
-                clubs_avec_compos.add(current_club)
-                continue
-            
-            if current_club and len(bloc) > 50:
-                # Chercher les joueurs numerotes
-                pattern_joueur = r'(\d{1,2})\s*[.\-–)]\s*([A-Z][a-zA-ZéèêëàâäùûüôöîïçÉÈÊËÀÂÄÙÛÜÔÖÎÏÇ\'\-\s]+?)(?=\d{1,2}\s*[.\-–)]|$)'
-                matches = re.findall(pattern_joueur, bloc + " 99.")
-                
-                for numero, nom in matches:
-                    num = int(numero)
-                    nom = nom.strip()
-                    if num >= 1 and num <= 23 and len(nom) > 2:
-                        nom_norm = normaliser_nom(nom)
-                        statut = 'titulaire' if num <= 15 else 'remplacant'
-                        
-                        joueurs_trouves[nom_norm] = {
-                            'nom': nom,
-                            'statut': statut,
-                            'numero': num,
-                            'club': current_club
-                        }
+        if current_club and len(bloc) > 50:
+            # Chercher les joueurs numerotes
+            for numero, nom in RE_JOUEUR_TEXTE.findall(bloc + " 99."):
+                num = int(numero)
+                nom = nom.strip()
+                if num >= 1 and num <= 23 and len(nom) > 2:
+                    nom_norm = normaliser_nom(nom)
+                    statut = 'titulaire' if num <= 15 else 'remplacant'
+                    
+                    joueurs_trouves[(current_club, nom_norm)] = {
+                        'nom': nom,
+                        'statut': statut,
+                        'numero': num,
+                        'club': current_club
+                    }
+    
+    clubs_valides = {c for c in clubs_avec_compos if len(c) < 30}
+    return joueurs_trouves, clubs_valides
+
+
+def compos_depuis_joueurs(joueurs):
+    """
+    Convertit une liste de JoueurCompo au format {(club, nom_normalise): info} utilise par le
+    matching (deux homonymes de clubs differents restent deux entrees).
+    """
+    compos = {}
+    for j in joueurs:
+        compos[(j.club, normaliser_nom(j.nom))] = {
+            'nom': j.nom,
+            'statut': j.statut,
+            'numero': j.numero,
+            'club': j.club,
+        }
+    clubs = {j.club for j in joueurs}
+    return compos, clubs
+
+
+def telecharger_page(url, dossier_fixture=None, ttl=TTL_CACHE):
+    """Telecharge une page AllRugby (via le cache HTTP). Leve une exception en cas d'erreur."""
+    response = cache_http.get(url, headers={"User-Agent": USER_AGENT}, ttl=ttl, timeout=15)
+    response.raise_for_status()
+    html = response.text
+    if dossier_fixture:
+        sauvegarder_fixture(html, url, dossier_fixture)
+    return html
+
+
+def parser_page_compos(html):
+    """
+    Parse une page : parseur DOM, ou parseur texte si aucun bloc de joueurs n'est reconnu.
+    La page n'est analysee (BeautifulSoup) qu'une fois pour les deux parseurs.
+    """
+    soup = BeautifulSoup(html, PARSER_HTML)
+    joueurs = parser_compos(html, soup)
+    if joueurs:
+        return compos_depuis_joueurs(joueurs)
+    return parser_compos_texte(html, soup)
+
+
+def trouver_urls_matchs(html, url_page):
+    """Liens vers les pages individuelles de chaque match / equipe depuis la page agregee."""
+    soup = BeautifulSoup(html, PARSER_HTML)
+    urls = []
+    for link in soup.find_all('a', href=RE_LIEN_MATCH):
+        href = link['href']
+        if RE_LIEN_JOUEUR.search(href) or not RE_CLUB_URL.search(href.split('?')[0]):
+            continue
+        url = href if href.startswith('http') else ALLRUGBY_BASE + href
+        url = url.split('#')[0]
+        if url != url_page and url not in urls:
+            urls.append(url)
+    return urls[:MAX_PAGES_MATCHS]
+
+
+def scraper_compos_matchs(urls, max_workers=MAX_PAGES_PARALLELES, dossier_fixture=None, ttl=TTL_CACHE):
+    """
+    Telecharge et parse les pages de match en parallele, puis fusionne les blocs par club.
+    Une page en erreur est ignoree (son club restera 'compo non dispo').
+    """
+    def traiter(url):
+        try:
+            return parser_page_compos(telecharger_page(url, dossier_fixture, ttl))
+        except Exception as e:
+            print(f"   [WARN] Page ignoree ({url}): {e}")
+            return {}, set()
+    
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resultats = list(executor.map(traiter, urls))
+    
+    compos = {}
+    clubs = set()
+    for compos_page, clubs_page in resultats:
+        compos.update(compos_page)
+        clubs |= clubs_page
+    print(f"   {len(urls)} pages de match traitees en {time.perf_counter() - debut:.2f}s")
+    return compos, clubs
+
+
+def scraper_compos(url, dossier_fixture=None, suivre_matchs=True, ttl=TTL_CACHE):
+    """
+    Scrape les compositions depuis AllRugby.
+    Si la page agregee renvoie vers des pages par match, celles-ci sont recuperees en
+    parallele (chaque club publie sa feuille a son rythme). La page agregee est toujours
+    parsee : elle fournit les clubs absents des pages de match (ou tous, sans page de match).
+    dossier_fixture: si fourni, les pages brutes y sont sauvegardees (corpus de verification du parseur).
+    ttl: duree de validite du cache (0 = revalidation conditionnelle a chaque appel).
+    """
+    print(f"Scraping des compositions depuis : {url}")
+    
+    try:
+        html = telecharger_page(url, dossier_fixture, ttl)
+        
+        urls_matchs = trouver_urls_matchs(html, url) if suivre_matchs else []
+        if urls_matchs:
+            print(f"   {len(urls_matchs)} pages de match trouvees")
+            joueurs_trouves, clubs_avec_compos = scraper_compos_matchs(urls_matchs, dossier_fixture=dossier_fixture,
+                                                                       ttl=ttl)
+        else:
+            joueurs_trouves, clubs_avec_compos = {}, set()
+        
+        compos_page, clubs_page = parser_page_compos(html)
+        if not joueurs_trouves:
+            joueurs_trouves, clubs_avec_compos = compos_page, clubs_page
+            if not joueurs_trouves:
+                print("[WARN] Structure de la page non reconnue, aucun joueur trouve")
+        else:
+            # Feuilles publiees seulement sur la page agregee : ajoutees club par club
+            complements = {cle: info for cle, info in compos_page.items()
+                           if cle[0] not in clubs_avec_compos}
+            if complements:
+                clubs_complements = {club for club, _ in complements}
+                print(f"   Page agregee: {len(complements)} joueurs pour {', '.join(sorted(clubs_complements))}")
+                joueurs_trouves.update(complements)
+                clubs_avec_compos |= clubs_complements
         
         print(f"[OK] {len(joueurs_trouves)} joueurs trouves dans les compositions")
         
@@ -117,8 +413,129 @@ def scraper_compos(url):
         return {}, set()
 
 
+def empreintes_blocs(compos):
+    """Empreinte de la feuille de chaque club (numero, nom, statut) : {club: sha1}."""
+    par_club = {}
+    for (club, nom_norm), info in compos.items():
+        par_club.setdefault(club, []).append(f"{info.get('numero')}|{nom_norm}|{info['statut']}")
+    return {
+        club: hashlib.sha1('\n'.join(sorted(lignes)).encode('utf-8')).hexdigest()
+        for club, lignes in par_club.items()
+    }
+
+
+def charger_etat_blocs(fichier=FICHIER_ETAT_BLOCS):
+    """Empreintes des feuilles deja integrees a joueurs_enrichis.csv ({} si absent)."""
+    if not os.path.exists(fichier):
+        return {}
+    try:
+        with open(fichier, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def sauvegarder_etat_blocs(empreintes, fichier=FICHIER_ETAT_BLOCS):
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(empreintes, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, fichier)
+
+
+def clubs_modifies(empreintes, etat_precedent):
+    """Clubs dont la feuille est nouvelle, a change, ou a disparu depuis la derniere integration."""
+    clubs = set(empreintes) | set(etat_precedent)
+    return {c for c in clubs if empreintes.get(c) != etat_precedent.get(c)}
+
+
+def mettre_a_jour_partielle(df, df_precedent, compos, clubs_avec_compos, modifies):
+    """
+    Reprend les statuts de joueurs_enrichis.csv et ne recalcule que les joueurs
+    des clubs modifies et des clubs ayant un joueur absent du fichier precedent.
+    Tout l'effectif d'un club traite est re-associe d'un bloc : un nom de compo deja
+    attribue a un joueur du club ne peut pas etre attribue en plus a un nouveau venu.
+    """
+    precedent = df_precedent.drop_duplicates('id').set_index('id')
+    df['statut_compo'] = df['id'].map(precedent['statut_compo'])
+    df['numero_compo'] = df['id'].map(precedent['numero_compo']) if 'numero_compo' in precedent else None
+    
+    clubs_normalises = df['club'].map({c: normaliser_club(c) for c in df['club'].dropna().unique()})
+    nouveaux = df['statut_compo'].isna()
+    clubs_a_traiter = set(modifies) | set(clubs_normalises[nouveaux].dropna())
+    masque = clubs_normalises.isin(clubs_a_traiter) | nouveaux
+    if not masque.any():
+        print("[OK] Aucune feuille modifiee, statuts conserves")
+        return df
+    
+    clubs_a_traiter = set(clubs_normalises[masque].dropna().unique())
+    print(f"Mise a jour partielle : {int(masque.sum())} joueurs ({', '.join(sorted(clubs_a_traiter))})")
+    compos_clubs = {c: info for c, info in compos.items() if c[0] in clubs_a_traiter}
+    
+    sous_df = enrichir_avec_compos(df[masque].copy(), compos_clubs, clubs_avec_compos, verbose=False)
+    df.loc[masque, 'statut_compo'] = sous_df['statut_compo']
+    df.loc[masque, 'numero_compo'] = sous_df['numero_compo']
+    
+    statuts = df.loc[masque, 'statut_compo'].value_counts()
+    print("   " + ", ".join(f"{statut}: {nb}" for statut, nb in statuts.items()))
+    return df
+
+
+def sauvegarder_fixture(html, url, dossier):
+    """Sauvegarde une page brute dans le corpus de fixtures (nom derive de l'URL)."""
+    os.makedirs(dossier, exist_ok=True)
+    nom = re.sub(r'[^\w\-]+', '_', url.split('://')[-1]).strip('_')[:120]
+    chemin = os.path.join(dossier, f"{nom}.html")
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write(html)
+    print(f"   [OK] Fixture sauvegardee: {chemin}")
+
+
+def verifier_fixtures(dossier, repetitions=5):
+    """
+    Verifie le parseur sur un corpus de pages sauvegardees.
+    Chaque page X.html peut avoir un fichier attendu X.json : liste de
+    {"club", "numero", "nom"}. Compare vitesse et exactitude du parseur texte, du parseur
+    DOM et du chemin complet (parser_page_compos : DOM, texte en secours).
+    """
+    fichiers = sorted(f for f in os.listdir(dossier) if f.endswith('.html'))
+    if not fichiers:
+        print(f"[WARN] Aucune fixture .html dans {dossier}")
+        return
+    
+    print(f"{'Fixture':40} | {'Parseur':9} | {'ms':>7} | {'Joueurs':>7} | {'Precision':>9} | {'Rappel':>6}")
+    print("-" * 92)
+    for fichier in fichiers:
+        with open(os.path.join(dossier, fichier), 'r', encoding='utf-8') as f:
+            html = f.read()
+        
+        attendu = None
+        chemin_attendu = os.path.join(dossier, fichier[:-5] + '.json')
+        if os.path.exists(chemin_attendu):
+            with open(chemin_attendu, 'r', encoding='utf-8') as f:
+                attendu = {(j['club'], j['numero'], normaliser_nom(j['nom'])) for j in json.load(f)}
+        
+        for nom_parseur, parseur in (('dom', lambda h: compos_depuis_joueurs(parser_compos(h))),
+                                     ('texte', parser_compos_texte),
+                                     ('page', parser_page_compos)):
+            debut = time.perf_counter()
+            for _ in range(repetitions):
+                compos, _clubs = parseur(html)
+            duree_ms = (time.perf_counter() - debut) * 1000 / repetitions
+            
+            trouves = {(club, info.get('numero'), nom) for (club, nom), info in compos.items()}
+            if attendu:
+                corrects = len(trouves & attendu)
+                precision = f"{corrects / len(trouves):.0%}" if trouves else "-"
+                rappel = f"{corrects / len(attendu):.0%}"
+            else:
+                precision = rappel = "-"
+            print(f"{fichier[:40]:40} | {nom_parseur:9} | {duree_ms:7.1f} | {len(compos):7} | {precision:>9} | {rappel:>6}")
+
+
+@lru_cache(maxsize=None)
 def normaliser_nom(nom):
-    """Normalise un nom pour faciliter le matching."""
+    """Normalise un nom pour faciliter le matching (memoise : les memes noms reviennent chaque semaine)."""
     nom = unidecode(nom.lower().strip())
     nom = re.sub(r'[^\w\s\-]', '', nom)
     nom = ' '.join(nom.split())
@@ -181,56 +598,180 @@ def charger_joueurs_fantasy(csv_path=None):
     return df
 
 
-def matching_fuzzy(nom1, nom2):
-    """Matching approximatif simple entre deux noms."""
-    mots1 = set(w for w in nom1.split() if len(w) > 2)
-    mots2 = set(w for w in nom2.split() if len(w) > 2)
+def tokens_nom(nom_norm):
+    """Mots significatifs d'un nom normalise (les tirets separent les mots)."""
+    return {w for w in nom_norm.replace('-', ' ').split() if len(w) >= LONGUEUR_MIN_TOKEN}
+
+
+def construire_index_compos(compos):
+    """
+    Index inverse des noms de compo : {club: {mot: [cles_compo]}}, cle_compo = (club, nom_normalise).
+    Les noms sans club connu sont ranges sous la cle None.
+    Calcule aussi un poids IDF par mot (un nom de famille rare pese plus qu'un prenom courant).
+    """
+    blocs = {}
+    tokens_compos = {}
+    frequences = Counter()
     
-    if not mots1 or not mots2:
-        return False
+    for cle_compo in compos:
+        club, nom_compo = cle_compo
+        tokens = tokens_nom(nom_compo)
+        tokens_compos[cle_compo] = tokens
+        bloc = blocs.setdefault(club, {})
+        for token in tokens:
+            bloc.setdefault(token, []).append(cle_compo)
+        frequences.update(tokens)
     
-    intersection = mots1 & mots2
-    return len(intersection) >= 1
+    n = max(len(compos), 1)
+    idf = {t: math.log(1 + n / f) for t, f in frequences.items()}
+    return {'blocs': blocs, 'tokens': tokens_compos, 'idf': idf}
 
 
-def enrichir_avec_compos(df, compos, clubs_avec_compos):
-    """Enrichit le DataFrame des joueurs Fantasy avec les statuts de composition."""
-    print("Enrichissement des donnees avec les compositions...")
+def score_similarite(tokens_joueur, nom_joueur, tokens_compo, nom_compo, idf):
+    """
+    Similarite entre un joueur Fantasy et un nom de compo (0 = aucun mot commun).
+    70% recouvrement des mots ponderes IDF + 30% ressemblance des chaines completes.
+    """
+    communs = tokens_joueur & tokens_compo
+    if not communs:
+        return 0.0
     
-    df['statut_compo'] = 'inconnu'
-    df['numero_compo'] = None
+    def poids(tokens):
+        return sum(idf.get(t, 1.0) for t in tokens)
+    
+    recouvrement = poids(communs) / min(poids(tokens_joueur), poids(tokens_compo))
+    ressemblance = SequenceMatcher(None, nom_joueur, nom_compo).ratio()
+    return 0.7 * recouvrement + 0.3 * ressemblance
+
+
+@profilage.profiler
+def matcher_noms(df, compos, index=None):
+    """
+    Associe les joueurs Fantasy aux noms des compos.
+    - Candidats : noms de compo partageant au moins un mot, dans le bloc du club du joueur
+      (ou sans club connu) via l'index inverse
+    - Chaque candidat est note, puis les paires sont attribuees de la meilleure a la moins
+      bonne : un nom de compo n'est attribue qu'a un seul joueur, et inversement
+    Retourne {index_df: (cle_compo, score)}.
+    """
+    if index is None:
+        index = construire_index_compos(compos)
+    blocs = index['blocs']
+    idf = index['idf']
     
-    matched = 0
+    noms = df['nom_normalise'].tolist()
+    clubs = df['club'].map({c: normaliser_club(c) for c in df['club'].dropna().unique()}).tolist()
+    if 'nomcomplet' in df.columns:
+        noms_complets = [normaliser_nom(n) if isinstance(n, str) else '' for n in df['nomcomplet']]
+    else:
+        noms_complets = [''] * len(df)
     
-    for idx, row in df.iterrows():
-        nom_norm = row['nom_normalise']
-        club = row['club']
-        club_normalise = normaliser_club(club)
+    paires = []
+    for idx, nom_norm, nom_complet, club in zip(df.index, noms, noms_complets, clubs):
+        tokens_joueur = tokens_nom(nom_norm) | tokens_nom(nom_complet)
+        nom_reference = nom_complet or nom_norm
         
-        found = False
-        if nom_norm in compos:
-            info = compos[nom_norm]
-            df.at[idx, 'statut_compo'] = info['statut']
-            df.at[idx, 'numero_compo'] = info['numero']
-            matched += 1
-            found = True
-        else:
-            for nom_compo, info in compos.items():
-                if matching_fuzzy(nom_norm, nom_compo):
-                    df.at[idx, 'statut_compo'] = info['statut']
-                    df.at[idx, 'numero_compo'] = info['numero']
-                    matched += 1
-                    found = True
-                    break
+        candidats = set()
+        for bloc in (blocs.get(club), blocs.get(None)):
+            if bloc:
+                for token in tokens_joueur:
+                    candidats.update(bloc.get(token, ()))
         
-        if not found:
-            if club_normalise in clubs_avec_compos:
-                df.at[idx, 'statut_compo'] = 'absent'
+        for cle_compo in candidats:
+            nom_compo = cle_compo[1]
+            if nom_compo == nom_norm or nom_compo == nom_complet:
+                score = SCORE_EXACT
             else:
-                df.at[idx, 'statut_compo'] = 'compo_non_dispo'
+                score = score_similarite(tokens_joueur, nom_reference, index['tokens'][cle_compo], nom_compo, idf)
+            if score >= SEUIL_MATCHING:
+                paires.append((score, idx, cle_compo))
+    
+    # Attribution gloutonne un-pour-un, meilleurs scores d'abord
+    paires.sort(key=lambda p: -p[0])
+    associations = {}
+    compos_attribues = set()
+    for score, idx, cle_compo in paires:
+        if idx in associations or cle_compo in compos_attribues:
+            continue
+        associations[idx] = (cle_compo, score)
+        compos_attribues.add(cle_compo)
+    
+    return associations
+
+
+@profilage.profiler
+def resoudre_noms(df, compos, resolutions):
+    """
+    Associe les noms de compo aux joueurs Fantasy.
+    1. Noms deja connus : lecture directe de la table de resolution (associations manuelles
+       ou de confiance suffisante seulement)
+    2. Noms jamais vus ou peu surs : matching indexe sur les joueurs et noms restants,
+       les nouvelles associations sures sont ajoutees a la table
+    Retourne ({index_df: cle_compo}, nb_resolus_par_table, nb_resolus_par_matching).
+    """
+    index_par_id = dict(zip(df['id'], df.index))
+    
+    associations = {}
+    for cle_compo in compos:
+        club, nom_compo = cle_compo
+        entree = resolutions.get(resolution_noms.cle(nom_compo, club))
+        if entree is None or not resolution_noms.fiable(entree):
+            continue
+        idx = index_par_id.get(entree['id'])
+        if idx is not None and idx not in associations:
+            associations[idx] = cle_compo
+    nb_table = len(associations)
+    
+    deja_resolus = set(associations.values())
+    compos_restants = {n: info for n, info in compos.items() if n not in deja_resolus}
+    nouvelles = {}
+    if compos_restants:
+        nouvelles = matcher_noms(df.drop(index=list(associations)), compos_restants)
+        for idx, (cle_compo, score) in nouvelles.items():
+            associations[idx] = cle_compo
+        resolution_noms.ajouter_resolutions(resolutions, {
+            (cle_compo[1], cle_compo[0]): (df.at[idx, 'id'], min(score, 1.0))
+            for idx, (cle_compo, score) in nouvelles.items()
+        })
+    
+    return associations, nb_table, len(nouvelles)
+
+
+def enrichir_avec_compos(df, compos, clubs_avec_compos, resolutions=None, verbose=True):
+    """
+    Enrichit le DataFrame des joueurs Fantasy avec les statuts de composition.
+    resolutions: table de resolution des noms ; si None, la table persistante est
+    chargee puis sauvegardee avec les nouvelles associations.
+    """
+    print("Enrichissement des donnees avec les compositions...")
+    
+    persister = resolutions is None
+    if persister:
+        resolutions = resolution_noms.charger_resolutions()
+    
+    associations, nb_table, nb_matching = resoudre_noms(df, compos, resolutions)
+    matched = len(associations)
+    profilage.compteur('noms_resolus_table', nb_table)
+    profilage.compteur('noms_matches', nb_matching)
+    print(f"   {nb_table} noms resolus via la table, {nb_matching} nouveaux par matching")
+    
+    if persister and nb_matching:
+        resolution_noms.sauvegarder_resolutions(resolutions)
+    
+    clubs_normalises = df['club'].map({c: normaliser_club(c) for c in df['club'].dropna().unique()})
+    statuts = pd.Series({idx: compos[c]['statut'] for idx, c in associations.items()}, dtype=object).reindex(df.index)
+    numeros = pd.Series({idx: compos[c]['numero'] for idx, c in associations.items()}, dtype=float).reindex(df.index)
+    
+    # Non trouves : absent si le club a publie sa compo, sinon compo non dispo
+    defaut = np.where(clubs_normalises.isin(clubs_avec_compos), 'absent', 'compo_non_dispo')
+    df['statut_compo'] = statuts.where(statuts.notna(), pd.Series(defaut, index=df.index))
+    df['numero_compo'] = numeros
+    
+    if not verbose:
+        return df
     
     # Calculer les clubs sans compo
-    tous_les_clubs = set(df['club'].apply(normaliser_club).unique())
+    tous_les_clubs = set(clubs_normalises.unique())
     clubs_valides = {c for c in clubs_avec_compos if len(c) < 50}
     clubs_sans_compo = tous_les_clubs - clubs_valides
     
@@ -259,9 +800,11 @@ def enrichir_avec_compos(df, compos, clubs_avec_compos):
 def sauvegarder_csv_enrichi(df, fichier=None):
     """Sauvegarde le CSV enrichi."""
     if fichier is None:
-        fichier = os.path.join(os.path.dirname(__file__), "output", "joueurs_enrichis.csv")
+        fichier = FICHIER_ENRICHI
     os.makedirs(os.path.dirname(fichier), exist_ok=True)
-    df.to_csv(fichier, index=False, sep=";", encoding="utf-8-sig")
+    tmp = fichier + ".tmp"
+    df.to_csv(tmp, index=False, sep=";", encoding="utf-8-sig")
+    os.replace(tmp, fichier)
     print(f"[OK] CSV enrichi sauvegarde : {fichier}")
 
 
@@ -277,15 +820,29 @@ def sauvegarder_par_role(df, dossier="joueurs_par_role"):
 
 
 def main():
-    import sys
+    parser = argparse.ArgumentParser(description="Scraper des compositions AllRugby")
+    parser.add_argument('url', nargs='?', default=None, help='URL de la page des compositions')
+    parser.add_argument('--sauver-fixture', type=str, default=None, metavar='DOSSIER',
+                        help='Sauvegarder la page brute dans un corpus de fixtures')
+    parser.add_argument('--verifier-fixtures', type=str, default=None, metavar='DOSSIER',
+                        help='Mesurer vitesse et exactitude du parseur sur un corpus de pages sauvegardees')
+    parser.add_argument('--agrege', action='store_true',
+                        help='Ne pas suivre les pages par match (page agregee uniquement)')
+    parser.add_argument('--complet', action='store_true',
+                        help='Recalculer les statuts de tous les clubs (pas de mise a jour partielle)')
+    args = parser.parse_args()
+    
+    if args.verifier_fixtures:
+        verifier_fixtures(args.verifier_fixtures)
+        return
     
     print("=" * 60)
     print("SCRAPER COMPOSITIONS ALLRUGBY")
     print("=" * 60)
     
     # Determiner l'URL
-    if len(sys.argv) > 1:
-        url = sys.argv[1]
+    if args.url:
+        url = args.url
     else:
         url = trouver_url_compos()
         if not url:
@@ -294,7 +851,8 @@ def main():
             return
     
     # Scraper les compositions
-    compos, clubs_avec_compos = scraper_compos(url)
+    compos, clubs_avec_compos = scraper_compos(url, dossier_fixture=args.sauver_fixture,
+                                               suivre_matchs=not args.agrege)
     
     if not compos:
         print("[ERREUR] Aucune composition trouvee")
@@ -305,11 +863,23 @@ def main():
     if df is None:
         return
     
-    # Enrichir avec les compositions
-    df = enrichir_avec_compos(df, compos, clubs_avec_compos)
+    # Enrichir avec les compositions : seuls les clubs dont la feuille a change sont recalcules
+    empreintes = empreintes_blocs(compos)
+    etat = charger_etat_blocs()
+    partielle = (not args.complet and etat and None not in empreintes
+                 and os.path.exists(FICHIER_ENRICHI))
+    if partielle:
+        modifies = clubs_modifies(empreintes, etat)
+        df_precedent = pd.read_csv(FICHIER_ENRICHI, sep=";", encoding="utf-8-sig")
+        df = mettre_a_jour_partielle(df, df_precedent, compos, clubs_avec_compos, modifies)
+    else:
+        df = enrichir_avec_compos(df, compos, clubs_avec_compos)
     
-    # Sauvegarder
+    # Sauvegarder (flux des transitions de statut par rapport au passage precedent)
+    precedent = flux_changements.lire_precedent(FICHIER_ENRICHI, flux_changements.CHAMPS_COMPOS)
     sauvegarder_csv_enrichi(df)
+    sauvegarder_etat_blocs(empreintes)
+    flux_changements.enregistrer(precedent, df, 'compos', flux_changements.CHAMPS_COMPOS)
     
     print("\n" + "=" * 60)
     print("[OK] TERMINE !")
@@ -1,13 +1,24 @@
 ﻿"""
 Scraping des joueurs Fantasy Rugby "La Grande Melee"
 Recupere tous les joueurs depuis l'API Fantasy avec leurs statistiques.
+Le pool est pagine : plusieurs pages sont telechargees en parallele et chaque
+page est parsee en flux directement dans des colonnes typees.
 
 Les credentials API sont stockes dans .env (non versionne)
 """
 
 import requests
 import pandas as pd
+import json
+import math
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_http
+import flux_changements
+import historique_joueurs
+import profilage
 
 
 def charger_env():
@@ -32,6 +43,29 @@ def charger_env():
 
 # --- CONFIGURATION API ---
 URL = "https://lagrandemelee.midi-olympique.fr/v1/private/searchjoueurs?lg=fr"
+TTL_CACHE = 600  # 10 min : au-dela, revalidation conditionnelle
+TAILLE_PAGE = 200            # Joueurs par page
+MAX_PAGES_PARALLELES = 4     # Pages telechargees simultanement
+MAX_PAGES = 100              # Garde-fou si l'API ne signale jamais de derniere page
+JOURNEE_DEFAUT = 13
+FICHIER_CALENDRIER = os.path.join(os.path.dirname(__file__), "output", "calendrier_saison.csv")
+
+# Colonnes extraites pour chaque joueur, et leurs types
+COLONNES_UTILES = [
+    'id', 'nom', 'nomcomplet', 'club', 'position',
+    'valeur', 'stat_moy', 'stat_nb', 'pourcentage_selection',
+    'forme_recent', 'adversaire', 'domicile', 'date_match'
+]
+DTYPES_COLONNES = {
+    'id': 'Int64',
+    'valeur': 'Float64',
+    'stat_moy': 'Float64',
+    'stat_nb': 'Int64',
+    'pourcentage_selection': 'Float64',
+}
+
+RE_TABLEAU_JOUEURS = re.compile(r'"joueurs"\s*:\s*\[')
+RE_TOTAL = re.compile(r'"(total|nbjoueurs|nb_joueurs|count)"\s*:\s*(\d+)')
 
 
 def get_headers(env_vars):
@@ -54,8 +88,8 @@ def get_headers(env_vars):
     }
 
 
-def get_payload(journee="13"):
-    """Construit le payload de la requete"""
+def get_payload(journee="13", page=0, taille_page=TAILLE_PAGE):
+    """Construit le payload de la requete (une page de resultats)"""
     return {
         "filters": {
             "nom": "",
@@ -68,14 +102,199 @@ def get_payload(journee="13"):
             "dreamteam": False,
             "quota": "",
             "idj": journee,
-            "pageIndex": 0,
-            "pageSize": 700,
+            "pageIndex": page,
+            "pageSize": taille_page,
             "loadSelect": 1,
             "searchonly": 1
         }
     }
 
 
+def determiner_journee(fichier_calendrier=FICHIER_CALENDRIER):
+    """Journee courante d'apres le calendrier de la saison (JOURNEE_DEFAUT sinon)."""
+    if os.path.exists(fichier_calendrier):
+        from calcul_classement import charger_matchs_calendrier
+        from scrape_classement import detecter_journee_courante
+        
+        journee = detecter_journee_courante(charger_matchs_calendrier(fichier_calendrier))
+        if journee is not None:
+            return str(journee)
+    return str(JOURNEE_DEFAUT)
+
+
+def nouvelles_colonnes():
+    """Colonnes vides (listes) remplies directement pendant le parsing des pages."""
+    return {c: [] for c in COLONNES_UTILES}
+
+
+def _iterer_objets(texte, debut):
+    """
+    Parcourt un tableau JSON objet par objet a partir de l'indice `debut` (le '[').
+    Chaque objet est decode puis libere avant le suivant.
+    Produit (objet, position apres l'objet).
+    """
+    decodeur = json.JSONDecoder()
+    pos = debut + 1
+    n = len(texte)
+    while pos < n:
+        while pos < n and texte[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= n or texte[pos] == ']':
+            return
+        objet, pos = decodeur.raw_decode(texte, pos)
+        yield objet, pos
+
+
+@profilage.profiler
+def parser_page(contenu, colonnes, ids_vus):
+    """
+    Parse une page de l'API en flux : chaque joueur du tableau "joueurs" est decode
+    puis ses champs utiles sont ajoutes directement aux colonnes (forme, adversaire,
+    domicile et date extraits au passage). Les doublons d'id (pagination decalee) sont ignores.
+    Retourne (nb_joueurs_page, total_annonce_ou_None).
+    """
+    texte = contenu.decode('utf-8') if isinstance(contenu, bytes) else contenu
+    
+    m = RE_TABLEAU_JOUEURS.search(texte)
+    if m is None:
+        raise ValueError("Cle 'joueurs' non trouvee dans la reponse.")
+    
+    # Le total eventuel est hors du tableau : on le cherche dans l'entete de la reponse
+    total = None
+    m_total = RE_TOTAL.search(texte, 0, m.start())
+    
+    nb = 0
+    fin = m.end()
+    for joueur, fin in _iterer_objets(texte, m.end() - 1):
+        nb += 1
+        id_joueur = joueur.get('id')
+        if id_joueur is not None:
+            if id_joueur in ids_vus:
+                continue
+            ids_vus.add(id_joueur)
+        
+        forme = joueur.get('forme')
+        adversaire = joueur.get('adversaire')
+        date_match = joueur.get('date_match')
+        
+        colonnes['id'].append(id_joueur)
+        colonnes['nom'].append(joueur.get('nom'))
+        colonnes['nomcomplet'].append(joueur.get('nomcomplet'))
+        colonnes['club'].append(joueur.get('club'))
+        colonnes['position'].append(joueur.get('position'))
+        colonnes['valeur'].append(joueur.get('valeur'))
+        colonnes['stat_moy'].append(joueur.get('stat_moy'))
+        colonnes['stat_nb'].append(joueur.get('stat_nb'))
+        colonnes['pourcentage_selection'].append(joueur.get('pourcentage_selection'))
+        colonnes['forme_recent'].append(
+            ','.join(forme['items']) if isinstance(forme, dict) and 'items' in forme else ''
+        )
+        if isinstance(adversaire, dict):
+            colonnes['adversaire'].append(adversaire.get('nom', ''))
+            domicile = adversaire.get('domicile')
+            colonnes['domicile'].append('' if domicile is None else ('domicile' if domicile else 'exterieur'))
+        else:
+            colonnes['adversaire'].append('')
+            colonnes['domicile'].append('')
+        colonnes['date_match'].append(date_match.split('T')[0] if isinstance(date_match, str) else '')
+    
+    if m_total is None:
+        # Sinon apres le crochet fermant : une cle "total" propre a un joueur n'est pas un total du pool
+        fin_tableau = texte.find(']', fin)
+        if fin_tableau >= 0:
+            m_total = RE_TOTAL.search(texte, fin_tableau + 1)
+    if m_total is not None:
+        total = int(m_total.group(2))
+    
+    return nb, total
+
+
+def recuperer_page(headers, journee, page, taille_page=TAILLE_PAGE, ttl=TTL_CACHE):
+    """Telecharge une page brute (bytes) de l'API searchjoueurs."""
+    response = cache_http.post(URL, headers=headers, json=get_payload(journee, page, taille_page), ttl=ttl)
+    response.raise_for_status()
+    return response.content
+
+
+def recuperer_tous_les_joueurs(headers, journee, taille_page=TAILLE_PAGE, max_workers=MAX_PAGES_PARALLELES,
+                               ttl=TTL_CACHE):
+    """
+    Recupere tout le pool page par page, plusieurs pages en parallele.
+    Les pages sont traitees par vagues de `max_workers` : chaque page est parsee
+    puis liberee, la memoire reste bornee par la taille d'une vague.
+    Sans total annonce par l'API, on s'arrete a la premiere page incomplete ; si les pages
+    annoncees ont rendu plus de joueurs que le total et que la derniere etait complete,
+    le total est ignore et la pagination continue jusqu'a une page incomplete.
+    ttl=0 force une revalidation conditionnelle de chaque page (mode surveillance).
+    Retourne un DataFrame type.
+    """
+    colonnes = nouvelles_colonnes()
+    ids_vus = set()
+    
+    nb, total = parser_page(recuperer_page(headers, journee, 0, taille_page, ttl), colonnes, ids_vus)
+    nb_pages = 1
+    nb_recus = nb
+    derniere_complete = nb == taille_page
+    if total is not None:
+        print(f"   Total annonce par l'API: {total} joueurs")
+        pages_restantes = list(range(1, min(math.ceil(total / taille_page), MAX_PAGES)))
+    else:
+        pages_restantes = None
+    
+    prochaine = 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            if pages_restantes == [] and derniere_complete and nb_recus > total:
+                print(f"[WARN] Total annonce ({total}) depasse ({nb_recus} joueurs recus), pagination jusqu'a une page incomplete")
+                pages_restantes = None
+            if pages_restantes is not None:
+                vague = pages_restantes[:max_workers]
+                pages_restantes = pages_restantes[max_workers:]
+            elif derniere_complete and prochaine < MAX_PAGES:
+                vague = list(range(prochaine, min(prochaine + max_workers, MAX_PAGES)))
+            else:
+                vague = []
+            if not vague:
+                break
+            
+            futures = [executor.submit(recuperer_page, headers, journee, p, taille_page, ttl) for p in vague]
+            for future in futures:
+                nb, _ = parser_page(future.result(), colonnes, ids_vus)
+                nb_pages += 1
+                nb_recus += nb
+                derniere_complete = nb == taille_page
+                if nb < taille_page and pages_restantes is None:
+                    break
+            prochaine = vague[-1] + 1
+    
+    print(f"   {nb_pages} pages de {taille_page} joueurs traitees")
+    return construire_dataframe(colonnes)
+
+
+def _typer_colonne(valeurs, dtype):
+    """
+    Colonne au type fixe. Une valeur de l'API hors type (texte dans une colonne numerique,
+    decimale dans une colonne entiere) devient manquante au lieu de faire echouer le scrape.
+    """
+    try:
+        return pd.array(valeurs, dtype=dtype)
+    except (TypeError, ValueError):
+        nombres = pd.to_numeric(pd.Series(valeurs, dtype=object), errors='coerce').astype(float)
+        if dtype == 'Int64':
+            nombres = nombres.where(nombres % 1 == 0)
+        return pd.array(nombres, dtype=dtype)
+
+
+def construire_dataframe(colonnes):
+    """Assemble les colonnes parsees en DataFrame aux types fixes."""
+    df = pd.DataFrame({
+        c: _typer_colonne(valeurs, DTYPES_COLONNES.get(c, 'object'))
+        for c, valeurs in colonnes.items()
+    })
+    colonnes.clear()
+    return df
+
+
 def main():
     print("=" * 60)
     print("SCRAPING JOUEURS - LA GRANDE MELEE")
@@ -89,83 +308,39 @@ def main():
     print("[OK] Credentials charges depuis .env")
     
     headers = get_headers(env_vars)
-    payload = get_payload()
+    journee = determiner_journee()
     
-    print("Tentative de recuperation de TOUS les joueurs...")
+    print(f"Tentative de recuperation de TOUS les joueurs (journee {journee}, pages de {TAILLE_PAGE})...")
+    if cache_http.mode_offline():
+        print("   [OFFLINE] Reponses rejouees depuis le cache")
     
     try:
-        response = requests.post(URL, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
+        df_clean = recuperer_tous_les_joueurs(headers, journee)
+        total_trouve = len(df_clean)
+        print(f"[OK] {total_trouve} joueurs recuperes.")
         
-        if "joueurs" in data:
-            liste_joueurs = data["joueurs"]
-            total_trouve = len(liste_joueurs)
-            print(f"[OK] {total_trouve} joueurs recuperes.")
+        if total_trouve > 0:
+            print("   Donnees de match extraites (adversaire, domicile, date)")
             
-            if total_trouve > 0:
-                df = pd.DataFrame(liste_joueurs)
-                
-                # Extraction de forme_recent
-                def extraire_forme(forme_dict):
-                    if isinstance(forme_dict, dict) and 'items' in forme_dict:
-                        return ','.join(forme_dict['items'])
-                    return ''
-                
-                df['forme_recent'] = df['forme'].apply(extraire_forme)
-                
-                # Extraction des donnees de match
-                def extraire_adversaire(adv_dict):
-                    if isinstance(adv_dict, dict) and 'nom' in adv_dict:
-                        return adv_dict['nom']
-                    return ''
-                
-                def extraire_domicile(adv_dict):
-                    if isinstance(adv_dict, dict) and 'domicile' in adv_dict:
-                        return 'domicile' if adv_dict['domicile'] else 'exterieur'
-                    return ''
-                
-                def extraire_date_match(date_str):
-                    if date_str and isinstance(date_str, str):
-                        try:
-                            return date_str.split('T')[0]
-                        except:
-                            return date_str
-                    return ''
-                
-                if 'adversaire' in df.columns:
-                    df['domicile'] = df['adversaire'].apply(extraire_domicile)
-                    df['adversaire'] = df['adversaire'].apply(extraire_adversaire)
-                
-                if 'date_match' in df.columns:
-                    df['date_match'] = df['date_match'].apply(extraire_date_match)
-                
-                print("   Donnees de match extraites (adversaire, domicile, date)")
-                
-                # Selection des colonnes utiles
-                colonnes_utiles = [
-                    'id', 'nom', 'nomcomplet', 'club', 'position', 
-                    'valeur', 'stat_moy', 'stat_nb', 'pourcentage_selection',
-                    'forme_recent', 'adversaire', 'domicile', 'date_match'
-                ]
-                
-                cols_finales = [c for c in colonnes_utiles if c in df.columns]
-                df_clean = df[cols_finales]
-                
-                # Sauvegarde du fichier global
-                fichier_global = os.path.join(os.path.dirname(__file__), "output", "joueurs_lagrandemelee_complet.csv")
-                os.makedirs(os.path.dirname(fichier_global), exist_ok=True)
-                df_clean.to_csv(fichier_global, index=False, sep=";", encoding="utf-8-sig")
-                print(f"[OK] Fichier global sauvegarde : {fichier_global}")
-                
-                # Afficher top 5
-                print("\n--- Top 5 des joueurs recuperes ---")
-                print(df_clean[['nom', 'valeur', 'club']].head(5))
-                
-        else:
-            print("[ERREUR] Cle 'joueurs' non trouvee dans la reponse.")
-            print("Cles disponibles:", data.keys())
+            # Sauvegarde du fichier global
+            fichier_global = os.path.join(os.path.dirname(__file__), "output", "joueurs_lagrandemelee_complet.csv")
+            os.makedirs(os.path.dirname(fichier_global), exist_ok=True)
+            precedent = flux_changements.lire_precedent(fichier_global, flux_changements.CHAMPS_JOUEURS)
+            df_clean.to_csv(fichier_global, index=False, sep=";", encoding="utf-8-sig")
+            print(f"[OK] Fichier global sauvegarde : {fichier_global}")
+            
+            # Flux des changements (prix, stats, forme) par rapport au scrape precedent
+            flux_changements.enregistrer(precedent, df_clean, 'joueurs', flux_changements.CHAMPS_JOUEURS)
+            
+            # Historique par journee (ajout seul, lignes inchangees ignorees)
+            historique_joueurs.enregistrer_snapshot(df_clean, journee)
+            
+            # Afficher top 5
+            print("\n--- Top 5 des joueurs recuperes ---")
+            print(df_clean[['nom', 'valeur', 'club']].head(5))
             
+    except ValueError as e:
+        print(f"[ERREUR] {e}")
     except requests.exceptions.RequestException as e:
         print(f"[ERREUR] Requete echouee: {e}")
     
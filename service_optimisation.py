@@ -0,0 +1,201 @@
+"""
+Service local d'optimisation - Fantasy Rugby "La Grande Melee"
+Garde en memoire le pool de joueurs scores (charge, fusionne avec les statuts de
+composition et filtre une seule fois) et repond aux requetes d'optimisation sans
+relancer Python ni relire les CSV.
+
+- Le pool est recharge automatiquement quand joueurs_avec_score.csv ou
+  joueurs_enrichis.csv changent dans output/ (verification a chaque requete)
+- Requetes traitees en parallele (un thread par connexion)
+
+Usage:
+    python service_optimisation.py                      # http://127.0.0.1:8765
+    python service_optimisation.py --port 9000 --remplacants
+
+Requetes:
+    GET  /sante        Etat du pool (nb joueurs, date de chargement)
+    GET  /joueurs      Pool disponible (id, nom, club, position, valeur, scores)
+    POST /optimiser    {"budget": 300, "verrous": [ids], "exclus": [ids],
+                        "objectif": "score_predictif", "top_k": 3, "iterations": 500,
+                        "solveur": "amelioration"}
+
+Mesure de latence sous charge : python charge_service.py
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import optimiseur_compo
+
+# --- CONFIGURATION ---
+HOTE = "127.0.0.1"
+PORT_DEFAUT = 8765
+ITERATIONS_DEFAUT = 500
+TOP_K_MAX = 10
+COLONNES_REPONSE = ['id', 'nom', 'club', 'position', 'valeur', 'score_predictif', 'rapport_qp', 'statut_compo']
+
+# Pool en memoire : {'signature': ..., 'df': ..., 'charge_le': ...}
+_pool = {}
+_verrou_pool = threading.Lock()
+
+
+def _signature_fichiers():
+    """Identifie l'etat des fichiers sources (taille, date de modification)."""
+    signature = []
+    for fichier in (optimiseur_compo.FICHIER_JOUEURS, optimiseur_compo.FICHIER_COMPOS):
+        if os.path.exists(fichier):
+            st = os.stat(fichier)
+            signature.append((st.st_size, st.st_mtime_ns))
+        else:
+            signature.append(None)
+    return tuple(signature)
+
+
+def pool_courant(inclure_remplacants=False):
+    """Pool filtre en memoire, recharge si les fichiers de output/ ont change."""
+    signature = _signature_fichiers()
+    if _pool.get('signature') == signature:
+        return _pool['df']
+
+    with _verrou_pool:
+        if _pool.get('signature') != signature:
+            df = optimiseur_compo.charger_joueurs()
+            df = optimiseur_compo.filtrer_joueurs_disponibles(df, inclure_remplacants=inclure_remplacants)
+            _pool.update(signature=signature, df=df.reset_index(drop=True),
+                         charge_le=datetime.now().strftime("%Y-%m-%dT%H:%M:%S"))
+            print(f"[OK] Pool charge: {len(df)} joueurs")
+    return _pool['df']
+
+
+def _joueurs_en_liste(df):
+    colonnes = [c for c in COLONNES_REPONSE if c in df.columns]
+    # Colonnes en float32 (schema compact) : arrondi au centieme comme dans les CSV
+    return json.loads(df[colonnes].to_json(orient='records', double_precision=2))
+
+
+def composition_en_dict(df_titulaires, df_remplacants, objectif):
+    """Composition au format de reponse (capitaine et supersub comme dans ma_composition.csv)."""
+    capitaine = df_titulaires.loc[df_titulaires['score_predictif'].idxmax(), 'id'] if len(df_titulaires) else None
+    supersub = df_remplacants.loc[df_remplacants['score_predictif'].idxmax(), 'id'] if len(df_remplacants) else None
+    return {
+        'objectif': round(float(df_titulaires[objectif].sum()), 2) if len(df_titulaires) else 0.0,
+        'score_predictif': round(float(df_titulaires['score_predictif'].sum()), 2) if len(df_titulaires) else 0.0,
+        'budget_utilise': round(float(df_titulaires['valeur'].sum() + df_remplacants.get('valeur', 0).sum()), 1)
+                          if len(df_titulaires) else 0.0,
+        'complete': len(df_titulaires) == optimiseur_compo.TOTAL_TITULAIRES,
+        'capitaine': None if capitaine is None else int(capitaine),
+        'supersub': None if supersub is None else int(supersub),
+        'titulaires': _joueurs_en_liste(df_titulaires),
+        'remplacants': _joueurs_en_liste(df_remplacants) if len(df_remplacants) else [],
+    }
+
+
+def traiter_requete(requete, inclure_remplacants=False, iterations_defaut=ITERATIONS_DEFAUT):
+    """Execute une requete d'optimisation (dict). Leve ValueError si elle est invalide."""
+    try:
+        budget = float(requete.get('budget', 300))
+        verrous = [int(i) for i in requete.get('verrous', [])]
+        exclus = [int(i) for i in requete.get('exclus', [])]
+        top_k = max(1, min(int(requete.get('top_k', 1)), TOP_K_MAX))
+        iterations = int(requete.get('iterations', iterations_defaut))
+    except (TypeError, ValueError):
+        raise ValueError("Parametres invalides (budget, verrous, exclus, top_k, iterations)")
+    objectif = requete.get('objectif', 'score_predictif')
+    solveur = requete.get('solveur', 'amelioration')
+
+    df = pool_courant(inclure_remplacants)
+    resultats = optimiseur_compo.optimiser_requete(
+        df, budget, verrous=verrous, exclus=exclus, objectif=objectif,
+        top_k=top_k, iterations=iterations, solveur=solveur
+    )
+    return [composition_en_dict(tit, remp, objectif) for tit, remp in resultats]
+
+
+def creer_handler(inclure_remplacants=False, iterations_defaut=ITERATIONS_DEFAUT):
+    """Classe de handler HTTP liee aux options du service."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _repondre(self, statut, donnees):
+            corps = json.dumps(donnees, ensure_ascii=False).encode('utf-8')
+            self.send_response(statut)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            if self.path == '/sante':
+                df = pool_courant(inclure_remplacants)
+                self._repondre(200, {'joueurs': len(df), 'charge_le': _pool.get('charge_le')})
+            elif self.path == '/joueurs':
+                self._repondre(200, _joueurs_en_liste(pool_courant(inclure_remplacants)))
+            else:
+                self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+
+        def do_POST(self):
+            if self.path != '/optimiser':
+                self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+                return
+
+            debut = time.perf_counter()
+            try:
+                longueur = int(self.headers.get('Content-Length', 0))
+                requete = json.loads(self.rfile.read(longueur) or b'{}')
+                compositions = traiter_requete(requete, inclure_remplacants, iterations_defaut)
+            except ValueError as e:
+                self._repondre(400, {'erreur': str(e)})
+                return
+            except Exception as e:
+                print(f"[ERREUR] {e.__class__.__name__}: {e}")
+                self._repondre(500, {'erreur': f"{e.__class__.__name__}: {e}"})
+                return
+
+            self._repondre(200, {
+                'compositions': compositions,
+                'duree_ms': round((time.perf_counter() - debut) * 1000, 1),
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service local d'optimisation de composition")
+    parser.add_argument('--port', type=int, default=PORT_DEFAUT, help=f'Port d\'ecoute (defaut: {PORT_DEFAUT})')
+    parser.add_argument('--remplacants', action='store_true', help='Inclure les remplacants reels dans la pool de joueurs')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS_DEFAUT,
+                        help=f'Nb iterations par defaut (defaut: {ITERATIONS_DEFAUT})')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SERVICE D'OPTIMISATION - LA GRANDE MELEE")
+    print("=" * 60)
+
+    if not os.path.exists(optimiseur_compo.FICHIER_JOUEURS):
+        print(f"[ERREUR] {optimiseur_compo.FICHIER_JOUEURS} introuvable. Executez d'abord score_predictif.py")
+        return
+
+    # Chargement a chaud avant la premiere requete
+    pool_courant(args.remplacants)
+
+    serveur = ThreadingHTTPServer((HOTE, args.port), creer_handler(args.remplacants, args.iterations))
+    print(f"[OK] Service a l'ecoute sur http://{HOTE}:{args.port} (Ctrl+C pour arreter)")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Service arrete")
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
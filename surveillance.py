@@ -0,0 +1,285 @@
+"""
+Mode surveillance - Fantasy Rugby "La Grande Melee"
+Entre la publication des premieres feuilles de match (jeudi) et le coup d'envoi,
+interroge regulierement AllRugby et l'API Fantasy et ne relance que ce qui est touche :
+
+- feuille d'un club nouvelle ou modifiee : re-enrichissement des joueurs de ce club
+- prix / stats modifies : re-calcul du score des seuls joueurs concernes
+- dans les deux cas : nouvelle optimisation, ma_composition.csv reecrit de maniere atomique
+
+Les requetes sont conditionnelles (ETag / Last-Modified via cache_http) : une page
+inchangee ne coute qu'un 304. Tout reste en memoire entre deux tours, aucun sous-processus.
+
+Chaque mise a jour est journalisee dans output/surveillance.csv avec sa duree de
+traitement et le delai maximal depuis la publication (la publication a eu lieu
+apres le tour precedent).
+
+Usage:
+    python main.py --watch                       # Pipeline complet puis surveillance
+    python main.py --skip-scrape --watch --intervalle 20
+"""
+
+import contextlib
+import csv
+import io
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import flux_changements
+import forme_historique
+import historique_joueurs
+import optimiseur_compo
+import score_predictif
+import scrape_compos
+import scrape_joueurs
+
+# --- CONFIGURATION ---
+INTERVALLE_COMPOS = 30      # Secondes entre deux verifications des feuilles de match
+INTERVALLE_PRIX = 300       # Secondes entre deux verifications des prix LGM
+FICHIER_JOUEURS = os.path.join(os.path.dirname(__file__), "output", "joueurs_lagrandemelee_complet.csv")
+FICHIER_JOURNAL = os.path.join(os.path.dirname(__file__), "output", "surveillance.csv")
+COLONNES_JOURNAL = ['date', 'evenement', 'clubs', 'duree_traitement_s',
+                    'delai_max_publication_s', 'composition_modifiee']
+
+
+def _silencieux(fonction, *args, **kwargs):
+    """Appelle une fonction des scripts du pipeline sans son affichage detaille."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fonction(*args, **kwargs)
+
+
+def _ecrire_csv(df, fichier):
+    """Ecriture atomique d'un CSV du pipeline (fichier temporaire + rename)."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    tmp = fichier + ".tmp"
+    df.to_csv(tmp, index=False, sep=";", encoding="utf-8-sig")
+    os.replace(tmp, fichier)
+
+
+def _empreintes_joueurs(df):
+    """Empreinte de chaque joueur (prix, stats, match...) indexee par id."""
+    return pd.Series(historique_joueurs.calculer_empreintes(df).values, index=df['id'].values)
+
+
+def charger_etat(avec_forme_historique=False, avec_notations=False):
+    """
+    Etat en memoire de la surveillance, initialise depuis les fichiers du dernier passage.
+    avec_forme_historique / avec_notations: re-scorer comme score_predictif.py
+    --forme-historique / --notations.
+    """
+    joueurs = _silencieux(scrape_compos.charger_joueurs_fantasy, FICHIER_JOUEURS)
+    if joueurs is None:
+        print(f"[ERREUR] {FICHIER_JOUEURS} introuvable, lancez d'abord le pipeline")
+        return None
+
+    classement = _silencieux(score_predictif.charger_classement)
+    forme = _silencieux(forme_historique.caracteristiques_a_jour) if avec_forme_historique else None
+    notations = _silencieux(score_predictif.charger_notations) if avec_notations else None
+    if os.path.exists(score_predictif.FICHIER_SORTIE):
+        scores = pd.read_csv(score_predictif.FICHIER_SORTIE, sep=";", encoding="utf-8-sig")
+    else:
+        scores = score_predictif.calculer_scores(joueurs.copy(), classement, forme, notations)
+
+    enrichi = None
+    if os.path.exists(scrape_compos.FICHIER_ENRICHI):
+        enrichi = pd.read_csv(scrape_compos.FICHIER_ENRICHI, sep=";", encoding="utf-8-sig")
+
+    return {
+        'joueurs': joueurs,
+        'empreintes_joueurs': _empreintes_joueurs(joueurs),
+        'classement': classement,
+        'avec_forme_historique': avec_forme_historique,
+        'forme': forme,
+        'notations': notations,
+        'scores': scores,
+        'enrichi': enrichi,
+        'empreintes_blocs': scrape_compos.charger_etat_blocs() if enrichi is not None else {},
+        'compos': {},
+        'clubs_avec_compos': set(),
+        'composition': None,
+    }
+
+
+def verifier_compos(etat, url):
+    """
+    Relit les feuilles de match (revalidation conditionnelle) et re-enrichit les clubs modifies.
+    Retourne l'ensemble des clubs dont la feuille a change.
+    """
+    compos, clubs_avec_compos = _silencieux(scrape_compos.scraper_compos, url, ttl=0)
+    if not compos:
+        return set()
+    etat['compos'], etat['clubs_avec_compos'] = compos, clubs_avec_compos
+
+    empreintes = scrape_compos.empreintes_blocs(compos)
+    modifies = scrape_compos.clubs_modifies(empreintes, etat['empreintes_blocs'])
+    if not modifies:
+        return set()
+
+    df = etat['joueurs'].copy()
+    if etat['enrichi'] is not None and None not in empreintes:
+        df = scrape_compos.mettre_a_jour_partielle(df, etat['enrichi'], compos, clubs_avec_compos, modifies)
+    else:
+        df = scrape_compos.enrichir_avec_compos(df, compos, clubs_avec_compos, verbose=False)
+
+    scrape_compos.sauvegarder_csv_enrichi(df)
+    scrape_compos.sauvegarder_etat_blocs(empreintes)
+    if etat['enrichi'] is not None:
+        _silencieux(flux_changements.enregistrer, etat['enrichi'], df, 'compos', flux_changements.CHAMPS_COMPOS)
+    etat['enrichi'] = df
+    etat['empreintes_blocs'] = empreintes
+    return modifies
+
+
+def verifier_prix(etat, headers, journee):
+    """
+    Relit le pool LGM (revalidation conditionnelle) et re-score les joueurs modifies.
+    Retourne l'ensemble des clubs des joueurs modifies.
+    """
+    nouveau = _silencieux(scrape_joueurs.recuperer_tous_les_joueurs, headers, journee, ttl=0)
+    if len(nouveau) == 0:
+        return set()
+
+    empreintes = _empreintes_joueurs(nouveau)
+    precedentes = etat['empreintes_joueurs'].reindex(empreintes.index)
+    ids_modifies = set(empreintes.index[empreintes.values != precedentes.values])
+    ids_retires = set(etat['empreintes_joueurs'].index) - set(empreintes.index)
+    if not ids_modifies and not ids_retires:
+        return set()
+
+    _ecrire_csv(nouveau, FICHIER_JOUEURS)
+    historique_joueurs.enregistrer_snapshot(nouveau, journee)
+    if etat['avec_forme_historique']:
+        # Nouveau snapshot de la journee en cours : forme relue (etat persiste + journee en memoire)
+        etat['forme'] = _silencieux(forme_historique.caracteristiques_a_jour)
+    _silencieux(flux_changements.enregistrer, etat['joueurs'], nouveau, 'joueurs', flux_changements.CHAMPS_JOUEURS)
+    nouveau['nom_normalise'] = nouveau['nom'].map(scrape_compos.normaliser_nom)
+
+    # Seuls les joueurs modifies sont re-scores, les autres gardent leur score
+    a_scorer = score_predictif.calculer_scores(nouveau[nouveau['id'].isin(ids_modifies)].copy(), etat['classement'],
+                                               etat['forme'], etat['notations'])
+    scores = etat['scores']
+    conserves = scores[scores['id'].isin(empreintes.index) & ~scores['id'].isin(ids_modifies)]
+    scores = pd.concat([conserves, a_scorer[score_predictif.colonnes_export(a_scorer)]], ignore_index=True)
+    _ecrire_csv(scores, score_predictif.FICHIER_SORTIE)
+
+    # Nouveaux joueurs : statut de composition a determiner (feuilles inchangees)
+    if etat['enrichi'] is not None and etat['compos']:
+        enrichi = _silencieux(scrape_compos.mettre_a_jour_partielle, nouveau.copy(), etat['enrichi'],
+                              etat['compos'], etat['clubs_avec_compos'], set())
+        scrape_compos.sauvegarder_csv_enrichi(enrichi)
+        etat['enrichi'] = enrichi
+
+    etat['joueurs'] = nouveau
+    etat['empreintes_joueurs'] = empreintes
+    etat['scores'] = scores
+    print(f"   {len(ids_modifies)} joueurs modifies, {len(ids_retires)} retires du pool")
+    return set(nouveau.loc[nouveau['id'].isin(ids_modifies), 'club'].dropna().unique())
+
+
+def optimiser(etat, budget, inclure_remplacants=False, iterations=500):
+    """Optimise la composition depuis l'etat en memoire. Retourne True si elle a change."""
+    df = etat['scores']
+    if etat['enrichi'] is not None and 'statut_compo' in etat['enrichi'].columns:
+        df = df.merge(etat['enrichi'][['id', 'statut_compo', 'numero_compo']], on='id', how='left')
+
+    df = _silencieux(optimiseur_compo.filtrer_joueurs_disponibles, df, inclure_remplacants=inclure_remplacants)
+    df_titulaires, budget_restant = optimiseur_compo.optimiser_avec_amelioration(
+        df, budget, iterations=iterations, verbose=False
+    )
+    df_remplacants, _ = optimiseur_compo.selectionner_remplacants_fantasy(df, df_titulaires, budget_restant)
+    optimiseur_compo.sauvegarder_composition(df_titulaires, df_remplacants)
+
+    composition = frozenset(df_titulaires['id']) | frozenset(df_remplacants.get('id', []))
+    modifiee = composition != etat['composition']
+    etat['composition'] = composition
+    score = df_titulaires['score_predictif'].sum() if len(df_titulaires) > 0 else 0.0
+    print(f"   {len(df_titulaires)} titulaires + {len(df_remplacants)} remplacants, "
+          f"{score:.1f} pts{'' if modifiee else ' (composition inchangee)'}")
+    return modifiee
+
+
+def clubs_sans_compo(etat):
+    """Clubs du pool dont la feuille de match n'est pas encore publiee."""
+    clubs = {scrape_compos.normaliser_club(c) for c in etat['joueurs']['club'].dropna().unique()}
+    return clubs - set(etat['clubs_avec_compos'])
+
+
+def journaliser(evenement, clubs, duree, delai_max, modifiee, fichier=FICHIER_JOURNAL):
+    """Ajoute une mise a jour au journal de surveillance."""
+    os.makedirs(os.path.dirname(fichier), exist_ok=True)
+    nouveau_fichier = not os.path.exists(fichier)
+    with open(fichier, 'a', encoding='utf-8-sig' if nouveau_fichier else 'utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        if nouveau_fichier:
+            writer.writerow(COLONNES_JOURNAL)
+        writer.writerow([datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), evenement, ','.join(sorted(clubs)),
+                         round(duree, 2), round(delai_max, 1), modifiee])
+
+
+def surveiller(url_compos, budget, inclure_remplacants=False, iterations=500,
+               intervalle=INTERVALLE_COMPOS, intervalle_prix=INTERVALLE_PRIX, avec_forme_historique=False,
+               avec_notations=False):
+    """
+    Boucle de surveillance : s'arrete quand tous les clubs ont publie leur feuille (ou Ctrl+C).
+    Les prix ne sont verifies que si les credentials .env sont disponibles.
+    avec_forme_historique / avec_notations: les joueurs re-scores le sont avec la forme
+    historique / les notations des clubs, comme le pool initial.
+    """
+    etat = charger_etat(avec_forme_historique, avec_notations)
+    if etat is None:
+        return 1
+
+    env_vars = _silencieux(scrape_joueurs.charger_env)
+    headers = scrape_joueurs.get_headers(env_vars) if env_vars else None
+    journee = scrape_joueurs.determiner_journee()
+
+    print("\n" + "=" * 60)
+    print("[WATCH] SURVEILLANCE DES COMPOSITIONS")
+    print("=" * 60)
+    print(f"   Compos: {url_compos} (toutes les {intervalle}s)")
+    if headers:
+        print(f"   Prix LGM: journee {journee} (toutes les {intervalle_prix}s)")
+    else:
+        print("   [WARN] Pas de .env : prix LGM non surveilles")
+    print("   Ctrl+C pour arreter")
+
+    tour_precedent = time.time()
+    verification_prix_precedente = time.time()
+    try:
+        while True:
+            debut = time.time()
+            evenements = []
+
+            modifies = verifier_compos(etat, url_compos)
+            if modifies:
+                print(f"\n[{datetime.now():%H:%M:%S}] Feuilles modifiees: {', '.join(sorted(modifies))}")
+                evenements.append(('compos', modifies, tour_precedent))
+
+            if headers and debut - verification_prix_precedente >= intervalle_prix:
+                clubs_prix = verifier_prix(etat, headers, journee)
+                if clubs_prix:
+                    print(f"\n[{datetime.now():%H:%M:%S}] Prix/stats modifies: {', '.join(sorted(clubs_prix))}")
+                    evenements.append(('prix', clubs_prix, verification_prix_precedente))
+                verification_prix_precedente = debut
+
+            if evenements:
+                modifiee = optimiser(etat, budget, inclure_remplacants, iterations)
+                fin = time.time()
+                for evenement, clubs, publication_apres in evenements:
+                    journaliser(evenement, clubs, fin - debut, fin - publication_apres, modifiee)
+                print(f"[OK] Composition mise a jour en {fin - debut:.1f}s "
+                      f"(au plus {fin - evenements[0][2]:.0f}s apres publication)")
+
+            restants = clubs_sans_compo(etat)
+            if not restants:
+                print("\n[OK] Toutes les feuilles de match sont publiees, fin de la surveillance")
+                return 0
+
+            tour_precedent = debut
+            time.sleep(max(0.0, intervalle - (time.time() - debut)))
+    except KeyboardInterrupt:
+        print("\n[INFO] Surveillance interrompue")
+    return 0